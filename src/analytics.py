@@ -0,0 +1,289 @@
+"""
+Computes rating reports of a movie library: a histogram of ratings, the 
+mean, median and percentiles overall, per genre and per decade, the best 
+rated movies of each genre and how many movies are unrated. The years, 
+genres and ratings are first copied into contiguous arrays; NumPy works 
+on them when it is installed, and the standard library otherwise.
+"""
+
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from itertools import compress, repeat
+from operator import attrgetter, ge
+
+try:
+    import numpy
+except ImportError:  # The array module and Counter are used instead
+    numpy = None
+
+from movie import GENRES
+
+PERCENTILES = (10, 25, 50, 75, 90)  # Percentiles of every summary
+TOP_N = 5  # Best rated movies listed per genre
+NO_VALUE = 0xFFFF  # Marks a missing year, genre or rating in the arrays
+MAX_RATING = 1000  # A rating of 10 in hundredths
+
+class RatingColumns:
+    """
+    A class to hold the years, genre codes and ratings (in hundredths) of 
+    a list of movies as arrays of unsigned 16-bit numbers, in the order of 
+    the movies. Ratings are clamped to the 0 to 10 scale.
+    """
+
+    def __init__(self, movies):
+        """
+        Copies the columns out of a dictionary or iterable of movies.
+        """
+        if isinstance(movies, Mapping):
+            movies = movies.values()
+        self.movies = list(movies)  # Container type: List
+        # Each column is read with map and attrgetter, and its values are 
+        # converted through a table of the distinct values, which keeps 
+        # the per-movie work in C
+        years = list(map(attrgetter("year"), self.movies))
+        genres = list(map(attrgetter("genre"), self.movies))
+        ratings = list(map(attrgetter("rating"), self.movies))
+
+        self.genres = list(GENRES)  # Genre of each code
+        unlisted = set(genres) - set(GENRES) - {None}
+        self.genres += sorted(unlisted)
+        codes = {genre: code for code, genre in enumerate(self.genres)}
+        codes[None] = NO_VALUE
+        # Ratings outside 0 to 10, which only a hand-edited file can hold, 
+        # are clamped to the nearest end of the scale
+        hundredths = {rating: NO_VALUE if rating is None 
+                      else min(max(round(rating * 100), 0), MAX_RATING) 
+                      for rating in set(ratings)}
+        if None in years:
+            years = [NO_VALUE if year is None else year for year in years]
+
+        self.years = array('H', years)
+        self.genre_codes = array('H', map(codes.__getitem__, genres))
+        self.ratings = array('H', map(hundredths.__getitem__, ratings))
+
+    def __len__(self):
+        """
+        Returns the number of movies.
+        """
+        return len(self.movies)
+
+def _percentile(value_at, count, percent):
+    """
+    Returns a percentile of count sorted values, given a function that 
+    returns the value at a position, interpolating between the two 
+    nearest values like numpy.percentile.
+    """
+    position = percent / 100 * (count - 1)
+    low = int(position)
+    high = min(low + 1, count - 1)
+    fraction = position - low
+    return value_at(low) + (value_at(high) - value_at(low)) * fraction
+
+def _summary(count, unrated, total, value_at, percentiles):
+    """
+    Returns the summary of a group of ratings as a dictionary.
+    """
+    summary = {"count": count, "unrated": unrated, "mean": None, 
+               "median": None, "percentiles": {}}
+    if count:  # Conditional if-statement
+        values = {percent: round(_percentile(value_at, count, percent) 
+                                 / 100, 2) 
+                  for percent in set(percentiles) | {50}}
+        summary["mean"] = round(total / count / 100, 2)
+        summary["median"] = values[50]
+        summary["percentiles"] = {percent: values[percent] 
+                                  for percent in percentiles}
+    return summary
+
+def _counts_value_at(counts):
+    """
+    Returns a function giving the value at a position of the sorted 
+    ratings described by counts, a list of how often each rating occurs.
+    """
+    ends = []  # Container type: List of (last position + 1, rating)
+    end = 0
+    for value, count in enumerate(counts):  # Iteration: for loop
+        if count:
+            end += count
+            ends.append((end, value))
+
+    def value_at(position):
+        for end, value in ends:
+            if position < end:
+                return value
+        raise IndexError(position)
+    return value_at
+
+def _summarize_counts(counts, unrated, percentiles):
+    """
+    Returns the summary of a group from its counts per rating.
+    """
+    count = sum(counts)
+    total = sum(value * times for value, times in enumerate(counts))
+    return _summary(count, unrated, total, _counts_value_at(counts), 
+                    percentiles)
+
+def _analyze_python(columns, percentiles, top_n):
+    """
+    Computes the report with the standard library. Ratings are counted 
+    per (genre, rating) and (year, rating) pair in C by Counter, and the 
+    summaries are read from the counts, which needs no sorting.
+    """
+    ratings, codes, years = columns.ratings, columns.genre_codes, columns.years
+    # Decade of every possible year, looked up in C by map
+    decade_of = [year // 10 * 10 for year in range(NO_VALUE)] + [None]
+    genre_pairs = Counter(zip(codes, ratings))
+    decade_pairs = Counter(zip(map(decade_of.__getitem__, years), ratings))
+
+    by_genre = {}  # Container type: Dictionary (code -> counts)
+    unrated_genre = Counter()
+    for (code, rating), times in genre_pairs.items():  # Iteration: for loop
+        if rating == NO_VALUE:
+            unrated_genre[code] += times
+        else:
+            by_genre.setdefault(code, [0] * (MAX_RATING + 1))[rating] += times
+    by_decade = {}
+    unrated_decade = Counter()
+    for (decade, rating), times in decade_pairs.items():
+        if rating == NO_VALUE:
+            unrated_decade[decade] += times
+        else:
+            by_decade.setdefault(decade, 
+                                 [0] * (MAX_RATING + 1))[rating] += times
+
+    overall = [0] * (MAX_RATING + 1)
+    for counts in by_genre.values():
+        for value, times in enumerate(counts):
+            overall[value] += times
+    histogram = [0] * 10
+    for value, times in enumerate(overall):
+        histogram[min(value // 100, 9)] += times
+
+    # Top movies: the lowest rating that still makes each genre's top N, 
+    # then one filtered pass over the ratings for the movies above it
+    cutoffs = {}
+    for code, counts in by_genre.items():
+        seen = 0
+        for value in range(MAX_RATING, -1, -1):
+            seen += counts[value]
+            if seen >= top_n or value == 0:
+                cutoffs[code] = value
+                break
+    top = {code: [] for code in by_genre}
+    lowest = min(cutoffs.values(), default=NO_VALUE)
+    for index in compress(range(len(ratings)), 
+                          map(ge, ratings, repeat(lowest))):
+        rating = ratings[index]
+        code = codes[index]
+        if rating != NO_VALUE and rating >= cutoffs.get(code, NO_VALUE):
+            top[code].append(columns.movies[index])
+
+    genres = set(by_genre) | set(unrated_genre)
+    decades = set(by_decade) | set(unrated_decade)
+    return (histogram, 
+            _summarize_counts(overall, sum(unrated_genre.values()), 
+                              percentiles),
+            {code: _summarize_counts(by_genre.get(code, [0]), 
+                                     unrated_genre[code], percentiles) 
+             for code in genres},
+            {decade: _summarize_counts(by_decade.get(decade, [0]), 
+                                       unrated_decade[decade], percentiles) 
+             for decade in decades},
+            top)
+
+def _analyze_numpy(columns, percentiles, top_n):
+    """
+    Computes the report with NumPy: the rated movies are sorted once by 
+    group and rating, and every group summary is read from its slice.
+    """
+    ratings = numpy.frombuffer(columns.ratings, dtype=numpy.uint16)
+    codes = numpy.frombuffer(columns.genre_codes, dtype=numpy.uint16)
+    years = numpy.frombuffer(columns.years, dtype=numpy.uint16)
+    decades = numpy.where(years == NO_VALUE, NO_VALUE, years // 10 * 10)
+    rated = ratings != NO_VALUE
+    values = ratings[rated].astype(numpy.int64)
+
+    histogram = numpy.bincount(numpy.minimum(values // 100, 9), 
+                               minlength=10).tolist()
+    sorted_values = numpy.sort(values)
+    overall = _summary(len(values), int((~rated).sum()), 
+                       int(values.sum()), 
+                       lambda position: int(sorted_values[position]), 
+                       percentiles)
+
+    def grouped(keys, want_top):
+        summaries, top = {}, {}
+        unrated = Counter(keys[~rated].tolist())
+        rated_keys = keys[rated]
+        order = numpy.lexsort((values, rated_keys))  # By key, then rating
+        group_keys = rated_keys[order]
+        group_values = values[order]
+        starts = numpy.flatnonzero(numpy.diff(group_keys)) + 1
+        bounds = zip(numpy.concatenate(([0], starts)).tolist(), 
+                     numpy.concatenate((starts, [len(order)])).tolist())
+        for start, end in bounds:  # Iteration: for loop
+            if start == end:
+                continue  # No rated movies at all
+            key = int(group_keys[start])
+            group = group_values[start:end]
+            summaries[key] = _summary(end - start, unrated.pop(key, 0), 
+                                      int(group.sum()), 
+                                      lambda position: int(group[position]), 
+                                      percentiles)
+            if want_top:
+                cutoff = group[max(0, len(group) - top_n)]
+                first = start + int(numpy.searchsorted(group, cutoff))
+                top[key] = [columns.movies[index] 
+                            for index in numpy.flatnonzero(rated)[
+                                order[first:end]].tolist()]
+        for key, count in unrated.items():  # Groups without ratings
+            summaries[key] = _summary(0, count, 0, None, percentiles)
+        return summaries, top
+
+    by_genre, top = grouped(codes, True)
+    by_decade, _ = grouped(decades, False)
+    by_decade = {None if decade == NO_VALUE else decade: summary 
+                 for decade, summary in by_decade.items()}
+    return histogram, overall, by_genre, by_decade, top
+
+def analyze(movies, percentiles=PERCENTILES, top_n=TOP_N, use_numpy=None):
+    """
+    Returns the rating report of a dictionary or iterable of movies as a 
+    dictionary with the number of movies, rated and unrated movies, a 
+    histogram of ratings per rating point (10 counts with 9), and 
+    summaries (count, unrated, mean, median and percentiles) overall, by 
+    genre and by decade. Each genre also lists its top_n best rated 
+    movies, with ties, best first. NumPy is used if it is installed, 
+    unless use_numpy is False.
+    """
+    columns = movies if isinstance(movies, RatingColumns) \
+        else RatingColumns(movies)
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if use_numpy and numpy is None:
+        raise ValueError("NumPy is not installed")
+    analyze_columns = _analyze_numpy if use_numpy else _analyze_python
+    histogram, overall, by_genre, by_decade, top = analyze_columns(
+        columns, percentiles, top_n)
+
+    genres = {}  # Container type: Dictionary
+    for code, summary in sorted(by_genre.items(), 
+                                key=lambda item: columns.genres[item[0]] 
+                                if item[0] != NO_VALUE else ""):
+        name = columns.genres[code] if code != NO_VALUE else None
+        summary["top"] = sorted(top.get(code, []), 
+                                key=lambda movie: (-movie.rating, 
+                                                   movie.title))[:top_n]
+        genres[name] = summary
+    return {
+        "movies": len(columns),
+        "rated": overall["count"],
+        "unrated": overall["unrated"],
+        "histogram": histogram,
+        "overall": overall,
+        "by_genre": genres,
+        "by_decade": dict(sorted(by_decade.items(), 
+                                 key=lambda item: (item[0] is None, 
+                                                   item[0] or 0))),
+    }
@@ -0,0 +1,254 @@
+"""
+Benchmarks the hot paths of the Movies Library on synthetic libraries. 
+The generator is deterministic, so runs with the same options measure the 
+same data, and results are written as JSON that later runs can be 
+compared against to catch regressions.
+
+Usage:
+    python benchmark.py --sizes 1000 100000 --output results.json
+    python benchmark.py --compare results.json
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from movie import GENRES
+from rating_stats import get_decade
+from analytics import analyze, numpy, PERCENTILES, TOP_N
+from binary_snapshot import remove_snapshot
+from file_operations import read_movies_from_file, write_movies_to_file, \
+    iter_movies_from_file
+from movie_operations import generate_movie_id, calculate_average_rating
+from columnar import export_columnar, import_columnar
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_THRESHOLD = 0.25  # Slowdown that counts as a regression
+NOISE_FLOOR = 0.0005  # Slowdowns under half a millisecond are timer noise
+LOOKUPS = 1000  # Calls timed for the operations on a single movie
+
+def generate_library(file_path, size, seed=0, genre_skew=1.0, 
+                     rated_share=0.9, rating_mean=6.5, rating_stddev=1.5):
+    """
+    Writes a CSV library of size synthetic movies. Genres follow a Zipf 
+    distribution (genre_skew 0 makes them uniform), a rated_share of the 
+    movies is rated, and ratings follow a normal distribution clipped to 
+    0-10. The same options always produce the same file.
+    """
+    generator = random.Random(seed)
+    weights = [1 / (rank ** genre_skew) for rank in range(1, len(GENRES) + 1)]
+    syllables = ("ka", "lo", "mi", "ra", "te", "su", "no", "vi", "da", "ze")
+    with open(file_path, 'w', newline='') as file:
+        file.write("movie_id,title,year,genre,rating\n")
+        genres = generator.choices(GENRES, weights, k=size)
+        for movie_id in range(1, size + 1):  # Iteration: for loop
+            word = "".join(generator.choice(syllables) 
+                           for _ in range(generator.randint(2, 4)))
+            title = f"{word.upper()} {movie_id}"  # Titles are unique
+            year = generator.randint(1888, 2024)
+            rating = ""
+            if generator.random() < rated_share:
+                value = min(10, max(0, generator.gauss(rating_mean, 
+                                                       rating_stddev)))
+                rating = f"{value:.2f}"
+            file.write(f"{movie_id},{title},{year},{genres[movie_id - 1]},"
+                       f"{rating}\n")
+
+def per_object_report(movies, percentiles=PERCENTILES, top_n=TOP_N):
+    """
+    Computes what analytics.analyze reports the straightforward way, one 
+    Movie object at a time, as the baseline its speedup is measured on.
+    """
+    groups = {}  # Container type: Dictionary (group -> list of ratings)
+    unrated = {}
+    by_genre = {}  # Container type: Dictionary (genre -> list of movies)
+    histogram = [0] * 10
+    for movie in movies.values():  # Iteration: for loop
+        keys = (("genre", movie.genre), ("decade", get_decade(movie.year)),
+                ("overall", None))
+        if movie.rating is None:
+            for key in keys:
+                unrated[key] = unrated.get(key, 0) + 1
+            continue
+        for key in keys:
+            groups.setdefault(key, []).append(movie.rating)
+        by_genre.setdefault(movie.genre, []).append(movie)
+        histogram[min(int(movie.rating), 9)] += 1
+    report = {"histogram": histogram, "groups": {}, "top": {}}
+    for key, ratings in groups.items():
+        ratings.sort()
+        values = []
+        for percent in percentiles:
+            position = percent / 100 * (len(ratings) - 1)
+            low = int(position)
+            high = min(low + 1, len(ratings) - 1)
+            values.append(ratings[low] + (ratings[high] - ratings[low]) 
+                          * (position - low))
+        report["groups"][key] = (len(ratings), unrated.get(key, 0),
+                                 sum(ratings) / len(ratings), values)
+    for genre, genre_movies in by_genre.items():
+        report["top"][genre] = sorted(
+            genre_movies, key=lambda movie: (-movie.rating, 
+                                             movie.title))[:top_n]
+    return report
+
+def _time(function, repeat=1):
+    """
+    Returns the fastest of repeat runs of function, in seconds.
+    """
+    best = None
+    for _ in range(repeat):  # Iteration: for loop
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_size(size, directory, seed=0, file_sizes=None):
+    """
+    Times every hot path on a library of the given size and returns a 
+    dictionary of seconds by benchmark name. Operations on a single movie 
+    are reported per call. The sizes in bytes of the CSV file and of the 
+    columnar archives are added to file_sizes, if it is given.
+    """
+    file_path = os.path.join(directory, f"movies_{size}.csv")
+    generate_library(file_path, size, seed)
+    repeat = 3 if size <= 100000 else 1
+    results = {}  # Container type: Dictionary
+
+    results["read_csv"] = _time(lambda: read_movies_from_file(file_path), 
+                                repeat)
+    movies = read_movies_from_file(file_path)
+    # Builds what the library defers to its first read, so the first 
+    # timed query does not pay for it; the build is timed on its own
+    results["prepare_for_reads"] = _time(movies.prepare_for_reads)
+    gc.collect()  # Or the next timed call pays to scan the new objects
+    results["write"] = _time(lambda: write_movies_to_file(movies, file_path),
+                             repeat)
+    results["read_snapshot"] = _time(
+        lambda: read_movies_from_file(file_path), repeat)
+    remove_snapshot(file_path)
+
+    titles = [movie.title for movie in list(movies.values())[:LOOKUPS]]
+    results["generate_movie_id"] = _time(
+        lambda: [generate_movie_id(movies) for _ in range(LOOKUPS)], 
+        repeat) / LOOKUPS
+    results["duplicate_check"] = _time(
+        lambda: [movies.has_title(title) for title in titles], 
+        repeat) / LOOKUPS
+    results["average_rating"] = _time(
+        lambda: calculate_average_rating(movies), repeat)
+    results["average_rating_stream"] = _time(
+        lambda: calculate_average_rating(iter_movies_from_file(file_path)),
+        repeat)
+    results["genre_filter"] = _time(
+        lambda: movies.query(genre=GENRES[0]), repeat)
+    results["sorted_listing"] = _time(movies.sorted_by_title, repeat)
+    results["analytics"] = _time(lambda: analyze(movies), repeat)
+    results["analytics_per_object"] = _time(
+        lambda: per_object_report(movies), repeat)
+
+    # The columnar archives, against write and read_csv for the CSV file
+    archive_path = os.path.join(directory, f"movies_{size}.mvc")
+    for codec in ("zlib", "lzma"):  # Iteration: for loop
+        results[f"columnar_export_{codec}"] = _time(
+            lambda: export_columnar(movies, archive_path, codec), repeat)
+        results[f"columnar_import_{codec}"] = _time(
+            lambda: import_columnar(archive_path), repeat)
+        if file_sizes is not None:
+            file_sizes[f"columnar_{codec}"] = os.path.getsize(archive_path)
+    if file_sizes is not None:
+        file_sizes["csv"] = os.path.getsize(file_path)
+    return results
+
+def run(sizes, seed=0):
+    """
+    Runs the benchmarks for every size and returns the results.
+    """
+    results = {  # Container type: Dictionary
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "numpy": numpy is not None,  # Which analytics backend was timed
+        "sizes": {},
+        "bytes": {},  # File sizes by library size
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:  # Iteration: for loop
+            print(f"Benchmarking {size} movies...", file=sys.stderr)
+            with redirect_stdout(io.StringIO()):  # Hides "Changes saved!"
+                file_sizes = results["bytes"][str(size)] = {}
+                results["sizes"][str(size)] = run_size(size, directory, seed, 
+                                                       file_sizes)
+    return results
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns a list of (size, benchmark, baseline, current) tuples for 
+    every benchmark that got slower than the baseline by more than the 
+    threshold (0.25 means 25% slower) and by more than the noise floor.
+    """
+    regressions = []  # Container type: List
+    for size, timings in results["sizes"].items():
+        for name, seconds in timings.items():
+            before = baseline.get("sizes", {}).get(size, {}).get(name)
+            if (before and seconds > before * (1 + threshold)
+                    and seconds - before > NOISE_FLOOR):
+                regressions.append((size, name, before, seconds))
+    return regressions
+
+def print_results(results):
+    """
+    Prints the results as a table.
+    """
+    for size, timings in results["sizes"].items():
+        print(f"\n{size} movies:")
+        for name, seconds in timings.items():
+            print(f"  {name:<24} {seconds * 1000:12.4f} ms")
+        file_sizes = results.get("bytes", {}).get(size, {})
+        for name, size_bytes in sorted(file_sizes.items()):
+            ratio = size_bytes / file_sizes["csv"] if file_sizes["csv"] else 0
+            print(f"  {name + ' size':<24} {size_bytes:12d} B  "
+                  f"({ratio:.0%} of CSV)")
+
+def main():
+    """
+    Runs the benchmarks from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Movies Library on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", 
+                        default=DEFAULT_SIZES, help="library sizes to time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to a JSON file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="flag regressions against a results file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.seed)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for size, name, before, seconds in regressions:
+            print(f"REGRESSION {name} at {size} movies: "
+                  f"{before * 1000:.4f} ms -> {seconds * 1000:.4f} ms")
+        if regressions:
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+This module writes and reads a binary snapshot of the movies library, kept 
+next to the CSV file. The snapshot holds a header with a checksum, a table 
+of genres, fixed-width movie records sorted by movie ID and a heap of 
+titles. MovieSnapshot opens it through mmap and decodes a movie only 
+when it is accessed. Loading the library from the snapshot still builds 
+every movie, but in one pass over the records that skips parsing and 
+checking the CSV text. The CSV file stays the format that is read and 
+edited by people and other programs.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Mapping
+
+from movie import Movie, GENRES, intern_genre, intern_year, intern_rating
+
+SNAPSHOT_SUFFIX = ".snapshot"  # The snapshot lives next to the CSV file
+MAGIC = b"MVSN"
+VERSION = 1
+
+# Magic, version, genre count, record count, CSV size, CSV modification 
+# time, title heap size and checksum of everything after the header
+HEADER = struct.Struct("<4sHHIQqQI")
+# Movie ID, title offset, title length, year, genre code, padding, rating
+RECORD = struct.Struct("<IIHHBxH")
+
+NO_YEAR = 0
+NO_GENRE = 255
+NO_RATING = 0xFFFF
+
+class SnapshotError(Exception):
+    """
+    Raised when a snapshot is missing, damaged or out of date.
+    """
+
+def get_snapshot_path(file_path):
+    """
+    Returns the path of the binary snapshot of a CSV file.
+    """
+    return file_path + SNAPSHOT_SUFFIX
+
+def _csv_signature(file_path):
+    """
+    Returns the size and modification time of the CSV file, used to tell 
+    if the snapshot still matches it.
+    """
+    status = os.stat(file_path)
+    return status.st_size, status.st_mtime_ns
+
+def _id_number(movie_id):
+    """
+    Returns a movie ID as the number stored in a record, or None if it 
+    cannot be stored and read back unchanged.
+    """
+    try:
+        number = int(movie_id)
+    except (TypeError, ValueError):
+        return None
+    if str(number) != movie_id or not 0 <= number <= 0xFFFFFFFF:
+        return None
+    return number
+
+def _encode(movies):
+    """
+    Encodes the movies into the genre table, record region and title 
+    heap of a snapshot. Raises a SnapshotError if a movie does not fit 
+    the fixed-width records.
+    """
+    genres = list(GENRES)  # Container type: List
+    genre_codes = {genre: code for code, genre in enumerate(genres)}
+    heap = bytearray()
+    records = []  # Container type: List of (movie_id, record)
+    for movie in movies.values():  # Iteration: for loop
+        movie_id = movie.get_id()
+        number = _id_number(movie_id)
+        if number is None:
+            raise SnapshotError(f"Movie ID {movie_id!r} does not fit")
+        title = movie.title.encode("utf-8")
+        if len(title) > 0xFFFF or len(heap) + len(title) > 0xFFFFFFFF:
+            raise SnapshotError(f"Title of movie {movie_id} does not fit")
+        if movie.genre is None:
+            genre_code = NO_GENRE
+        else:
+            genre_code = genre_codes.get(movie.genre)
+            if genre_code is None:
+                if len(genres) == NO_GENRE:
+                    raise SnapshotError("Too many genres")
+                genre_code = genre_codes[movie.genre] = len(genres)
+                genres.append(movie.genre)
+        if movie.rating is None:  # Conditional if-statement
+            rating = NO_RATING
+        else:
+            rating = round(movie.rating * 100)
+            if not 0 <= rating < NO_RATING:  # NO_RATING marks no rating
+                raise SnapshotError(
+                    f"Rating of movie {movie_id} does not fit")
+        year = NO_YEAR if movie.year is None else movie.year
+        records.append((number, RECORD.pack(
+            number, len(heap), len(title), year, genre_code, rating)))
+        heap += title
+    records.sort()  # Records are sorted by ID for lookups by bisection
+    genre_table = b"".join(
+        bytes([len(genre.encode("utf-8"))]) + genre.encode("utf-8") 
+        for genre in genres)
+    return genres, genre_table, b"".join(record for _, record in records), \
+        bytes(heap), len(records)
+
+def write_snapshot(movies, file_path):
+    """
+    Writes the binary snapshot of the movies next to the CSV file, which 
+    must already hold the same movies. Returns False, and removes any old 
+    snapshot, if the movies cannot be stored in the snapshot format.
+    """
+    snapshot_path = get_snapshot_path(file_path)
+    try:
+        genres, genre_table, records, heap, count = _encode(movies)
+    except SnapshotError:
+        remove_snapshot(file_path)
+        return False
+    payload = genre_table + records + heap
+    csv_size, csv_mtime = _csv_signature(file_path)
+    header = HEADER.pack(MAGIC, VERSION, len(genres), count, csv_size, 
+                         csv_mtime, len(heap), zlib.crc32(payload))
+    temp_path = snapshot_path + ".tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(header)
+        file.write(payload)
+    os.replace(temp_path, snapshot_path)  # Readers never see half a file
+    return True
+
+def remove_snapshot(file_path):
+    """
+    Removes the binary snapshot of a CSV file, if there is one.
+    """
+    try:
+        os.remove(get_snapshot_path(file_path))
+    except FileNotFoundError:
+        pass
+
+class MovieSnapshot(Mapping):
+    """
+    A read-only dictionary of movies keyed by movie ID, backed by a 
+    memory-mapped snapshot. Movies are decoded each time they are 
+    accessed.
+    """
+
+    def __init__(self, file_path, check_csv=True, verify=True):
+        """
+        Opens the snapshot of a CSV file. Raises a SnapshotError if it is 
+        missing, damaged, or (when check_csv is set) older than the CSV.
+        """
+        snapshot_path = get_snapshot_path(file_path)
+        try:
+            with open(snapshot_path, 'rb') as file:
+                self._map = mmap.mmap(file.fileno(), 0, 
+                                      access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError) as e:  # Missing or empty
+            raise SnapshotError(f"No snapshot at {snapshot_path}") from e
+        try:
+            self._open(file_path, check_csv, verify)
+        except SnapshotError:
+            self.close()
+            raise
+
+    def _open(self, file_path, check_csv, verify):
+        """
+        Reads and checks the header and genre table.
+        """
+        if len(self._map) < HEADER.size:
+            raise SnapshotError("Snapshot is truncated")
+        magic, version, genre_count, self._count, csv_size, csv_mtime, \
+            heap_size, checksum = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError("Not a movies snapshot")
+        if check_csv:
+            try:
+                if _csv_signature(file_path) != (csv_size, csv_mtime):
+                    raise SnapshotError("Snapshot is older than the CSV")
+            except FileNotFoundError as e:
+                raise SnapshotError("CSV file is missing") from e
+        if verify and zlib.crc32(memoryview(self._map)[HEADER.size:]) != \
+                checksum:
+            raise SnapshotError("Snapshot checksum does not match")
+
+        self._genres = []  # Container type: List
+        offset = HEADER.size
+        try:
+            for _ in range(genre_count):  # Iteration: for loop
+                length = self._map[offset]
+                self._genres.append(
+                    self._map[offset + 1:offset + 1 + length].decode("utf-8"))
+                offset += 1 + length
+        except (IndexError, UnicodeDecodeError) as e:
+            raise SnapshotError("Genre table is damaged") from e
+        self._records_start = offset
+        self._heap_start = offset + self._count * RECORD.size
+        if self._heap_start + heap_size != len(self._map):
+            raise SnapshotError("Snapshot size does not match its header")
+
+    def close(self):
+        """
+        Closes the memory map.
+        """
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """
+        Returns the number of movies in the snapshot.
+        """
+        return self._count
+
+    def _id_at(self, position):
+        """
+        Returns the numeric ID of the record at a position.
+        """
+        return struct.unpack_from(
+            "<I", self._map, self._records_start + position * RECORD.size)[0]
+
+    def _decode(self, fields):
+        """
+        Creates a Movie object from the fields of a record.
+        """
+        movie_id, title_offset, title_length, year, genre_code, rating = \
+            fields
+        start = self._heap_start + title_offset
+        title = self._map[start:start + title_length].decode("utf-8")
+        return Movie(str(movie_id), title, 
+                     None if year == NO_YEAR else year,
+                     None if genre_code == NO_GENRE 
+                     else self._genres[genre_code],
+                     None if rating == NO_RATING else rating / 100)
+
+    def movie_at(self, position):
+        """
+        Decodes the movie at a position, in order of movie ID.
+        """
+        return self._decode(RECORD.unpack_from(
+            self._map, self._records_start + position * RECORD.size))
+
+    def __getitem__(self, movie_id):
+        """
+        Finds a movie by ID with a binary search over the records.
+        """
+        number = _id_number(movie_id)
+        low, high = 0, self._count
+        while number is not None and low < high:  # Iteration: while loop
+            middle = (low + high) // 2
+            middle_id = self._id_at(middle)
+            if middle_id < number:
+                low = middle + 1
+            elif middle_id > number:
+                high = middle
+            else:
+                return self.movie_at(middle)
+        raise KeyError(movie_id)
+
+    def __iter__(self):
+        """
+        Yields the movie IDs in increasing order.
+        """
+        for position in range(self._count):  # Iteration: for loop
+            yield str(self._id_at(position))
+
+    def iter_records(self):
+        """
+        Yields the (movie_id, title, year, genre, rating) record of every 
+        movie in order of movie ID. The year, genre and rating are the 
+        shared copies that Movie objects hold, so the records can be 
+        turned into movies with Movie.from_stored.
+        """
+        genres = [intern_genre(genre) for genre in self._genres]
+        genres += [None] * (NO_GENRE + 1 - len(genres))  # Unused codes
+        years = {NO_YEAR: None}  # Container type: Dictionary
+        ratings = {NO_RATING: None}
+        heap = self._map[self._heap_start:]  # One copy of all the titles
+        records = memoryview(self._map)[
+            self._records_start:self._heap_start]
+        for movie_id, title_offset, title_length, year, genre_code, \
+                rating in RECORD.iter_unpack(records):
+            if year not in years:  # Conditional if-statement
+                years[year] = intern_year(year)
+            if rating not in ratings:
+                ratings[rating] = intern_rating(rating / 100)
+            yield (str(movie_id), 
+                   heap[title_offset:title_offset + title_length].decode(
+                       "utf-8"), 
+                   years[year], genres[genre_code], ratings[rating])
+        records.release()
+
+    def iter_movies(self):
+        """
+        Yields every movie in order of movie ID, decoding one at a time.
+        """
+        for record in self.iter_records():  # Iteration: for loop
+            yield Movie.from_stored(*record)
+
+    def high_water(self):
+        """
+        Returns the highest movie ID in the snapshot, or 0 if it is empty.
+        """
+        return self._id_at(self._count - 1) if self._count else 0
+
+    def values(self):
+        """
+        Returns an iterator over the movies in order of movie ID, which 
+        decodes the records in one pass instead of looking up each ID.
+        """
+        return self.iter_movies()
+
+def read_movies_from_snapshot(file_path, movies):
+    """
+    Adds the movies of an up-to-date snapshot to the movies dictionary. 
+    Raises a SnapshotError if the snapshot cannot be used, in which case 
+    the CSV file has to be read instead.
+    """
+    with MovieSnapshot(file_path) as snapshot:
+        if hasattr(movies, "add_records"):  # Indexes in bulk
+            movies.add_records(snapshot.iter_records(), 
+                               high_water=snapshot.high_water())
+        else:
+            for movie in snapshot.iter_movies():  # Iteration: for loop
+                movies[movie.get_id()] = movie
+    return movies
+
+def import_csv(file_path):
+    """
+    Builds the snapshot of a CSV file.
+    """
+    from file_operations import read_movies_from_file
+    movies = read_movies_from_file(file_path)
+    if write_snapshot(movies, file_path):
+        print(f"Snapshot of {len(movies)} movies written to "
+              f"{get_snapshot_path(file_path)}.")
+    else:
+        print(f"The movies in {file_path} cannot be stored in a snapshot.")
+
+def export_csv(file_path, output_path):
+    """
+    Writes the movies of a snapshot to a CSV file.
+    """
+    from file_operations import write_movies_to_file
+    with MovieSnapshot(file_path, check_csv=False) as snapshot:
+        movies = {movie.get_id(): movie for movie in snapshot.iter_movies()}
+    write_movies_to_file(movies, output_path)
+
+def main():
+    """
+    Builds snapshots from CSV files and exports them back to CSV.
+    """
+    import argparse  # Only the command line needs it, not the loader
+    parser = argparse.ArgumentParser(
+        description="Import or export the binary snapshot of a library.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser(
+        "import", help="build the snapshot of a CSV file")
+    import_parser.add_argument("csv_file")
+    export_parser = commands.add_parser(
+        "export", help="write the movies of a snapshot to a CSV file")
+    export_parser.add_argument("csv_file", 
+                               help="the CSV file the snapshot belongs to")
+    export_parser.add_argument("output_file")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "import":
+            import_csv(args.csv_file)
+        else:
+            export_csv(args.csv_file, args.output_file)
+    except SnapshotError as e:
+        parser.exit(1, f"Snapshot error: {e}\n")
+
+if __name__ == "__main__":
+    main()
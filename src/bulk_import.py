@@ -0,0 +1,216 @@
+"""
+Imports movies in bulk from CSV or JSON Lines dumps without the 
+interactive prompts. Rows are parsed and validated in a pool of worker 
+processes, checked against the titles already in the library, given IDs 
+in one batch and stored with a single write at the end.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from movie import Movie
+from storage import open_repository
+from library_service import validate_record
+
+CHUNK_LINES = 20000  # Lines handed to a worker at a time
+MAX_EXAMPLES = 10  # Rejected rows shown in the summary
+
+def parse_chunk(file_format, header, first_line, lines):
+    """
+    Parses and validates a chunk of lines in a worker process. Returns the 
+    valid (line, title, year, genre, rating) tuples and the rejected 
+    (line, reason) pairs.
+    """
+    accepted = []  # Container type: List
+    rejected = []
+    if file_format == "csv":
+        reader = csv.reader(lines)
+        rows = ((first_line + reader.line_num - 1, row) for row in reader)
+    else:
+        rows = ((first_line + offset, line) 
+                for offset, line in enumerate(lines))
+    for line_number, row in rows:  # Iteration: for loop
+        try:
+            if file_format == "csv":
+                if not row:
+                    continue  # Skips blank lines
+                record = dict(zip(header, row))
+            else:
+                if not row.strip():
+                    continue  # Skips blank lines
+                record = json.loads(row)
+                if not isinstance(record, dict):
+                    raise ValueError("not a JSON object")
+            accepted.append((line_number,) + validate_record(record))
+        except ValueError as e:  # JSON errors are ValueErrors too
+            reason = "invalid JSON" if isinstance(e, json.JSONDecodeError) \
+                else str(e)
+            rejected.append((line_number, reason))
+    return accepted, rejected
+
+def read_chunks(file_path, file_format):
+    """
+    Reads a dump in chunks of whole records. Yields the header (for CSV), 
+    and then (first line number, lines) pairs. A CSV chunk only ends where 
+    no quoted field is open, so titles with line breaks stay whole.
+    """
+    with open(file_path, 'r', newline='', encoding='utf-8') as file:
+        header = None
+        line_number = 1
+        if file_format == "csv":
+            header = [name.strip().lower() 
+                      for name in next(csv.reader([file.readline()]), [])]
+            line_number = 2
+        yield header
+        chunk = []  # Container type: List
+        first_line = line_number
+        quotes = 0
+        for line in file:  # Iteration: for loop
+            chunk.append(line)
+            quotes += line.count('"')
+            line_number += 1
+            if len(chunk) >= CHUNK_LINES and quotes % 2 == 0:
+                yield first_line, chunk
+                chunk, first_line, quotes = [], line_number, 0
+        if chunk:
+            yield first_line, chunk
+
+class ImportSummary:
+    """
+    A class to hold the outcome of a bulk import.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty summary.
+        """
+        self.rows = 0
+        self.imported = 0
+        self.reasons = Counter()  # Container type: Counter (a dictionary)
+        self.examples = []  # Container type: List of (line, reason)
+        self.seconds = 0.0
+
+    def reject(self, line_number, reason):
+        """
+        Counts a rejected row.
+        """
+        self.reasons[reason] += 1
+        if len(self.examples) < MAX_EXAMPLES:
+            self.examples.append((line_number, reason))
+
+    def report(self):
+        """
+        Returns the summary as text.
+        """
+        rate = self.rows / self.seconds if self.seconds else 0
+        lines = [f"Read {self.rows} rows in {self.seconds:.2f}s "
+                 f"({rate:,.0f} rows/sec).",
+                 f"Imported {self.imported} movies, rejected "
+                 f"{sum(self.reasons.values())} rows."]
+        for reason, count in self.reasons.most_common():
+            lines.append(f"  {count:>8}  {reason}")
+        for line_number, reason in self.examples:
+            lines.append(f"  line {line_number}: {reason}")
+        return "\n".join(lines)
+
+def parse_file(file_path, file_format, workers=None):
+    """
+    Parses and validates a dump with a pool of worker processes. Yields 
+    the accepted and rejected rows of each chunk in file order.
+    """
+    chunks = read_chunks(file_path, file_format)
+    header = next(chunks)
+    if file_format == "csv" and not {"title", "year", "genre"} <= \
+            set(header or ()):
+        raise ValueError("The CSV header must name the title, year and "
+                         "genre columns")
+    if workers == 1:
+        for first_line, lines in chunks:  # Iteration: for loop
+            yield parse_chunk(file_format, header, first_line, lines)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keeps a bounded number of chunks in flight, in file order
+        pending = []  # Container type: List of futures
+        limit = (workers or os.cpu_count() or 1) * 2
+        for first_line, lines in chunks:
+            pending.append(pool.submit(parse_chunk, file_format, header, 
+                                       first_line, lines))
+            if len(pending) >= limit:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+def import_movies(movies, storage, file_path, file_format=None, 
+                  workers=None):
+    """
+    Imports the movies of a CSV or JSON Lines dump into the library and 
+    stores them with one batch write. Titles already in the library, or 
+    repeated in the dump, are rejected. Returns an ImportSummary.
+    """
+    if file_format is None:
+        file_format = "jsonl" if file_path.endswith((".jsonl", ".json")) \
+            else "csv"
+    summary = ImportSummary()
+    started = time.perf_counter()
+    new_titles = set()  # Container type: Set
+    valid = []  # Container type: List
+    for accepted, rejected in parse_file(file_path, file_format, workers):
+        summary.rows += len(accepted) + len(rejected)
+        for line_number, reason in rejected:
+            summary.reject(line_number, reason)
+        for line_number, title, year, genre, rating in accepted:
+            if title in new_titles or movies.has_title(title):
+                summary.reject(line_number, "duplicate title")
+                continue
+            try:  # The storage may not be able to keep the values
+                storage.check_fields(None, {"title": title, "year": year, 
+                                            "genre": genre})
+            except ValueError as e:
+                summary.reject(line_number, str(e))
+                continue
+            new_titles.add(title)
+            valid.append((title, year, genre, rating))
+
+    ids = storage.new_movie_ids(  # One batch of IDs
+        movies, [(title, year, genre) for title, year, genre, _ in valid])
+    new_movies = [Movie(movie_id, title, year, genre, rating)
+                  for movie_id, (title, year, genre, rating) 
+                  in zip(ids, valid)]
+    movies.add_many(new_movies)
+    storage.batch(puts=new_movies)  # Stores everything in one write
+    summary.imported = len(new_movies)
+    summary.seconds = time.perf_counter() - started
+    return summary
+
+def main():
+    """
+    Imports a dump into the configured library from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Import movies in bulk from a CSV or JSON Lines file.")
+    parser.add_argument("file", help="the CSV or JSON Lines file to import")
+    parser.add_argument("--format", choices=("csv", "jsonl"),
+                        help="the file format (default: from the extension)")
+    parser.add_argument("--workers", type=int, 
+                        help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    storage = open_repository()
+    storage.create()
+    movies = storage.load()
+    try:
+        summary = import_movies(movies, storage, args.file, args.format, 
+                                args.workers)
+    except (OSError, ValueError) as e:
+        parser.exit(1, f"Import failed: {e}\n")
+    finally:
+        storage.close()
+    print(summary.report())
+
+if __name__ == "__main__":
+    main()
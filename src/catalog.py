@@ -0,0 +1,323 @@
+"""
+Keeps one shared catalog of movies (ID, title, year and genre) for many 
+users, and for each user a small ratings file that refers to catalog IDs. 
+A user's library joins the two: only the user's ratings file is read, 
+and each movie is looked up in the memory-mapped binary snapshot of the 
+catalog. Averages across all users are computed by worker processes 
+that each stream through a share of the ratings files.
+
+Usage:
+    python catalog.py migrate alice movies.csv
+    python catalog.py averages --top 20
+"""
+
+import csv
+import glob
+import os
+
+from movie import Movie, normalize_title
+from movie_library import MovieLibrary
+from binary_snapshot import MovieSnapshot, SnapshotError, write_snapshot
+from file_operations import create_initial_csv, read_movies_from_file, \
+    write_movies_to_file, iter_movies_from_file
+from rating_stats import rating_to_hundredths
+from locking import FileLock, read_high_water, write_high_water, \
+    file_signature
+
+CATALOG_FILE = "catalog.csv"  # Shared movies, in the movies CSV format
+RATINGS_DIR = "ratings"  # One <user>.csv ratings file per user
+FILES_PER_TASK = 64  # Ratings files summed by a worker at a time
+
+class Catalog:
+    """
+    The shared movies of all users. Lookups by ID go through the binary 
+    snapshot, so they read only the records they need; finding a movie 
+    by title or changing the catalog loads it whole. Entries are only 
+    ever added, never changed, since other users share them. New IDs are 
+    handed out under the catalog's lock file, like the IDs of a 
+    CsvRepository, so processes adding movies at the same time never 
+    clash.
+    """
+
+    def __init__(self, file_path=CATALOG_FILE):
+        """
+        Initializes the catalog stored in a CSV file.
+        """
+        self.file_path = file_path
+        self._snapshot = None  # Opened on the first lookup
+        self._movies = None  # Loaded on the first search or change
+        self._titles = None  # Container type: Dictionary (title, year) -> id
+        self._added = {}  # Container type: Dictionary (id -> unsaved Movie)
+        self._signature = None  # Of the catalog file when it was read
+        self._lock = FileLock(file_path)
+
+    def create(self):
+        """
+        Creates the catalog file if it does not exist.
+        """
+        if not os.path.exists(self.file_path):
+            create_initial_csv(self.file_path)
+
+    def _lookup(self):
+        """
+        Returns the mapping that movies are looked up in: the loaded 
+        catalog if there is one, else its snapshot, written first if it 
+        is missing or older than the catalog.
+        """
+        if self._movies is not None:
+            return self._movies
+        if self._snapshot is None:
+            try:
+                self._snapshot = MovieSnapshot(self.file_path, verify=False)
+            except SnapshotError:
+                movies = self.load()
+                write_snapshot(movies, self.file_path)
+                return movies
+        return self._snapshot
+
+    def get(self, movie_id):
+        """
+        Returns the catalog movie with the given ID, or None.
+        """
+        return self._lookup().get(movie_id)
+
+    def high_water(self):
+        """
+        Returns the highest movie ID in the catalog, or 0 if it is empty.
+        """
+        lookup = self._lookup()
+        if isinstance(lookup, MovieSnapshot):
+            return lookup.high_water()
+        return lookup.id_allocator.high_water
+
+    def load(self):
+        """
+        Loads the whole catalog and returns it as a MovieLibrary.
+        """
+        if self._movies is None:
+            with self._lock.shared():
+                self._read()
+        return self._movies
+
+    def _read(self):
+        """
+        Reads the whole catalog file, keeping the movies added since the 
+        last save. The caller holds the lock.
+        """
+        self.close()  # Lookups now use the loaded catalog
+        self._signature = file_signature(self.file_path)
+        self._movies = MovieLibrary()
+        if os.path.exists(self.file_path):
+            self._movies.add_many(iter_movies_from_file(self.file_path))
+        for movie_id, movie in self._added.items():  # Iteration: for loop
+            self._movies[movie_id] = movie
+        self._titles = {(normalize_title(movie.title), movie.year): 
+                        movie_id 
+                        for movie_id, movie in self._movies.items()}
+
+    def _read_if_changed(self):
+        """
+        Reads the catalog again if another process has rewritten it since 
+        it was read. The caller holds the lock.
+        """
+        if file_signature(self.file_path) != self._signature:
+            self._read()
+
+    def find(self, title, year):
+        """
+        Returns the ID of the catalog movie with the title and year, or 
+        None if the catalog has none.
+        """
+        self.load()
+        return self._titles.get((normalize_title(title), year))
+
+    def add(self, title, year, genre):
+        """
+        Returns the ID of the catalog movie with the title and year, 
+        adding the movie first if the catalog has none. Changes are 
+        written by save.
+        """
+        movie_id = self.find(title, year)
+        if movie_id is not None:
+            return movie_id
+        key = (normalize_title(title), year)
+        with self._lock.exclusive() as lock_file:
+            self._read_if_changed()  # Another process may have added it
+            movie_id = self._titles.get(key)
+            if movie_id is not None:
+                return movie_id
+            # The lock file records the highest ID any process handed out
+            allocator = self._movies.id_allocator
+            allocator.observe(read_high_water(lock_file))
+            movie_id = allocator.next_id()
+            write_high_water(lock_file, allocator.high_water)
+        movie = Movie(movie_id, title, year, genre)
+        self._movies[movie_id] = movie
+        self._added[movie_id] = movie
+        self._titles[key] = movie_id
+        return movie_id
+
+    def save(self):
+        """
+        Writes the catalog and its snapshot if movies were added. The 
+        catalog is read again under the lock first, so the movies other 
+        processes added meanwhile are kept.
+        """
+        if not self._added:
+            return
+        with self._lock.exclusive():
+            self._read_if_changed()
+            if write_movies_to_file(self._movies, self.file_path):
+                self._signature = file_signature(self.file_path)
+                self._added = {}
+
+    def close(self):
+        """
+        Releases the snapshot.
+        """
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+def get_ratings_path(user, ratings_dir=RATINGS_DIR):
+    """
+    Returns the path of a user's ratings file.
+    """
+    return os.path.join(ratings_dir, f"{user}.csv")
+
+def read_ratings(file_path):
+    """
+    Yields the (movie_id, rating) pairs of a ratings file; the rating is 
+    None for movies the user has not rated.
+    """
+    with open(file_path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)  # Skips the header
+        for row in reader:  # Iteration: for loop
+            if len(row) != 2:
+                continue  # Skips damaged rows
+            yield row[0], float(row[1]) if row[1] else None
+
+def write_ratings(movies, file_path):
+    """
+    Writes the (movie_id, rating) pairs of a user's movies to a ratings 
+    file, through a temporary file that replaces it.
+    """
+    temp_path = file_path + ".tmp"
+    with open(temp_path, 'w', newline='') as file:
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(["movie_id", "rating"])
+        writer.writerows((movie.get_id(), "" if movie.rating is None 
+                          else f"{movie.rating:.2f}") 
+                         for movie in movies.values())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, file_path)
+
+def sum_ratings(file_paths):
+    """
+    Streams through ratings files and returns, for each movie ID, the 
+    number of ratings and their sum in hundredths. Runs in a worker 
+    process.
+    """
+    totals = {}  # Container type: Dictionary (movie_id -> [count, sum])
+    for file_path in file_paths:  # Iteration: for loop
+        for movie_id, rating in read_ratings(file_path):
+            if rating is None:
+                continue
+            total = totals.get(movie_id)
+            if total is None:
+                totals[movie_id] = [1, rating_to_hundredths(rating)]
+            else:
+                total[0] += 1
+                total[1] += rating_to_hundredths(rating)
+    return totals
+
+def average_ratings(ratings_dir=RATINGS_DIR, workers=None):
+    """
+    Returns a dictionary of (number of ratings, average rating) by movie 
+    ID across the ratings files of all users. The files are split among 
+    worker processes, or summed in this process when workers is 1.
+    """
+    file_paths = sorted(glob.glob(os.path.join(ratings_dir, "*.csv")))
+    tasks = [file_paths[start:start + FILES_PER_TASK] 
+             for start in range(0, len(file_paths), FILES_PER_TASK)]
+    if workers == 1 or len(tasks) <= 1:
+        totals = _merge(map(sum_ratings, tasks))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            totals = _merge(pool.map(sum_ratings, tasks))
+    return {movie_id: (count, round(total / count / 100, 2)) 
+            for movie_id, (count, total) in totals.items()}
+
+def _merge(partials):
+    """
+    Adds up the partial totals of the workers.
+    """
+    totals = {}  # Container type: Dictionary
+    for partial in partials:  # Iteration: for loop
+        for movie_id, (count, total) in partial.items():
+            current = totals.get(movie_id)
+            if current is None:
+                totals[movie_id] = [count, total]
+            else:
+                current[0] += count
+                current[1] += total
+    return totals
+
+def migrate(user, file_path, catalog, ratings_dir=RATINGS_DIR):
+    """
+    Moves the movies of a per-user movies CSV file into the catalog and 
+    writes the user's ratings file. Movies already in the catalog (same 
+    title and year) are shared. Returns the number of movies migrated.
+    """
+    user_movies = MovieLibrary()
+    for movie in read_movies_from_file(file_path).values():
+        movie_id = catalog.add(movie.title, movie.year, movie.genre)
+        user_movies[movie_id] = Movie(movie_id, movie.title, movie.year, 
+                                      movie.genre, movie.rating)
+    catalog.save()
+    os.makedirs(ratings_dir, exist_ok=True)
+    write_ratings(user_movies, get_ratings_path(user, ratings_dir))
+    return len(user_movies)
+
+def main():
+    """
+    Migrates per-user files and reports averages across users from the 
+    command line.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Manage the shared movie catalog and user ratings.")
+    parser.add_argument("--catalog", default=CATALOG_FILE)
+    parser.add_argument("--ratings-dir", default=RATINGS_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser(
+        "migrate", help="move a user's movies CSV into the catalog")
+    migrate_parser.add_argument("user")
+    migrate_parser.add_argument("csv_file")
+    averages_parser = commands.add_parser(
+        "averages", help="average rating of each movie across users")
+    averages_parser.add_argument("--top", type=int, default=20)
+    averages_parser.add_argument("--min-ratings", type=int, default=1)
+    averages_parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    catalog = Catalog(args.catalog)
+    if args.command == "migrate":
+        count = migrate(args.user, args.csv_file, catalog, args.ratings_dir)
+        print(f"Migrated {count} movies of {args.user}.")
+    else:
+        averages = average_ratings(args.ratings_dir, args.workers)
+        ranked = sorted(((average, count, movie_id) 
+                         for movie_id, (count, average) in averages.items()
+                         if count >= args.min_ratings), reverse=True)
+        for average, count, movie_id in ranked[:args.top]:
+            movie = catalog.get(movie_id)
+            title = movie.title if movie is not None else f"#{movie_id}"
+            print(f"{average:5.2f} ({count} ratings) {title}")
+    catalog.close()
+
+if __name__ == "__main__":
+    main()
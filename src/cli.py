@@ -0,0 +1,206 @@
+"""
+Drives the Movies Library from the command line without the interactive 
+menu, for scripts and automation:
+
+    python cli.py add "Tenet" 2020 Sci-Fi --rating 7.8
+    python cli.py query --genre Crime --year-range 1990 1999
+    python cli.py stats --json
+    python cli.py shell < commands.txt
+
+The shell command reads one command per line from standard input and 
+runs them all against a library loaded once; undo and redo step through 
+the changes made in it. Results are printed to 
+standard output; status messages of the storage go to standard error, 
+as do the timings of the hot paths with --stats.
+"""
+
+import argparse
+import json
+import shlex
+import sys
+from contextlib import redirect_stdout
+
+from movie import GENRES
+from library_service import LibraryService, movie_to_dict
+from history import History, describe
+from storage import BACKENDS, open_repository
+from instrumentation import enable, stats, format_stats
+
+def build_parser(shell=False):
+    """
+    Returns the parser of the library commands. undo and redo only have 
+    changes to step through inside a shell, so they are only accepted by 
+    the parser of shell commands.
+    """
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Manage the Watched Movies Library.")
+    parser.add_argument("--json", action="store_true", 
+                        help="print results as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a movie")
+    add.add_argument("title")
+    add.add_argument("year", type=int)
+    add.add_argument("genre", choices=GENRES)
+    add.add_argument("--rating", type=float)
+
+    edit = commands.add_parser("edit", help="change fields of a movie")
+    edit.add_argument("movie_id")
+    edit.add_argument("--title")
+    edit.add_argument("--year", type=int)
+    edit.add_argument("--genre", choices=GENRES)
+    edit.add_argument("--rating", type=float)
+
+    delete = commands.add_parser("delete", help="delete a movie")
+    delete.add_argument("movie_id")
+
+    listing = commands.add_parser("list", help="list movies by title")
+    listing.add_argument("--page", type=int)
+    listing.add_argument("--page-size", type=int, default=50)
+
+    query = commands.add_parser("query", help="filter movies")
+    query.add_argument("--genre", choices=GENRES)
+    query.add_argument("--year-range", type=int, nargs=2, 
+                       metavar=("FIRST", "LAST"))
+    query.add_argument("--rating-range", type=float, nargs=2, 
+                       metavar=("LOWEST", "HIGHEST"))
+
+    find = commands.add_parser("find", help="search titles")
+    find.add_argument("query")
+    find.add_argument("--limit", type=int, default=10)
+
+    commands.add_parser("stats", help="show rating statistics")
+
+    import_file = commands.add_parser("import", 
+                                      help="import a CSV or JSON Lines dump")
+    import_file.add_argument("file")
+    import_file.add_argument("--format", choices=("csv", "jsonl"))
+    import_file.add_argument("--workers", type=int)
+
+    export = commands.add_parser("export", help="write movies to a CSV file")
+    export.add_argument("file")
+    export.add_argument("--genre", choices=GENRES)
+
+    if shell:  # Conditional if-statement
+        commands.add_parser("undo", help="undo the last change of the shell")
+        commands.add_parser("redo", help="redo the last undone change")
+    commands.add_parser("shell", help="run commands read from stdin")
+    return parser
+
+def run_command(service, args):
+    """
+    Runs one parsed command and returns its result: a movie, a list of 
+    movies or a dictionary.
+    """
+    if args.command == "add":
+        return service.add(args.title, args.year, args.genre, args.rating)
+    if args.command == "edit":
+        changes = {field: getattr(args, field) 
+                   for field in ("title", "year", "genre", "rating") 
+                   if getattr(args, field) is not None}
+        return service.edit(args.movie_id, **changes)
+    if args.command == "delete":
+        return service.delete(args.movie_id)
+    if args.command == "list":
+        return service.list_movies(args.page, args.page_size)
+    if args.command == "query":
+        return service.filter_movies(args.genre, args.year_range, 
+                                     args.rating_range)
+    if args.command == "find":
+        return service.find(args.query, args.limit)
+    if args.command == "stats":
+        return service.stats()
+    if args.command == "import":
+        summary = service.import_file(args.file, args.format, args.workers)
+        return {"rows": summary.rows, "imported": summary.imported, 
+                "rejected": dict(summary.reasons)}
+    if args.command == "export":
+        movies = service.filter_movies(args.genre) if args.genre else None
+        return {"exported": service.export(args.file, movies), 
+                "file": args.file}
+    if args.command == "undo":
+        return {"undone": describe(service.undo())}
+    if args.command == "redo":
+        return {"redone": describe(service.redo())}
+    raise ValueError(f"Unknown command {args.command}")
+
+def print_result(result, as_json, out):
+    """
+    Prints the result of a command as text or as one line of JSON.
+    """
+    if isinstance(result, list):
+        result = [movie_to_dict(movie) for movie in result] if as_json \
+            else result
+    elif not isinstance(result, dict):
+        result = movie_to_dict(result) if as_json else [result]
+    if as_json:
+        print(json.dumps(result), file=out)
+    elif isinstance(result, dict):
+        for key, value in result.items():  # Iteration: for loop
+            print(f"{key}: {value}", file=out)
+    else:
+        for movie in result:  # Iteration: for loop
+            print(f"{movie.get_id()}. {movie}", file=out)
+
+def run_shell(service, parser, lines, as_json, out):
+    """
+    Runs one command per line against the same library. A failing 
+    command is reported and the following ones still run. Returns the 
+    number of failed commands.
+    """
+    failures = 0
+    for line_number, line in enumerate(lines, 1):  # Iteration: for loop
+        words = shlex.split(line, comments=True)
+        if not words:
+            continue  # Skips blank lines and comments
+        try:
+            args = parser.parse_args(words)
+            if args.command == "shell":
+                raise ValueError("shell cannot be nested")
+            print_result(run_command(service, args), 
+                         as_json or args.json, out)
+        except SystemExit:  # argparse has already explained the error
+            failures += 1
+        except (KeyError, ValueError, OSError) as e:
+            failures += 1
+            print(f"line {line_number}: {e}", file=sys.stderr)
+    return failures
+
+def main(argv=None):
+    """
+    Runs a command, or a stream of commands from stdin, from the command 
+    line. Returns the exit status.
+    """
+    parser = build_parser()
+    parser.add_argument("--storage", choices=sorted(BACKENDS), 
+                        help="the storage backend (default: library.ini)")
+    parser.add_argument("--path", help="the library file")
+    parser.add_argument("--stats", action="store_true", 
+                        help="print the timings of the hot paths to stderr")
+    args = parser.parse_args(argv)
+    out = sys.stdout
+    if args.stats:
+        enable()
+
+    storage = open_repository(backend=args.storage, path=args.path)
+    with redirect_stdout(sys.stderr):  # Keeps stdout for the results
+        storage.create()
+        service = LibraryService(storage.load(), storage, History())
+        try:
+            if args.command == "shell":
+                failures = run_shell(service, build_parser(shell=True), 
+                                     sys.stdin, args.json, out)
+                return 1 if failures else 0
+            print_result(run_command(service, args), args.json, out)
+        except (KeyError, ValueError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        finally:
+            storage.close()
+            if args.stats:
+                print(json.dumps(stats()) if args.json else format_stats(), 
+                      file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
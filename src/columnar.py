@@ -0,0 +1,369 @@
+"""
+Exports the movies library to a compressed columnar archive and imports 
+it back, for keeping copies and moving libraries between hosts. The 
+movies are sorted by ID and cut into chunks of CHUNK_ROWS movies; each 
+chunk stores five columns:
+
+    ids       differences between consecutive movie IDs (mostly 1)
+    years     differences between consecutive years, 0 for no year
+    genres    one byte per movie, the index in GENRES or the genre table
+    ratings   hundredths of a point in two bytes, 0xFFFF for no rating
+    titles    the byte length of each title, then the UTF-8 titles
+
+Every column of every chunk is compressed on its own with zlib or lzma, 
+so the blocks are compressed and decompressed in parallel threads; both 
+libraries release the GIL while they work.
+
+Usage:
+    python columnar.py export movies.csv library.mvc --codec lzma
+    python columnar.py import library.mvc movies.csv
+"""
+
+import gc
+import os
+import struct
+import sys
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from operator import attrgetter, ge, sub
+
+from movie import Movie, GENRES
+
+MAGIC = b"MVCL"
+VERSION = 1
+CODECS = ("zlib", "lzma")  # The codec number is the position
+CHUNK_ROWS = 65536  # Movies per chunk
+ZLIB_LEVEL = 6
+LZMA_PRESET = 6
+
+# Magic, version, codec, movie count, chunk count and genre count
+HEADER = struct.Struct("<4sHBxIIH")
+CHUNK = struct.Struct("<I")  # Movies in the chunk
+BLOCK = struct.Struct("<II")  # Compressed size and size of the column
+COLUMNS = ("ids", "years", "genres", "ratings", "titles")
+
+NO_YEAR = 0
+NO_GENRE = 255
+NO_RATING = 0xFFFF
+
+class ColumnarError(Exception):
+    """
+    Raised when movies do not fit the archive format, or an archive is 
+    damaged or not an archive.
+    """
+
+def _little_endian(column):
+    """
+    Returns the bytes of an array in little-endian order.
+    """
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+def _from_little_endian(typecode, data):
+    """
+    Returns the array of the given type stored in little-endian bytes.
+    """
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+def _compressor(codec):
+    """
+    Returns the function that compresses one block with a codec.
+    """
+    if codec == "lzma":
+        import lzma  # Imported on first use, zlib archives skip it
+        return lambda data: lzma.compress(data, preset=LZMA_PRESET)
+    return lambda data: zlib.compress(data, ZLIB_LEVEL)
+
+def _decompressor(codec):
+    """
+    Returns the function that decompresses one block of a codec and the 
+    error it raises for a damaged block.
+    """
+    if codec == "lzma":
+        import lzma
+        return lzma.decompress, lzma.LZMAError
+    return zlib.decompress, zlib.error
+
+def _deltas(values):
+    """
+    Returns the differences between consecutive values, the first taken 
+    from 0.
+    """
+    return map(sub, values, [0] + values[:-1])
+
+def _encode_chunk(numbers, movies, genre_codes, genres):
+    """
+    Encodes the columns of a chunk of movies, given in order of movie ID 
+    with their ID numbers, one column at a time. New genres are added to 
+    genres and genre_codes. Returns the raw column blocks.
+    """
+    years = [year or NO_YEAR for year in map(attrgetter("year"), movies)]
+    genre_names = list(map(attrgetter("genre"), movies))
+    for genre in set(genre_names) - genre_codes.keys():  # New genres
+        if len(genres) == NO_GENRE:
+            raise ColumnarError("Too many genres")
+        genre_codes[genre] = len(genres)
+        genres.append(genre)
+    ratings = list(map(attrgetter("rating"), movies))
+    rating_codes = {rating: round(rating * 100)  # Container: Dictionary
+                    for rating in set(ratings) if rating is not None}
+    if rating_codes and not 0 <= min(rating_codes.values()) <= \
+            max(rating_codes.values()) <= 1000:
+        raise ColumnarError("A rating is outside 0 to 10")
+    rating_codes[None] = NO_RATING
+    titles = list(map(attrgetter("title"), movies))
+    blob = "".join(titles).encode("utf-8")
+    if len(blob) != sum(map(len, titles)):  # Not every title is ASCII
+        titles = [title.encode("utf-8") for title in titles]
+    try:
+        lengths = array('H', map(len, titles))
+    except OverflowError:
+        raise ColumnarError("A title is too long for the archive") from None
+    return [_little_endian(array('I', _deltas(numbers))), 
+            _little_endian(array('h', _deltas(years))), 
+            bytes(map(genre_codes.__getitem__, genre_names)), 
+            _little_endian(array('H', map(rating_codes.__getitem__, 
+                                          ratings))), 
+            _little_endian(lengths) + blob]
+
+def _sorted_by_id(movies):
+    """
+    Returns the movie ID numbers and the movies in order of movie ID. 
+    Raises a ColumnarError if an ID is not a number that fits in four 
+    bytes.
+    """
+    movie_ids = list(movies.keys())  # Container type: List
+    try:
+        numbers = list(map(int, movie_ids))
+    except (TypeError, ValueError):
+        numbers = None
+    if numbers is None or list(map(str, numbers)) != movie_ids or \
+            (numbers and not 0 <= min(numbers) <= max(numbers) <= 0xFFFFFFFF):
+        raise ColumnarError("Movie IDs do not fit the archive")
+    values = list(movies.values())
+    if any(map(ge, numbers, numbers[1:])):  # Not already in order
+        order = sorted(range(len(numbers)), key=numbers.__getitem__)
+        numbers = [numbers[index] for index in order]
+        values = [values[index] for index in order]
+    return numbers, values
+
+def export_columnar(movies, file_path, codec="zlib", chunk_rows=CHUNK_ROWS, 
+                    workers=None):
+    """
+    Writes the movies dictionary to a columnar archive, compressing the 
+    blocks in up to workers threads (by default one per CPU). The archive 
+    is written to a temporary file that replaces file_path once it is 
+    complete. Returns the size of the archive in bytes.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec {codec!r}")
+    numbers, movies = _sorted_by_id(movies)
+    genres = list(GENRES)  # Container type: List
+    genre_codes = {genre: code for code, genre in enumerate(genres)}
+    genre_codes[None] = NO_GENRE
+    starts = range(0, len(numbers), chunk_rows)
+    raw_blocks = [block for start in starts for block in _encode_chunk(
+        numbers[start:start + chunk_rows], movies[start:start + chunk_rows], 
+        genre_codes, genres)]
+    with ThreadPoolExecutor(workers) as pool:
+        compressed = list(pool.map(_compressor(codec), raw_blocks))
+
+    genre_table = b"".join(
+        bytes([len(genre.encode("utf-8"))]) + genre.encode("utf-8")
+        for genre in genres)
+    temp_path = file_path + ".tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, CODECS.index(codec), 
+                               len(numbers), len(starts), len(genres)))
+        file.write(genre_table)
+        blocks = iter(zip(raw_blocks, compressed))
+        for start in starts:  # Iteration: for loop
+            file.write(CHUNK.pack(min(chunk_rows, len(numbers) - start)))
+            for _ in COLUMNS:
+                raw, packed = next(blocks)
+                file.write(BLOCK.pack(len(packed), len(raw)))
+                file.write(packed)
+        file.flush()
+        os.fsync(file.fileno())  # The archive is on disk before the swap
+    os.replace(temp_path, file_path)
+    return os.path.getsize(file_path)
+
+def _read_layout(data):
+    """
+    Reads the header, genre table and block table of an archive. Returns 
+    the codec, the genres, the movie count of each chunk and the 
+    (compressed block, size) pairs in file order.
+    """
+    if len(data) < HEADER.size:
+        raise ColumnarError("Archive is truncated")
+    magic, version, codec, count, chunk_count, genre_count = \
+        HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION or codec >= len(CODECS):
+        raise ColumnarError("Not a movies archive")
+    try:
+        genres = []  # Container type: List
+        offset = HEADER.size
+        for _ in range(genre_count):  # Iteration: for loop
+            length = data[offset]
+            genres.append(bytes(data[offset + 1:offset + 1 + length])
+                          .decode("utf-8"))
+            offset += 1 + length
+        rows, blocks = [], []
+        for _ in range(chunk_count):
+            rows.append(CHUNK.unpack_from(data, offset)[0])
+            offset += CHUNK.size
+            for _ in COLUMNS:
+                packed_size, size = BLOCK.unpack_from(data, offset)
+                offset += BLOCK.size
+                blocks.append((data[offset:offset + packed_size], size))
+                offset += packed_size
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise ColumnarError("Archive is truncated or damaged") from e
+    if offset != len(data) or sum(rows) != count:
+        raise ColumnarError("Archive size does not match its header")
+    return CODECS[codec], genres, rows, blocks
+
+# Rating of each stored value; a value missing here is damaged
+RATINGS = {value: value / 100 for value in range(1001)}
+RATINGS[NO_RATING] = None
+
+def _decode_titles(rows, column):
+    """
+    Returns the titles of a chunk from its titles column.
+    """
+    lengths = _from_little_endian('H', column[:2 * rows])
+    offsets = list(accumulate(lengths, initial=0))
+    blob = column[2 * rows:]
+    if len(blob) != offsets[-1]:
+        raise ValueError("Title lengths do not match the titles")
+    if blob.isascii():  # Decodes once and slices characters
+        blob = blob.decode("ascii")
+        return [blob[start:end] for start, end in zip(offsets, offsets[1:])]
+    return [blob[start:end].decode("utf-8") 
+            for start, end in zip(offsets, offsets[1:])]
+
+def _decode_chunk(rows, columns, genres):
+    """
+    Returns an iterator over the movies of a chunk, created from its 
+    decompressed columns. Each column is decoded in one pass, so no 
+    Python code runs per movie apart from the Movie class itself.
+    """
+    ids, years, genre_column, ratings, titles = columns
+    genre_names = genres + [None] * (NO_GENRE + 1 - len(genres))
+    columns = (
+        map(str, accumulate(_from_little_endian('I', ids))),
+        _decode_titles(rows, titles),
+        [year or None for year  # NO_YEAR is 0
+         in accumulate(_from_little_endian('h', years))],
+        map(genre_names.__getitem__, genre_column),
+        map(RATINGS.__getitem__, _from_little_endian('H', ratings)),
+    )
+    if not len(ids) == 4 * rows == 2 * len(years) == 4 * len(genre_column) \
+            == 2 * len(ratings):
+        raise ValueError("Column sizes do not match the chunk")
+    return map(Movie, *columns)
+
+def import_columnar(file_path, movies=None, workers=None):
+    """
+    Reads a columnar archive into the movies dictionary (a new 
+    MovieLibrary by default) and returns it, decompressing the blocks in 
+    up to workers threads. Raises a ColumnarError if the archive is 
+    damaged.
+    """
+    if movies is None:
+        from movie_library import MovieLibrary
+        movies = MovieLibrary()
+    with open(file_path, 'rb') as file:
+        data = memoryview(file.read())
+    codec, genres, rows, blocks = _read_layout(data)
+    decompress, error = _decompressor(codec)
+
+    def unpack(block):
+        """
+        Decompresses one block and checks its size.
+        """
+        packed, size = block
+        try:
+            raw = decompress(packed)
+        except error as e:
+            raise ColumnarError(f"Block cannot be decompressed: {e}") \
+                from e
+        if len(raw) != size:
+            raise ColumnarError("Block size does not match the archive")
+        return raw
+
+    with ThreadPoolExecutor(workers) as pool:
+        columns = list(pool.map(unpack, blocks))
+    # The garbage collector is paused while the movies are created, as 
+    # none of them are garbage
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        for index, count in enumerate(rows):  # Iteration: for loop
+            chunk = _decode_chunk(
+                count, columns[index * len(COLUMNS):
+                               (index + 1) * len(COLUMNS)], genres)
+            if hasattr(movies, "add_many"):
+                movies.add_many(chunk)  # Indexes in bulk
+            else:
+                for movie in chunk:
+                    movies[movie.get_id()] = movie
+    except (IndexError, KeyError, UnicodeDecodeError, ValueError) as e:
+        raise ColumnarError("Archive columns are damaged") from e
+    finally:
+        if collecting:
+            gc.enable()
+    return movies
+
+def main():
+    """
+    Exports a CSV library to an archive, or imports an archive into a CSV 
+    library, from the command line.
+    """
+    import argparse  # Only the command line needs it
+    from file_operations import read_movies_from_file, compact_journal
+    from locking import FileLock
+    parser = argparse.ArgumentParser(
+        description="Export or import a compressed columnar archive.")
+    parser.add_argument("--workers", type=int, 
+                        help="compression threads (default: one per CPU)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser(
+        "export", help="write the movies of a CSV library to an archive")
+    export_parser.add_argument("csv_file")
+    export_parser.add_argument("archive")
+    export_parser.add_argument("--codec", choices=CODECS, default="zlib")
+    import_parser = commands.add_parser(
+        "import", help="replace a CSV library with the movies of an archive")
+    import_parser.add_argument("archive")
+    import_parser.add_argument("csv_file")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            with FileLock(args.csv_file).shared():
+                movies = read_movies_from_file(args.csv_file)
+            size = export_columnar(movies, args.archive, args.codec, 
+                                   workers=args.workers)
+            print(f"{len(movies)} movies written to {args.archive} "
+                  f"({size} bytes).")
+        else:
+            movies = import_columnar(args.archive, workers=args.workers)
+            # Replaces the file and its journal, so other processes 
+            # reload it
+            with FileLock(args.csv_file).exclusive():
+                compact_journal(movies, args.csv_file)
+            print(f"{len(movies)} movies imported into {args.csv_file}.")
+    except ColumnarError as e:
+        parser.exit(1, f"Archive error: {e}\n")
+
+if __name__ == "__main__":
+    main()
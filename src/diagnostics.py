@@ -0,0 +1,103 @@
+"""
+Measures how long the Movies Library takes to start and runs its unit 
+tests on request. The interpreter is started with -X importtime in a 
+subprocess so the report covers a cold import of the program, and the 
+library is loaded once to time the work done in the background while 
+the first menu is shown.
+"""
+
+import glob
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def parse_import_times(output):
+    """
+    Parses the stderr of python -X importtime into a list of 
+    (module, self_us, cumulative_us) tuples in import order.
+    """
+    timings = []  # Container type: List
+    for line in output.splitlines():  # Iteration: for loop
+        if not line.startswith("import time:") or "[us]" in line:
+            continue  # Skips the header and unrelated output
+        fields = line[len("import time:"):].split("|")
+        try:
+            timings.append((fields[2].strip(), int(fields[0]), 
+                            int(fields[1])))
+        except (IndexError, ValueError):
+            continue
+    return timings
+
+def measure_imports(module="main"):
+    """
+    Imports module in a fresh interpreter and returns the wall-clock time 
+    of the whole start in seconds together with its import timings.
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SOURCE_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    return elapsed, parse_import_times(result.stderr)
+
+def is_project_module(name):
+    """
+    Returns True if the module is one of the Movies Library's own files.
+    """
+    return os.path.exists(os.path.join(SOURCE_DIR, f"{name}.py"))
+
+def startup_report(storage=None, module="main", top=10):
+    """
+    Prints the cold-start report: the time to start the interpreter and 
+    import the program, the slowest imports, the cost of each project 
+    module and, when a repository is given, the time to load the library.
+    """
+    elapsed, timings = measure_imports(module)
+    total = sum(self_us for _, self_us, _ in timings)
+    print(f"\nCold start of '{module}': {elapsed * 1000:.1f} ms "
+          f"({total / 1000:.1f} ms importing {len(timings)} modules)")
+
+    print(f"\nSlowest {top} imports (cumulative):")
+    slowest = sorted(timings, key=lambda timing: timing[2], reverse=True)
+    for name, self_us, cumulative_us in slowest[:top]:
+        print(f"  {name.strip():<28} {cumulative_us / 1000:8.2f} ms "
+              f"(self {self_us / 1000:.2f} ms)")
+
+    print("\nProject modules (self):")
+    for name, self_us, cumulative_us in timings:  # Iteration: for loop
+        if is_project_module(name):
+            print(f"  {name:<28} {self_us / 1000:8.2f} ms")
+
+    if storage is not None:
+        from movie_library import MovieLibrary
+        started = time.perf_counter()
+        movies = storage.load(MovieLibrary())
+        load_time = time.perf_counter() - started
+        print(f"\nLibrary load (runs behind the first menu): "
+              f"{load_time * 1000:.1f} ms for {len(movies)} movies")
+    print("_" * 36)
+
+def run_self_tests():
+    """
+    Imports every test_*.py module of the program and calls its 
+    run_tests function. Prints the modules that failed and returns the 
+    number of failures.
+    """
+    failures = []  # Container type: List
+    pattern = os.path.join(SOURCE_DIR, "test_*.py")
+    for path in sorted(glob.glob(pattern)):  # Iteration: for loop
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            importlib.import_module(name).run_tests()
+        except Exception as error:  # A failing module does not stop the rest
+            failures.append(name)
+            print(f"{name} failed: {error!r}")
+    if failures:  # Conditional if-statement
+        print(f"{len(failures)} test modules failed: {', '.join(failures)}")
+    else:
+        print("All self-tests passed!")
+    return len(failures)
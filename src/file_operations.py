@@ -2,8 +2,18 @@
 Handles file operations for the Movies Library.
 """
 
+import csv
+import gc
 import os
+import struct
 from movie import Movie
+from movie_library import MovieLibrary
+from instrumentation import timed
+from binary_snapshot import SnapshotError, read_movies_from_snapshot, \
+    write_snapshot, remove_snapshot
+
+JOURNAL_SUFFIX = ".journal"  # The journal lives next to the CSV file
+JOURNAL_MAX_BYTES = 1024 * 1024  # Journal size that triggers a compaction
 
 # Container type 1: Dictionary
 def create_initial_csv(file_path):
@@ -29,52 +39,286 @@ def create_initial_csv(file_path):
                   " was created successfully and is ready for your inputs!")
 
 
-def read_movies_from_file(file_path):
+class LoadReport:
+    """
+    A class to count the rows read from a CSV file and remember where 
+    the malformed ones were, so they are reported instead of silently 
+    skipped.
+    """
+
+    MAX_LINES_KEPT = 10  # Line numbers of malformed rows kept for display
+
+    def __init__(self):
+        """
+        Initializes an empty report.
+        """
+        self.rows_read = 0
+        self.malformed = 0
+        self.malformed_lines = []  # Container type: List
+
+    def add_malformed(self, line_number):
+        """
+        Counts a malformed row found at the given line number.
+        """
+        self.malformed += 1
+        if len(self.malformed_lines) < self.MAX_LINES_KEPT:
+            self.malformed_lines.append(line_number)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the report.
+        """
+        lines = ", ".join(str(line) for line in self.malformed_lines)
+        if self.malformed > len(self.malformed_lines):
+            lines += ", ..."
+        return (f"{self.rows_read} rows read, {self.malformed} malformed"
+                + (f" (lines {lines})" if self.malformed else ""))
+
+def movie_to_row(movie):
+    """
+    Returns the CSV fields of a movie.
+    """
+    # Formats the rating if it exists, otherwise leaves blank
+    rating_str = (
+        f"{format(movie.rating, '.2f')}" 
+        if movie.rating is not None else ''
+    )
+    return [movie.get_id(), movie.title, movie.year, movie.genre, rating_str]
+
+def row_to_movie(row):
+    """
+    Creates a Movie object from the CSV fields of a movie. Raises a 
+    ValueError if the fields are not valid.
+    """
+    if len(row) > 5:
+        # Files written before titles were quoted split a title containing 
+        # commas over several fields; the last three fields are still the 
+        # year, genre and rating
+        row = [row[0], ",".join(row[1:-3])] + row[-3:]
+    if len(row) not in (4, 5):
+        raise ValueError(f"Expected 4 or 5 fields, got {len(row)}")
+    movie_id, title, year, genre = row[:4]
+    rating = float(row[4]) if len(row) == 5 and row[4] else None
+    int(movie_id)  # Validates movie_id as an integer
+    return Movie(movie_id, title.upper(), int(year), genre, rating)
+
+def iter_movies_from_file(file_path, report=None):
     """
-    Reads movies from the CSV file and returns them as a dictionary 
-    with movie_id as the key.
+    Reads movies from the CSV file one at a time. Malformed rows are 
+    skipped and counted in the report, if one is given.
+    """
+    if report is None:
+        report = LoadReport()
+    with open(file_path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)  # Skips header line
+        for row in reader:  # Iteration: for loop
+            if not row:
+                continue  # Skips blank lines
+            report.rows_read += 1
+            try:
+                movie = row_to_movie(row)
+            except ValueError:
+                report.add_malformed(reader.line_num)
+                continue
+            yield movie
+
+def iter_movie_batches(file_path, batch_size=1000, report=None):
+    """
+    Reads movies from the CSV file in lists of up to batch_size movies.
+    """
+    batch = []  # Container type: List
+    for movie in iter_movies_from_file(file_path, report):
+        batch.append(movie)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _add_movies(movies, batch):
+    """
+    Adds a list of movies to the movies dictionary.
+    """
+    if isinstance(movies, MovieLibrary):
+        movies.add_many(batch)  # Updates the indexes in bulk
+    else:
+        for movie in batch:  # Iteration: for loop
+            movies[movie.get_id()] = movie
+
+@timed("read_movies_from_file")
+def read_movies_from_file(file_path, movies=None):
+    """
+    Reads movies from the CSV file and returns them as a MovieLibrary 
+    dictionary with movie_id as the key. If a library is given, it is 
+    filled one batch at a time, so it can be used while it is loading.
+    """
+    if movies is None:
+        movies = MovieLibrary()  # Container type: Dictionary
+    # The garbage collector is paused while loading, as none of the new 
+    # objects are garbage and collecting would only scan them again
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        _load_movies(file_path, movies)
+    finally:
+        if collecting:
+            gc.enable()
+    replay_journal(movies, file_path)  # Applies changes made since snapshot
+    return movies  # Returns the dictionary of movies
+
+def _load_movies(file_path, movies):
     """
-    movies = {}  # Container type: Dictionary
+    Adds the movies of the binary snapshot, or of the CSV file if there 
+    is no up-to-date snapshot, to the movies dictionary.
+    """
+    try:  # Uses the binary snapshot if it matches the CSV file
+        read_movies_from_snapshot(file_path, movies)
+        return
+    except (SnapshotError, ValueError):
+        movies.clear()  # Falls back to parsing the CSV file
+    report = LoadReport()
     try:  # Try block to handle file reading
-        with open(file_path, 'r') as file:
-            next(file)  # Skips header line
-            for line in file:  # Iteration: for loop
-                parts = line.strip().split(',') 
-                if len(parts) == 4 or len(parts) == 5:
-                    movie_id, title, year, genre = parts[:4]
-                    rating = float(parts[4]) if len(parts) == 5 and \
-                        parts[4] else None  # Handles optional rating
-                    try:
-                        int(movie_id)  # Validates movie_id as an integer
-                    except ValueError:
-                        continue  # Skips invalid movie_id
-                    # Adds the movie to the dictionary
-                    movies[movie_id] = Movie(movie_id, title.upper(), 
-                                             int(year), genre, rating)
+        for batch in iter_movie_batches(file_path, report=report):
+            _add_movies(movies, batch)  # Adds the movies to the dictionary
     except FileNotFoundError:  # Handles file not found error
         # Notifies the user that the file does not exist
         print(f"File {file_path} not found.")
-    return movies  # Returns the dictionary of movies
+    if report.malformed:
+        # Notifies the user about the rows that could not be read
+        print(f"Skipped malformed rows in {file_path}: {report}")
 
+@timed("write_movies_to_file")
 def write_movies_to_file(movies, file_path):
     """
-    Writes the current movies dictionary to the CSV file.
+    Writes the current movies dictionary to the CSV file. The movies are 
+    written to a temporary file that replaces the CSV file once it is on 
+    disk, so a crash leaves either the old or the new file whole.
     """
+    movies = dict(movies)  # A copy, so the library may change meanwhile
+    temp_path = file_path + ".tmp"
     try:  # Try block to handle file writing
-        with open(file_path, 'w') as file:
+        with open(temp_path, 'w', newline='') as file:
+            writer = csv.writer(file, lineterminator='\n')
             # Writes CSV headers to the file
-            file.write("movie_id,title,year,genre,rating\n")
-            for movie_id, movie in movies.items():  # Iteration: for loop
-                # Formats the rating if it exists, otherwise leaves blank
-                rating_str = (
-                    f"{format(movie.rating, '.2f')}" 
-                    if movie.rating is not None else ''
-                )
-                # Uses movie.get_id()
-                file.write(f"{movie.get_id()},{movie.title},{movie.year},"
-                           f"{movie.genre},{rating_str}\n")
+            writer.writerow(["movie_id", "title", "year", "genre", "rating"])
+            for movie in movies.values():  # Iteration: for loop
+                writer.writerow(movie_to_row(movie))
+            file.flush()
+            os.fsync(file.fileno())  # The data is on disk before the swap
+        os.replace(temp_path, file_path)
         # Notifies the user that changes have been saved
         print("Changes saved!")
     except IOError as e:  # Handles any input/output errors during file writing
         # Outputs an error message if writing to the file fails
         print(f"An error occurred while writing to {file_path}: {e}")
+        remove_snapshot(file_path)  # The snapshot may no longer match
+        return False
+    try:  # Keeps the binary snapshot in step with the CSV file
+        write_snapshot(movies, file_path)
+    except (IOError, SnapshotError, struct.error):
+        remove_snapshot(file_path)  # The CSV file is read next time
+    return True
+
+def get_journal_path(file_path):
+    """
+    Returns the path of the journal that records changes made to the 
+    CSV file since it was last written in full.
+    """
+    return file_path + JOURNAL_SUFFIX
+
+def journal_rows(changes):
+    """
+    Returns the journal record of each (action, movie) pair of changes.
+    """
+    rows = []  # Container type: List
+    for action, movie in changes:  # Iteration: for loop
+        if action == 'delete':
+            rows.append(['delete', movie.get_id(), '', '', '', ''])
+        else:
+            rows.append([action] + movie_to_row(movie))
+    return rows
+
+def get_journal_size(file_path):
+    """
+    Returns the size of the journal in bytes, or 0 if there is none.
+    """
+    try:
+        return os.path.getsize(get_journal_path(file_path))
+    except FileNotFoundError:
+        return 0
+
+def append_to_journal(file_path, changes):
+    """
+    Appends one 'add', 'update' or 'delete' record for each (action, 
+    movie) pair of changes to the journal and forces them to disk so they 
+    survive a crash.
+    """
+    with open(get_journal_path(file_path), 'a', newline='') as journal:
+        csv.writer(journal, lineterminator='\n').writerows(
+            journal_rows(changes))
+        journal.flush()
+        os.fsync(journal.fileno())  # Makes the records durable
+
+def read_journal(file_path, offset=0):
+    """
+    Returns the rows of the journal records written from byte offset on, 
+    and the offset just past the last complete record. A record without 
+    a line ending was cut short by a crash and is left out.
+    """
+    try:
+        with open(get_journal_path(file_path), 'rb') as journal:
+            journal.seek(offset)
+            data = journal.read()
+    except FileNotFoundError:
+        return [], 0  # No changes since the last full write
+    end = data.rfind(b'\n') + 1
+    lines = data[:end].decode('utf-8').splitlines(keepends=True)
+    return list(csv.reader(lines)), offset + end
+
+def replay_journal(movies, file_path, offset=0):
+    """
+    Applies the journal records to the movies dictionary in the order 
+    they were written, from byte offset on. Each record carries the full 
+    state of a movie, so replaying a record twice gives the same result.
+    """
+    rows, _ = read_journal(file_path, offset)
+    applied = 0
+    for row in rows:  # Iteration: for loop
+        if apply_journal_record(movies, row):
+            applied += 1
+    return applied
+
+def apply_journal_record(movies, row):
+    """
+    Applies one journal record to the movies dictionary. Returns False if 
+    the record is damaged or unknown.
+    """
+    if len(row) != 6:
+        return False  # Skips damaged records
+    action, movie_id = row[0], row[1]
+    try:
+        int(movie_id)  # Validates movie_id as an integer
+        if action == 'delete':
+            movies.pop(movie_id, None)
+            if isinstance(movies, MovieLibrary):
+                # Deleted IDs are not handed out again
+                movies.id_allocator.observe(movie_id)
+        elif action in ('add', 'update'):
+            movies[movie_id] = row_to_movie(row[1:])
+        else:
+            return False  # Skips unknown actions
+    except ValueError:
+        return False  # Skips records with invalid values
+    return True
+
+def compact_journal(movies, file_path):
+    """
+    Folds the journal back into the CSV file by writing the movies 
+    dictionary in full and removing the journal afterwards.
+    """
+    if write_movies_to_file(movies, file_path):
+        try:
+            os.remove(get_journal_path(file_path))
+        except FileNotFoundError:
+            pass  # Nothing was journaled since the last write
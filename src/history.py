@@ -0,0 +1,104 @@
+"""
+Keeps the undo and redo history of the Movies Library. Each change is 
+recorded as a Delta holding only the fields that changed, with their old 
+and new values; an addition or deletion holds the four fields of the 
+movie. The values are the movie's own objects, not copies. Both stacks 
+are bounded, so the history holds at most HISTORY_LIMIT changes however 
+large the library is; the oldest change is forgotten first.
+"""
+
+from collections import deque, namedtuple
+
+HISTORY_LIMIT = 100  # Changes that can be undone
+
+# before and after are tuples of (field, value) pairs, or None where the 
+# movie did not exist
+Delta = namedtuple("Delta", ["movie_id", "before", "after"])
+
+def describe(delta, title=None):
+    """
+    Returns a short description of a change, such as "the edit of HEAT". 
+    The title names the movie if the change does not.
+    """
+    fields = dict(delta.after or delta.before)
+    if delta.before is None:  # Conditional if-statement
+        action = "addition"
+    elif delta.after is None:
+        action = "deletion"
+    else:
+        action = "edit"
+    title = fields.get("title") or title or f"movie {delta.movie_id}"
+    return f"the {action} of {title}"
+
+class History:
+    """
+    A class to keep bounded stacks of changes to undo and to redo. The 
+    changes are applied by a function given to undo and redo, which 
+    brings a movie to the (field, value) pairs of one side of a Delta, 
+    or removes it for None.
+    """
+
+    def __init__(self, limit=HISTORY_LIMIT):
+        """
+        Initializes an empty history of at most limit changes.
+        """
+        self._undo = deque(maxlen=limit)  # Container type: Deque
+        self._redo = deque(maxlen=limit)
+
+    def __len__(self):
+        """
+        Returns the number of changes that can be undone.
+        """
+        return len(self._undo)
+
+    def can_undo(self):
+        """
+        Returns True if there is a change to undo.
+        """
+        return bool(self._undo)
+
+    def can_redo(self):
+        """
+        Returns True if there is an undone change to redo.
+        """
+        return bool(self._redo)
+
+    def record(self, movie_id, before, after):
+        """
+        Records a change of a movie from before to after. A new change 
+        cannot be redone over, so the undone changes are forgotten.
+        """
+        self._undo.append(Delta(movie_id, before, after))
+        self._redo.clear()
+
+    def undo(self, apply):
+        """
+        Undoes the latest change with apply and returns its Delta. The 
+        change stays undoable if apply raises an error.
+        """
+        return self._move(self._undo, self._redo, apply, "before")
+
+    def redo(self, apply):
+        """
+        Redoes the latest undone change with apply and returns its Delta. 
+        The change stays redoable if apply raises an error.
+        """
+        return self._move(self._redo, self._undo, apply, "after")
+
+    @staticmethod
+    def _move(source, target, apply, side):
+        """
+        Applies one side of the latest change of source and moves the 
+        change over to target.
+        """
+        if not source:
+            raise ValueError("Nothing to "
+                             + ("undo" if side == "before" else "redo"))
+        delta = source.pop()
+        try:
+            apply(delta.movie_id, getattr(delta, side))
+        except (KeyError, ValueError):
+            source.append(delta)
+            raise
+        target.append(delta)
+        return delta
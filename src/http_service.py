@@ -0,0 +1,421 @@
+"""
+Serves the Movies Library over HTTP for dashboards and scripts. The 
+library is loaded once and kept in memory; reads run side by side under 
+a shared lock, changes take the lock exclusively, and the responses to 
+read requests are kept in an LRU cache that every change empties.
+
+    GET    /movies?genre=Crime&year_from=1990&year_to=1999&page=2
+    GET    /movies/<id>
+    GET    /search?q=matrx&limit=10
+    GET    /average
+    GET    /stats
+    POST   /movies          {"title": ..., "year": ..., "genre": ...}
+    PATCH  /movies/<id>     {"rating": 8.5}
+    DELETE /movies/<id>
+
+Usage:
+    python http_service.py --port 8000
+"""
+
+import argparse
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from library_service import LibraryService, movie_to_dict, FIELDS
+from storage import BACKENDS, open_repository
+
+CACHE_SIZE = 1024  # Responses kept in the query cache
+PAGE_SIZE = 50  # Movies per page unless the request asks otherwise
+MAX_PAGE_SIZE = 1000
+
+class ReadWriteLock:
+    """
+    A lock that many readers may hold at once, or a single writer. 
+    Waiting writers go before new readers, so a steady stream of reads 
+    cannot hold back a change forever.
+    """
+
+    def __init__(self):
+        """
+        Initializes an unlocked lock.
+        """
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def reading(self):
+        """
+        Holds the lock shared for the duration of a with block.
+        """
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        """
+        Holds the lock exclusively for the duration of a with block.
+        """
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+class QueryCache:
+    """
+    A least recently used cache of response bodies by request.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        """
+        Initializes an empty cache holding up to max_entries responses.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # Container type: Ordered dictionary
+        self._lock = threading.Lock()  # Readers share the cache
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the cached body for key, or None.
+        """
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)  # Now the most recently used
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        """
+        Caches a body, evicting the least recently used one when full.
+        """
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Empties the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        """
+        Returns the number of cached responses.
+        """
+        return len(self._entries)
+
+class LibraryServer(ThreadingHTTPServer):
+    """
+    An HTTP server that answers every request in its own thread from one 
+    library kept in memory.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, service, cache_size=CACHE_SIZE, 
+                 quiet=True):
+        """
+        Initializes the server for a loaded library service.
+        """
+        super().__init__(address, LibraryRequestHandler)
+        self.service = service
+        self.lock = ReadWriteLock()
+        self.cache = QueryCache(cache_size)
+        self.quiet = quiet
+        service.movies.prepare_for_reads()
+
+    def read(self, key, answer):
+        """
+        Returns the response body for a read request, from the cache or 
+        by calling answer() under the shared lock.
+        """
+        with self.lock.reading():
+            body = self.cache.get(key)
+            if body is None:
+                body = json.dumps(answer()).encode("utf-8")
+                self.cache.put(key, body)  # No change can run meanwhile
+            return body
+
+    def change(self, apply):
+        """
+        Calls apply() under the exclusive lock, empties the cache and 
+        returns the result.
+        """
+        with self.lock.writing():
+            try:
+                return apply()
+            finally:
+                self.cache.clear()
+                self.service.movies.prepare_for_reads()
+
+def _number(params, name, convert, default=None):
+    """
+    Returns a query parameter converted to a number, or the default. 
+    Raises a ValueError naming the parameter if it is not a number.
+    """
+    value = params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return convert(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+
+def _range(params, name, convert):
+    """
+    Returns the (low, high) range of the name_from and name_to query 
+    parameters, or None if neither is given.
+    """
+    low = _number(params, f"{name}_from", convert)
+    high = _number(params, f"{name}_to", convert)
+    return None if low is None and high is None else (low, high)
+
+def _page(movies, total, page, page_size):
+    """
+    Returns a page of movies as a dictionary.
+    """
+    return {"total": total, "page": page, "page_size": page_size,
+            "movies": [movie_to_dict(movie) for movie in movies]}
+
+class LibraryRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers the HTTP requests of a LibraryServer with JSON.
+    """
+
+    protocol_version = "HTTP/1.1"  # Keeps connections open between requests
+    # Buffers the headers and the body into one send; sent separately, 
+    # the body waits for the client's delayed acknowledgement
+    wbufsize = 64 * 1024
+
+    def _send(self, status, body):
+        """
+        Sends a JSON body with the given status.
+        """
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        """
+        Returns the path split into its parts and the query parameters.
+        """
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        return parts, dict(parse_qsl(url.query))
+
+    def _read_body(self):
+        """
+        Reads the body sent with the request. Every request's body is 
+        read before it is answered, so a request that fails early does 
+        not leave its body on a kept-alive connection, to be read as the 
+        next request.
+        """
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True  # The body's end is unknown
+            raise ValueError("Content-Length is not a number") from None
+        return self.rfile.read(length) if length > 0 else b""
+
+    def _json_body(self):
+        """
+        Returns the JSON object sent with the request.
+        """
+        try:
+            body = json.loads(self._body or b"{}")
+        except ValueError:
+            raise ValueError("the body is not valid JSON") from None
+        if not isinstance(body, dict):
+            raise ValueError("the body must be a JSON object")
+        return body
+
+    def _handle(self, answer):
+        """
+        Sends the result of answer(), or the error it raised.
+        """
+        try:
+            self._body = self._read_body()
+            status, body = answer()
+        except KeyError as e:
+            status, body = 404, {"error": str(e.args[0] if e.args else e)}
+        except ValueError as e:
+            status, body = 400, {"error": str(e)}
+        self._send(status, body)
+
+    def do_GET(self):
+        """
+        Answers the read requests.
+        """
+        self._handle(self._get)
+
+    def _get(self):
+        """
+        Returns the status and body of a read request.
+        """
+        parts, params = self._route()
+        server = self.server
+        service = server.service
+        key = (tuple(parts), tuple(sorted(params.items())))
+        if parts == ["movies"]:
+            page = max(1, _number(params, "page", int, 1))
+            page_size = min(MAX_PAGE_SIZE, max(1, _number(
+                params, "page_size", int, PAGE_SIZE)))
+            genre = params.get("genre")
+            years = _range(params, "year", int)
+            ratings = _range(params, "rating", float)
+
+            def answer():
+                if genre is None and years is None and ratings is None:
+                    return _page(service.list_movies(page, page_size), 
+                                 len(service.movies), page, page_size)
+                found = service.filter_movies(genre, years, ratings)
+                start = (page - 1) * page_size
+                return _page(found[start:start + page_size], len(found), 
+                             page, page_size)
+        elif len(parts) == 2 and parts[0] == "movies":
+            def answer():
+                return movie_to_dict(service.get(parts[1]))
+        elif parts == ["search"]:
+            query = params.get("q", "")
+            limit = min(MAX_PAGE_SIZE, max(1, _number(params, "limit", int, 
+                                                      10)))
+
+            def answer():
+                return {"query": query, "movies": [
+                    movie_to_dict(movie) 
+                    for movie in service.find(query, limit)]}
+        elif parts == ["average"]:
+            def answer():
+                return {"average": service.stats()["average"]}
+        elif parts == ["stats"]:
+            answer = service.stats
+        else:
+            raise KeyError(f"No such resource: {self.path}")
+        return 200, server.read(key, answer)
+
+    def do_POST(self):
+        """
+        Adds a movie.
+        """
+        def answer():
+            parts, _ = self._route()
+            if parts != ["movies"]:
+                raise KeyError(f"No such resource: {self.path}")
+            record = self._json_body()
+            movie = self.server.change(lambda: self.server.service.add(
+                record.get("title"), record.get("year"), 
+                record.get("genre"), record.get("rating")))
+            return 201, movie_to_dict(movie)
+        self._handle(answer)
+
+    def do_PATCH(self):
+        """
+        Changes fields of a movie.
+        """
+        def answer():
+            movie_id = self._movie_id()
+            changes = self._json_body()
+            # Checked here, as keys such as movie_id would clash with the 
+            # arguments of edit
+            unknown = set(changes) - set(FIELDS)
+            if unknown:  # Conditional if-statement
+                raise ValueError("Unknown fields: " 
+                                 + ", ".join(sorted(unknown)))
+            movie = self.server.change(
+                lambda: self.server.service.edit(movie_id, **changes))
+            return 200, movie_to_dict(movie)
+        self._handle(answer)
+
+    def do_DELETE(self):
+        """
+        Deletes a movie.
+        """
+        def answer():
+            movie_id = self._movie_id()
+            movie = self.server.change(
+                lambda: self.server.service.delete(movie_id))
+            return 200, movie_to_dict(movie)
+        self._handle(answer)
+
+    def _movie_id(self):
+        """
+        Returns the movie ID of a /movies/<id> request.
+        """
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "movies":
+            raise KeyError(f"No such resource: {self.path}")
+        return parts[1]
+
+    def log_message(self, format, *args):
+        """
+        Logs requests unless the server is quiet.
+        """
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+def main():
+    """
+    Loads the library once and serves it until interrupted.
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve the Watched Movies Library over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--storage", choices=sorted(BACKENDS))
+    parser.add_argument("--path", help="the library file")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    parser.add_argument("--verbose", action="store_true", 
+                        help="log every request")
+    args = parser.parse_args()
+
+    storage = open_repository(backend=args.storage, path=args.path)
+    storage.create()
+    service = LibraryService(storage.load(), storage)
+    server = LibraryServer((args.host, args.port), service, args.cache_size,
+                           quiet=not args.verbose)
+    print(f"Serving {len(service.movies)} movies on "
+          f"http://{args.host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        storage.close()  # Saves pending changes
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Measures where the Movies Library spends its time. Functions decorated 
+with timed count their calls and record each call's duration in a 
+histogram with power-of-two buckets, but only while instrumentation is 
+enabled: when it is off, a decorated function costs one extra call and a 
+flag test. Instrumentation is enabled with enable(), the --stats option 
+of main.py and cli.py, or the MOVIES_STATS environment variable.
+
+ProfileSession captures a cProfile profile and a tracemalloc snapshot 
+of a whole session and writes them to a directory.
+"""
+
+import functools
+import os
+import threading
+import time
+
+_enabled = bool(os.environ.get("MOVIES_STATS"))  # Checked on every call
+_metrics = {}  # Container type: Dictionary, metric name to Metric
+_lock = threading.Lock()  # Calls may come from the writer thread
+TOP_ALLOCATIONS = 25  # Allocation sites listed in a memory profile
+
+class Metric:
+    """
+    A class to count the calls of one timed operation and keep the 
+    histogram of their durations. Bucket k counts the calls that took 
+    less than 2**k microseconds and at least half as long.
+    """
+
+    def __init__(self, name):
+        """
+        Initializes an empty metric.
+        """
+        self.name = name
+        self.calls = 0
+        self.total = 0.0  # Seconds
+        self.shortest = None
+        self.longest = 0.0
+        self.buckets = {}  # Container type: Dictionary
+
+    def record(self, elapsed):
+        """
+        Records one call that took elapsed seconds.
+        """
+        self.calls += 1
+        self.total += elapsed
+        if self.shortest is None or elapsed < self.shortest:
+            self.shortest = elapsed
+        if elapsed > self.longest:
+            self.longest = elapsed
+        bucket = int(elapsed * 1e6).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, percent):
+        """
+        Returns the upper bound in seconds of the histogram bucket that 
+        holds the given percentile of the calls, or 0 without calls.
+        """
+        if not self.calls:
+            return 0.0
+        wanted = self.calls * percent / 100
+        seen = 0
+        for bucket in sorted(self.buckets):  # Iteration: for loop
+            seen += self.buckets[bucket]
+            if seen >= wanted:
+                return min(2 ** bucket / 1e6, self.longest)
+        return self.longest
+
+    def as_dict(self):
+        """
+        Returns the metric as a dictionary of plain values, with times in 
+        milliseconds.
+        """
+        return {"calls": self.calls, 
+                "total_ms": self.total * 1e3, 
+                "mean_ms": self.total / self.calls * 1e3 if self.calls else 0, 
+                "min_ms": (self.shortest or 0) * 1e3, 
+                "p50_ms": self.percentile(50) * 1e3, 
+                "p99_ms": self.percentile(99) * 1e3, 
+                "max_ms": self.longest * 1e3, 
+                "histogram_us": {2 ** bucket: count for bucket, count
+                                 in sorted(self.buckets.items())}}
+
+def enable(on=True):
+    """
+    Turns instrumentation on or off. The metrics recorded so far are kept.
+    """
+    global _enabled
+    _enabled = on
+
+def is_enabled():
+    """
+    Returns True if calls are being measured.
+    """
+    return _enabled
+
+def reset():
+    """
+    Forgets every metric recorded so far.
+    """
+    with _lock:
+        _metrics.clear()
+
+def record(name, elapsed):
+    """
+    Records a call of the named operation that took elapsed seconds.
+    """
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = Metric(name)
+        metric.record(elapsed)
+
+def timed(name):
+    """
+    Returns a decorator that measures each call of a function under the 
+    given metric name while instrumentation is enabled.
+    """
+    def decorate(function):
+        """
+        Wraps function with the measurement.
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:  # The only cost while instrumentation is off
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def stats():
+    """
+    Returns every metric as a dictionary of plain values, keyed by name.
+    """
+    with _lock:
+        return {name: metric.as_dict()
+                for name, metric in sorted(_metrics.items())}
+
+def format_stats():
+    """
+    Returns the metrics as a table, one line per operation, with times in 
+    milliseconds.
+    """
+    rows = stats()
+    if not rows:  # Conditional if-statement
+        state = "on" if _enabled else "off (start with --stats)"
+        return f"No timings recorded; instrumentation is {state}."
+    width = max(len(name) for name in rows)
+    lines = [f"{'operation':<{width}} {'calls':>7} {'total':>10} "
+             f"{'mean':>9} {'p50':>9} {'p99':>9} {'max':>9}"]
+    for name, row in rows.items():  # Iteration: for loop
+        lines.append(f"{name:<{width}} {row['calls']:>7} "
+                     f"{row['total_ms']:>10.3f} {row['mean_ms']:>9.3f} "
+                     f"{row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f} "
+                     f"{row['max_ms']:>9.3f}")
+    return "\n".join(lines)
+
+class ProfileSession:
+    """
+    A context manager that profiles everything run inside it with 
+    cProfile and tracemalloc, and enables the timings. On exit it writes 
+    <name>.prof (read it with python -m pstats), <name>.memory.txt with 
+    the top allocation sites and <name>.stats.txt with the timings to the 
+    directory, where name is made from the prefix, the start time and the 
+    process ID. cProfile sees only the thread that entered the session; 
+    the timings and allocations cover every thread.
+    """
+
+    def __init__(self, directory, prefix="session"):
+        """
+        Initializes a session that writes its profiles to directory.
+        """
+        self.directory = directory
+        self.name = (f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-"
+                     f"{os.getpid()}")
+        self.paths = []  # Container type: List, the files written
+        self._profiler = None
+        self._was_enabled = False
+
+    def __enter__(self):
+        """
+        Starts profiling and tracing allocations.
+        """
+        # Imported here, as most runs never profile
+        import cProfile
+        import tracemalloc
+        os.makedirs(self.directory, exist_ok=True)
+        self._was_enabled = _enabled
+        enable()
+        tracemalloc.start()
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Stops profiling and writes the profiles.
+        """
+        import tracemalloc
+        self._profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        enable(self._was_enabled)
+
+        base = os.path.join(self.directory, self.name)
+        self._profiler.dump_stats(base + ".prof")
+        with open(base + ".memory.txt", 'w') as file:
+            file.write(f"Traced memory: {current / 1024:.1f} KiB at exit, "
+                       f"{peak / 1024:.1f} KiB at peak\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                file.write(f"{stat}\n")
+        with open(base + ".stats.txt", 'w') as file:
+            file.write(format_stats() + "\n")
+        self.paths = [base + ".prof", base + ".memory.txt", 
+                      base + ".stats.txt"]
+        return False
@@ -0,0 +1,286 @@
+"""
+Provides the operations of the Movies Library without any input or 
+output: each one takes plain values, returns data and raises a ValueError 
+or KeyError when a request cannot be carried out. The interactive menu, 
+the batch command line and scripts all work through this layer.
+"""
+
+import csv
+
+from movie import Movie, GENRES
+from file_operations import movie_to_row
+
+FIELDS = ("title", "year", "genre", "rating")  # Fields a movie can change
+
+def validate_title(title):
+    """
+    Returns a title in the form the library stores, or raises a 
+    ValueError if it is empty.
+    """
+    title = str(title or "").strip().upper()
+    if not title:
+        raise ValueError("missing title")
+    return title
+
+def validate_year(year):
+    """
+    Returns a year as a number, or raises a ValueError if it is not a 
+    number or outside the years the Movie class accepts.
+    """
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        raise ValueError("year is not a number") from None
+    return Movie(None, "", year, None).year  # Validates the year
+
+def validate_genre(genre):
+    """
+    Returns a genre, or raises a ValueError if it is not on the genre 
+    menu.
+    """
+    if genre not in GENRES:
+        raise ValueError("unknown genre")
+    return genre
+
+def validate_rating(rating):
+    """
+    Returns a rating rounded to two decimal places, None for no rating, 
+    or raises a ValueError if it is not a number between 0 and 10.
+    """
+    if rating in (None, ""):
+        return None
+    try:
+        rating = float(rating)
+    except (TypeError, ValueError):
+        raise ValueError("rating is not a number") from None
+    movie = Movie(None, "", None, None)
+    movie.add_rating(rating)  # Validates the rating
+    return movie.rating
+
+# Container type: Dictionary (field -> function that checks its value)
+VALIDATORS = {"title": validate_title, "year": validate_year, 
+              "genre": validate_genre, "rating": validate_rating}
+
+def validate_record(record):
+    """
+    Checks a record with title, year, genre and optional rating fields 
+    against the rules of the Movie class and the genre menu. Returns a 
+    (title, year, genre, rating) tuple, or raises a ValueError with the 
+    reason the record was rejected.
+    """
+    return tuple(VALIDATORS[field](record.get(field)) for field in FIELDS)
+
+def movie_to_dict(movie):
+    """
+    Returns the fields of a movie as a dictionary.
+    """
+    return {"movie_id": movie.get_id(), "title": movie.title, 
+            "year": movie.year, "genre": movie.genre, "rating": movie.rating}
+
+def movie_fields(movie):
+    """
+    Returns the (field, value) pairs of the fields a movie can change.
+    """
+    return tuple((field, getattr(movie, field)) for field in FIELDS)
+
+class LibraryService:
+    """
+    The operations on a MovieLibrary and the repository that stores it. 
+    With a History, additions, edits and deletions can be undone and 
+    redone; imports are not recorded.
+    """
+
+    def __init__(self, movies, storage, history=None):
+        """
+        Initializes the service for a loaded library and its repository.
+        """
+        self.movies = movies
+        self.storage = storage
+        self.history = history
+
+    def get(self, movie_id):
+        """
+        Returns the movie with the given ID, or raises a KeyError.
+        """
+        movie = self.movies.get(str(movie_id))
+        if movie is None:
+            raise KeyError(f"No movie with ID {movie_id}")
+        return movie
+
+    def add(self, title, year, genre, rating=None):
+        """
+        Adds a new movie, stores it and returns it. Raises a ValueError 
+        for invalid values or a title that is already in the library.
+        """
+        title, year, genre, rating = validate_record(
+            {"title": title, "year": year, "genre": genre, "rating": rating})
+        if self.movies.has_title(title):  # Checks for duplicate titles
+            raise ValueError(f"{title} already exists in the library")
+        self.storage.check_fields(None, {"title": title, "year": year, 
+                                         "genre": genre})
+        movie_id, = self.storage.new_movie_ids(self.movies, 
+                                               [(title, year, genre)])
+        movie = Movie(movie_id, title, year, genre, rating)
+        self.movies[movie_id] = movie
+        self.storage.put(movie)
+        self._record(movie_id, None, movie_fields(movie))
+        return movie
+
+    def edit(self, movie_id, **changes):
+        """
+        Changes the given fields (title, year, genre and rating) of a 
+        movie, stores it and returns it. Nothing is changed if any of the 
+        new values is invalid or the storage cannot keep it; the fields 
+        left alone are not checked.
+        """
+        movie = self.get(movie_id)
+        unknown = set(changes) - set(FIELDS)
+        if unknown:  # Conditional if-statement
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        # Only the new values are checked, so a movie stored with a value 
+        # the menus no longer offer, such as an old genre, can still be 
+        # edited
+        values = {field: VALIDATORS[field](changes[field]) 
+                  for field in FIELDS if field in changes}
+        title = values.get("title", movie.title)
+        if title != movie.title and self.movies.has_title(title):
+            raise ValueError(f"{title} already exists in the library")
+        self.storage.check_fields(movie.get_id(), values)
+        # Only changed fields are set, so only their indexes are updated
+        before, after = [], []  # Container type: List
+        for field, value in values.items():  # Iteration: for loop
+            if getattr(movie, field) != value:
+                before.append((field, getattr(movie, field)))
+                after.append((field, value))
+                setattr(movie, field, value)
+        self.storage.put(movie)
+        if after:
+            self._record(movie.get_id(), tuple(before), tuple(after))
+        return movie
+
+    def delete(self, movie_id):
+        """
+        Deletes a movie, removes it from storage and returns it.
+        """
+        movie = self.get(movie_id)
+        del self.movies[movie.get_id()]
+        self.storage.delete(movie.get_id())
+        self._record(movie.get_id(), movie_fields(movie), None)
+        return movie
+
+    def _record(self, movie_id, before, after):
+        """
+        Records a change in the history, if there is one.
+        """
+        if self.history is not None:
+            self.history.record(movie_id, before, after)
+
+    def undo(self):
+        """
+        Undoes the latest change and returns its Delta. Raises a 
+        ValueError if there is nothing to undo.
+        """
+        if self.history is None:
+            raise ValueError("Nothing to undo")
+        return self.history.undo(self._restore)
+
+    def redo(self):
+        """
+        Redoes the latest undone change and returns its Delta. Raises a 
+        ValueError if there is nothing to redo.
+        """
+        if self.history is None:
+            raise ValueError("Nothing to redo")
+        return self.history.redo(self._restore)
+
+    def _restore(self, movie_id, fields):
+        """
+        Sets the (field, value) pairs of a movie, bringing it back if it 
+        was deleted, or deletes it if fields is None. Only the movie's 
+        own record is stored, like any other change.
+        """
+        movie = self.movies.get(movie_id)
+        if fields is None:  # Conditional if-statement
+            if movie is not None:
+                del self.movies[movie_id]
+                self.storage.delete(movie_id)
+            return
+        values = dict(fields)
+        title = values.get("title")
+        if title is not None and (movie is None or title != movie.title) \
+                and self.movies.has_title(title):
+            raise ValueError(f"{title} already exists in the library")
+        if movie is None:
+            if len(values) != len(FIELDS):
+                raise KeyError(f"No movie with ID {movie_id}")
+            movie = Movie(movie_id, *(values[field] for field in FIELDS))
+            self.movies[movie_id] = movie
+        else:
+            for field, value in fields:  # Iteration: for loop
+                setattr(movie, field, value)
+        self.storage.put(movie)
+
+    def list_movies(self, page=None, page_size=50):
+        """
+        Returns the movies sorted by title, or only one page of them.
+        """
+        if page is None:
+            return self.movies.sorted_by_title()
+        return self.movies.title_page(page, page_size)
+
+    def filter_movies(self, genre=None, years=None, ratings=None):
+        """
+        Returns the movies of a genre, within a (first, last) range of 
+        years and within a (lowest, highest) range of ratings, sorted by 
+        title.
+        """
+        found = self.movies.query(genre, years, ratings)
+        return sorted(found, key=lambda movie: (movie.title, 
+                                                int(movie.get_id())))
+
+    def find(self, query, limit=10):
+        """
+        Returns up to limit movies whose titles start with or resemble 
+        the query.
+        """
+        return self.movies.find_titles(query, limit)
+
+    def stats(self):
+        """
+        Returns the number of movies and the rating statistics of the 
+        library and of each genre as a dictionary.
+        """
+        overall = self.movies.stats.overall
+        return {
+            "movies": len(self.movies),
+            "rated": overall.count,
+            "average": round(overall.average(), 2),
+            "minimum": overall.minimum() if overall.count else None,
+            "maximum": overall.maximum() if overall.count else None,
+            "stddev": round(overall.stddev(), 2),
+            "by_genre": {genre: {"rated": stats.count, 
+                                 "average": round(stats.average(), 2)}
+                         for genre, stats 
+                         in sorted(self.movies.stats.by_genre.items())
+                         if stats.count},
+        }
+
+    def import_file(self, file_path, file_format=None, workers=None):
+        """
+        Imports a CSV or JSON Lines dump and returns its ImportSummary.
+        """
+        from bulk_import import import_movies  # Starts worker processes
+        return import_movies(self.movies, self.storage, file_path, 
+                             file_format, workers)
+
+    def export(self, file_path, movies=None):
+        """
+        Writes the movies (by default all of them, sorted by title) to a 
+        CSV file and returns how many were written.
+        """
+        movies = self.list_movies() if movies is None else movies
+        with open(file_path, 'w', newline='') as file:
+            writer = csv.writer(file, lineterminator='\n')
+            writer.writerow(["movie_id", "title", "year", "genre", "rating"])
+            writer.writerows(movie_to_row(movie) for movie in movies)
+        return len(movies)
@@ -0,0 +1,143 @@
+"""
+Load-tests the HTTP query service and reports the median and 99th 
+percentile latency and the requests per second. Without --url it serves 
+a synthetic library of --size movies itself, so runs are comparable.
+
+Usage:
+    python load_test.py --size 100000 --requests 5000 --concurrency 8
+    python load_test.py --url http://127.0.0.1:8000
+"""
+
+import argparse
+import http.client
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from urllib.parse import urlsplit
+
+from movie import GENRES
+
+def request_paths(count, seed=0):
+    """
+    Returns count request paths mixing listings, genre filters, searches 
+    and averages, drawn from a small set so the cache gets used.
+    """
+    generator = random.Random(seed)
+    choices = [f"/movies?page={page}" for page in range(1, 21)]
+    choices += [f"/movies?genre={genre}&page={page}" 
+                for genre in GENRES for page in (1, 2)]
+    choices += [f"/movies?genre={genre}&year_from=1990&year_to=1999" 
+                for genre in GENRES]
+    choices += [f"/search?q={word}" for word in ("kalo", "mira", "tesu")]
+    choices += ["/average", "/stats"]
+    return [generator.choice(choices) for _ in range(count)]
+
+def percentile(latencies, share):
+    """
+    Returns the latency below which the given share of requests fall.
+    """
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+def run_load(url, paths, concurrency):
+    """
+    Sends the requests from concurrency threads, each over its own 
+    connection, and returns the latencies, the failures and the total 
+    time in seconds.
+    """
+    address = urlsplit(url)
+    latencies = []  # Container type: List
+    failures = []
+    lock = threading.Lock()
+
+    def worker(share):
+        connection = http.client.HTTPConnection(address.hostname, 
+                                                address.port or 80)
+        timings = []
+        errors = 0
+        for path in share:  # Iteration: for loop
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                connection.close()  # Reconnects on the next request
+            timings.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            latencies.extend(timings)
+            failures.append(errors)
+
+    threads = [threading.Thread(target=worker, 
+                                args=(paths[number::concurrency],))
+               for number in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:  # Iteration: for loop
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(failures), time.perf_counter() - started
+
+def serve_synthetic(size, directory):
+    """
+    Starts a LibraryServer on a free port over a synthetic library and 
+    returns the server and its URL.
+    """
+    from benchmark import generate_library
+    from http_service import LibraryServer
+    from library_service import LibraryService
+    from storage import CsvRepository
+
+    file_path = os.path.join(directory, "movies.csv")
+    generate_library(file_path, size)
+    storage = CsvRepository(file_path)
+    service = LibraryService(storage.load(), storage)
+    server = LibraryServer(("127.0.0.1", 0), service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def main():
+    """
+    Runs the load test from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Load-test the Movies Library HTTP service.")
+    parser.add_argument("--url", help="a running service (default: start "
+                        "one over a synthetic library)")
+    parser.add_argument("--size", type=int, default=100000, 
+                        help="movies in the synthetic library")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = None
+        url = args.url
+        if url is None:
+            with redirect_stdout(io.StringIO()):
+                server, url = serve_synthetic(args.size, directory)
+        paths = request_paths(args.requests)
+        latencies, failures, elapsed = run_load(url, paths, 
+                                                args.concurrency)
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            print(f"Cache: {server.cache.hits} hits, "
+                  f"{server.cache.misses} misses")
+
+    print(f"{len(latencies)} requests, {failures} failed, "
+          f"{args.concurrency} connections")
+    print(f"p50: {percentile(latencies, 0.5) * 1000:.2f} ms, "
+          f"p99: {percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"{len(latencies) / elapsed:.0f} requests/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Provides advisory locks that let several processes share one library 
+file. Readers take the lock shared and writers exclusive. The lock is 
+held on a separate <file>.lock file, because the library file itself is 
+replaced on every full write. The lock file also records the highest 
+movie ID handed out, so processes never give two movies the same ID.
+
+Locks are taken with fcntl.flock where it exists; elsewhere (Windows) 
+they do nothing and a single process is assumed.
+"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+LOCK_SUFFIX = ".lock"
+
+class FileLock:
+    """
+    A shared or exclusive advisory lock on a library file. Each use opens 
+    the lock file anew, so threads of one process exclude each other as 
+    well. The locks do not nest: a thread holding the lock must not take 
+    it again.
+    """
+
+    def __init__(self, file_path):
+        """
+        Initializes the lock of a library file.
+        """
+        self.path = file_path + LOCK_SUFFIX
+
+    @contextmanager
+    def _locked(self, operation):
+        """
+        Holds the lock for the duration of a with block and yields the 
+        open lock file.
+        """
+        with open(self.path, 'a+') as file:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), operation)
+            try:
+                yield file
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    def shared(self):
+        """
+        Returns a context manager holding the lock shared, for reading.
+        """
+        return self._locked(fcntl.LOCK_SH if fcntl is not None else None)
+
+    def exclusive(self):
+        """
+        Returns a context manager holding the lock exclusively, for 
+        writing.
+        """
+        return self._locked(fcntl.LOCK_EX if fcntl is not None else None)
+
+def read_high_water(lock_file):
+    """
+    Returns the highest movie ID recorded in an open lock file, or 0.
+    """
+    lock_file.seek(0)
+    try:
+        return int(lock_file.read().strip() or 0)
+    except ValueError:
+        return 0  # A damaged record; the library's own IDs still count
+
+def write_high_water(lock_file, high_water):
+    """
+    Records the highest movie ID handed out in an open lock file, which 
+    must be held exclusively.
+    """
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(high_water))
+    lock_file.flush()
+    os.fsync(lock_file.fileno())
+
+def file_signature(file_path):
+    """
+    Returns the (size, modification time, inode) of a file, which changes 
+    whenever the file is rewritten or appended to, or None if it does 
+    not exist.
+    """
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
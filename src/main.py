@@ -1,51 +1,170 @@
 """
-The Main file manages a Watched Movies Library using a CSV file. 
+The Main file manages a Watched Movies Library stored in a CSV file or an 
+SQLite database, as configured in library.ini.
 
 It allows a user to add, edit, delete, and view movies, filter movies by 
-genre and calculate the average rating of movies in the library.
+genre and calculate the average rating of movies in the library. The 
+changes of a session can be undone and redone.
+
+The unit tests run with --self-test, and --startup-report prints how long 
+the program takes to start. Only the modules the first menu needs are 
+imported up front; the rest are imported on first use. --stats prints the 
+timings of the hot paths on exit (the hidden menu option 'p' prints them 
+at any time), and --profile writes a cProfile and tracemalloc profile of 
+the session to a directory.
 """
 
-from file_operations import create_initial_csv, read_movies_from_file, \
-    write_movies_to_file
-from movie_operations import add_movie, edit_movie, delete_movie, \
-    display_movies, display_movies_by_genre, display_menu, \
-    calculate_average_rating
-from test_movie import run_tests
+import signal
+import sys
+import threading
+from types import SimpleNamespace
+from movie_library import MovieLibrary
+from storage import open_repository
+from instrumentation import enable, is_enabled, format_stats
+from history import History
+
+def parse_arguments(argv=None):
+    """
+    Parses the command line options of the program. argparse pulls in 
+    the re module, so it is only imported when options are given.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:  # Conditional if-statement
+        return SimpleNamespace(self_test=False, startup_report=False, 
+                               stats=False, profile=None)
+    import argparse
+    parser = argparse.ArgumentParser(description="Watched Movies Library")
+    parser.add_argument("--self-test", action="store_true",
+                        help="run the unit tests before starting")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="report the start-up time and exit")
+    parser.add_argument("--stats", action="store_true",
+                        help="print the timings of the hot paths on exit")
+    parser.add_argument("--profile", metavar="DIRECTORY",
+                        help="write cProfile and tracemalloc profiles of "
+                        "the session to DIRECTORY")
+    return parser.parse_args(argv)
+
+def display_menu():
+    """
+    Displays the main menu for the Movies Library. It lives here rather 
+    than in movie_operations, so showing the first menu does not import 
+    the menu operations.
+    """
+    print("\nMovies Library Menu:")
+    print("1. Add a movie")
+    print("2. Edit a movie")
+    print("3. Delete a movie")
+    print("4. Display all movies")
+    print("5. Find movies by genre")
+    print("6. Show average rating")
+    print("7. Rating analytics")
+    print("8. Undo last change")
+    print("9. Redo last change")
+    print("10. Exit the library")
+    print("_" * 36)
+
+def exit_on_signal(signum, frame):
+    """
+    Turns a termination signal into a normal exit, so pending changes 
+    are saved on the way out.
+    """
+    raise SystemExit(128 + signum)
+
+def run_library(storage):
+    """
+    Loads the library from storage and shows the menu until the user 
+    exits.
+    """
+    storage.create()  # Ensures the store exists
+    movies = MovieLibrary()
+    history = History()  # Changes of this session that can be undone
+    # Loads movies from storage in the background; the menu is shown 
+    # without waiting for it
+    loader = threading.Thread(target=storage.load, args=(movies,), 
+                              daemon=True)
+    loader.start()
+    for name in ("SIGTERM", "SIGHUP"):  # SIGHUP does not exist on Windows
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), exit_on_signal)
+
+    try:
+        while True:  # Iteration type: while loop
+            display_menu()  # Shows the main menu
+            choice = input("Enter your choice: ")  # Asks for a choice
+            loader.join()  # Every option needs the whole library
+            storage.refresh()  # Picks up changes from other processes
+
+            if choice == '1':
+                from movie_operations import add_movie
+                add_movie(movies, storage, history)  # Adds a new movie
+            elif choice == '2':
+                from movie_operations import edit_movie
+                edit_movie(movies, storage, history)  # Edits a movie
+            elif choice == '3':
+                from movie_operations import delete_movie
+                delete_movie(movies, storage, history)  # Deletes a movie
+            elif choice == '4':
+                from movie_operations import display_movies
+                display_movies(movies)  # Displays all movies
+            elif choice == '5':
+                from movie_operations import display_movies_by_genre
+                display_movies_by_genre(movies)  # Displays movies by genre
+            elif choice == '6':
+                from movie_operations import calculate_average_rating, \
+                    display_rating_breakdown
+                avg_rating = calculate_average_rating(movies)  # Average
+                print(f"\nAverage rating: {avg_rating:.2f}\n" + "_" * 36)
+                display_rating_breakdown(movies)  # Shows ratings by genre
+            elif choice == '7':
+                from movie_operations import display_analytics
+                display_analytics(movies)  # Shows the rating report
+            elif choice in ('8', '9'):
+                from movie_operations import undo_change
+                undo_change(movies, storage, history, redo=choice == '9')
+            elif choice == '10':
+                break  # Exits the while loop and program
+            elif choice == 'p':  # Hidden option for profiling
+                if not is_enabled():
+                    enable()
+                    print("\nTimings are on; choose 'p' again to see them.")
+                else:
+                    print("\n" + format_stats())
+                print("_" * 36)
+            else:
+                # If the choice is invalid
+                print("\nInvalid choice. Please select a valid option.\n" 
+                      + "_" * 36)
+    finally:
+        loader.join()  # Never saves a half-loaded library
+        storage.close()  # Saves pending changes and closes the store
+    print("\nFarewell! See you next time in your movie library!")
 
-def main():
+def main(argv=None):
     """
     The main function that drives the Movies Library program.
     """
-    input_file = "movies.csv"  
-    create_initial_csv(input_file)  # Ensures CSV file exists
-    movies = read_movies_from_file(input_file)  # Loads movies from file
-
-    while True:  # Iteration type: while loop
-        display_menu()  # Shows the main menu
-        choice = input("Enter your choice: ") # Asks the user to make a choice
-
-        if choice == '1':
-            add_movie(movies, input_file)  # Adds a new movie
-        elif choice == '2':
-            edit_movie(movies, input_file)  # Edits an existing movie
-        elif choice == '3':
-            delete_movie(movies, input_file)  # Deletes a movie
-        elif choice == '4':
-            display_movies(movies)  # Displays all movies
-        elif choice == '5':
-            display_movies_by_genre(movies)  # Displays movies by genre
-        elif choice == '6':
-            avg_rating = calculate_average_rating(movies)  # Calculates avg rat
-            print(f"\nAverage rating: {avg_rating:.2f}\n" + "_" * 36)
-        elif choice == '7':
-            write_movies_to_file(movies, input_file)  # Saves movies to file
-            print("\nFarewell! See you next time in your movie library!")
-            break  # Exits the while loop and program
-        else:
-            # If the choice is invalid
-            print("\nInvalid choice. Please select a valid option.\n" 
-                  + "_" * 36)
+    args = parse_arguments(argv)
+    if args.self_test:
+        from diagnostics import run_self_tests
+        if run_self_tests():  # Runs every unit test module
+            sys.exit(1)  # Does not start with failing tests
+    storage = open_repository()  # Picks the configured storage backend
+    if args.startup_report:
+        from diagnostics import startup_report
+        startup_report(storage)
+        return
+    if args.stats:
+        enable()  # Times the hot paths from the start
+    if args.profile:  # Conditional if-statement
+        from instrumentation import ProfileSession
+        with ProfileSession(args.profile) as session:
+            run_library(storage)
+        print(f"Profiles written to {', '.join(session.paths)}")
+    else:
+        run_library(storage)
+    if args.stats:
+        print("\n" + format_stats())
 
 if __name__ == "__main__":
-    run_tests()  # Runs unit tests
     main()  # Starts the main function to launch the program
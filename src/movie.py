@@ -5,30 +5,164 @@ The class includes methods for validating the movie's year, formatting
 the rating, and generating a string representation of the movie.
 """
 
+import sys
+
+GENRES = (  # Container type: Tuple
+    "Action", "Adventure", "Comedy", "Drama", "Fantasy", "Horror", 
+    "Mystery", "Romance", "Sci-Fi", "Thriller", "Animation", 
+    "Biography", "Crime", "Documentary", "Family"
+)
+
+# Shared objects for values that repeat across many movies, so that each 
+# movie refers to one copy instead of holding its own
+_GENRE_CACHE = {genre: genre for genre in GENRES}
+_YEAR_CACHE = {}
+_RATING_CACHE = {}
+
+def intern_genre(genre):
+    """
+    Returns the shared copy of a genre string.
+    """
+    if genre is None:
+        return None
+    shared = _GENRE_CACHE.get(genre)
+    return shared if shared is not None else sys.intern(genre)
+
+def intern_year(year):
+    """
+    Returns the shared copy of a year.
+    """
+    return _YEAR_CACHE.setdefault(year, year)
+
+def intern_rating(rating):
+    """
+    Returns the shared copy of a rating rounded to two decimal places.
+    """
+    return _RATING_CACHE.setdefault(rating, rating)
+
+def normalize_title(title):
+    """
+    Returns the form of a title used to compare and look up titles.
+    """
+    return title.strip().upper()
+
 class Movie:
     """
     A class to represent a movie, containing details such as the title, 
     year of release, genre, and rating. 
     """
+
+    # Fixed attributes instead of a per-instance __dict__ keep large 
+    # libraries small in memory
+    __slots__ = ('_library', '__id', '__title', '__year', '__genre', 
+                 '__rating')
     
     def __init__(self, movie_id, title, year, genre, rating=None):
         """
         Initializes a Movie object with an ID, title, year, genre, and 
         optional rating.
         """
+        self._library = None  # the library that indexes this movie, if any
         self.__id = movie_id  # a private attribute for movie ID
-        self.title = title  # a public attribute for the title
-        self.year = self.__validate_year(year)  # validates and sets the year
-        self.genre = genre  # a public attribute for the genre
-        self.rating = self.__format_rating(rating) if rating is not None \
+        self.__title = title  # a public property for the title
+        self.__year = self.__validate_year(year)  # validates and sets year
+        self.__genre = intern_genre(genre)  # a public property for the genre
+        self.__rating = self.__format_rating(rating) if rating is not None \
             else None  # formats and sets the rating if provided
 
+    @classmethod
+    def from_stored(cls, movie_id, title, year, genre, rating):
+        """
+        Creates a Movie object from values read back from a file that 
+        only holds checked values, such as a binary snapshot, without 
+        checking them again. The year, genre and rating must already be 
+        the shared copies.
+        """
+        movie = cls.__new__(cls)
+        movie._library = None
+        movie.__id = movie_id
+        movie.__title = title
+        movie.__year = year
+        movie.__genre = genre
+        movie.__rating = rating
+        return movie
+
     def get_id(self):
         """
         Returns the movie ID.
         """
         return self.__id 
 
+    @property
+    def title(self):
+        """
+        Returns the movie title.
+        """
+        return self.__title
+
+    @title.setter
+    def title(self, title):
+        """
+        Updates the movie title and lets the library that holds the movie 
+        know, so its title index stays in sync.
+        """
+        old_title = self.__title
+        self.__title = title
+        if self._library is not None:
+            self._library._movie_changed(self, 'title', old_title, title)
+
+    @property
+    def year(self):
+        """
+        Returns the year of release.
+        """
+        return self.__year
+
+    @year.setter
+    def year(self, year):
+        """
+        Updates the year of release and lets the library know.
+        """
+        old_year = self.__year
+        self.__year = year
+        if self._library is not None:
+            self._library._movie_changed(self, 'year', old_year, year)
+
+    @property
+    def genre(self):
+        """
+        Returns the movie genre.
+        """
+        return self.__genre
+
+    @genre.setter
+    def genre(self, genre):
+        """
+        Updates the movie genre and lets the library know.
+        """
+        old_genre = self.__genre
+        self.__genre = intern_genre(genre)
+        if self._library is not None:
+            self._library._movie_changed(self, 'genre', old_genre, 
+                                         self.__genre)
+
+    @property
+    def rating(self):
+        """
+        Returns the movie rating, or None if it is not rated.
+        """
+        return self.__rating
+
+    @rating.setter
+    def rating(self, rating):
+        """
+        Updates the movie rating and lets the library know.
+        """
+        old_rating = self.__rating
+        self.__rating = rating
+        if self._library is not None:
+            self._library._movie_changed(self, 'rating', old_rating, rating)
+
     def __validate_year(self, year):
         """
         Validates the year of the movie. The year must be between 1888 
@@ -38,13 +172,13 @@ class Movie:
             return None
         if year < 1888 or year > 2024:
             raise ValueError("Year must be between 1888 and 2024")
-        return year  # Returns the validated year
+        return intern_year(year)  # Returns the valid year
 
     def __format_rating(self, rating):
         """
         Formats the movie rating to two decimal places.
         """
-        return round(rating, 2) 
+        return intern_rating(round(rating, 2))
 
     def add_rating(self, rating):
         """
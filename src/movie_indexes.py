@@ -0,0 +1,323 @@
+"""
+This module keeps secondary indexes of a movie library: a hash index from 
+genre to movie IDs and sorted indexes on year and rating. Together they 
+answer queries such as "Sci-Fi from 1990 to 1999 rated 8 or more" by 
+looking only at the movies of the most selective condition. A sorted 
+index on title keeps the library in the order it is listed in.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+
+class SortedIndex:
+    """
+    A class to keep (value, movie_id) pairs sorted by value, so movies 
+    with values in a range are found by bisection. Movies without a value 
+    are not indexed. Movies added while loading a library are collected 
+    unsorted and merged in one sort the next time the index is used.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty index.
+        """
+        self._entries = []  # Container type: List of (value, movie_id)
+        self._pending = []  # Entries added since the last merge
+
+    def __len__(self):
+        """
+        Returns the number of indexed movies.
+        """
+        return len(self._entries) + len(self._pending)
+
+    def _merge_pending(self):
+        """
+        Sorts the pending entries into the index.
+        """
+        if self._pending:
+            self._entries.extend(self._pending)
+            self._entries.sort()  # Keeps the already sorted run intact
+            self._pending = []
+
+    def _insert(self, entry):
+        """
+        Adds an entry to the index.
+        """
+        if self._pending or len(self._entries) < 2:
+            self._pending.append(entry)
+        else:
+            insort(self._entries, entry)
+
+    def _insert_many(self, entries):
+        """
+        Adds many entries to the index, to be sorted in on next use.
+        """
+        self._pending.extend(entries)
+
+    def _delete(self, entry):
+        """
+        Removes an entry from the index, if it is there.
+        """
+        self._merge_pending()
+        position = bisect_left(self._entries, entry)
+        if position < len(self._entries) and \
+                self._entries[position] == entry:
+            del self._entries[position]
+
+    def add(self, value, movie_id):
+        """
+        Adds a movie with the given value to the index.
+        """
+        if value is not None:
+            self._insert((value, movie_id))
+
+    def add_many(self, pairs):
+        """
+        Adds many (value, movie_id) pairs to the index at once.
+        """
+        self._insert_many(pair for pair in pairs if pair[0] is not None)
+
+    def remove(self, value, movie_id):
+        """
+        Removes a movie with the given value from the index.
+        """
+        if value is not None:
+            self._delete((value, movie_id))
+
+    def clear(self):
+        """
+        Removes every movie from the index.
+        """
+        self._entries.clear()
+        self._pending = []
+
+    def _bounds(self, low, high):
+        """
+        Returns the positions of the first entry with a value of at least 
+        low and of the first entry with a value above high. None means 
+        the range is open on that side.
+        """
+        self._merge_pending()
+        start = 0 if low is None else \
+            bisect_left(self._entries, (low,))
+        end = len(self._entries) if high is None else \
+            bisect_right(self._entries, (high, chr(0x10FFFF)))
+        return start, max(start, end)
+
+    def count_range(self, low=None, high=None):
+        """
+        Returns how many movies have a value between low and high.
+        """
+        start, end = self._bounds(low, high)
+        return end - start
+
+    def ids_in_range(self, low=None, high=None):
+        """
+        Yields the IDs of the movies with a value between low and high, 
+        in order of value.
+        """
+        start, end = self._bounds(low, high)
+        for position in range(start, end):  # Iteration: for loop
+            yield self._entries[position][1]
+
+class TitleOrderIndex(SortedIndex):
+    """
+    A class to keep the movies of a library sorted by title, then by 
+    movie ID, so listings and numbered selections do not sort the library 
+    every time they are shown.
+    """
+
+    def add(self, title, movie_id):
+        """
+        Adds a movie with the given title to the index.
+        """
+        self._insert((title, int(movie_id), movie_id))
+
+    def add_many(self, pairs):
+        """
+        Adds many (title, movie_id) pairs to the index at once.
+        """
+        self._insert_many((title, int(movie_id), movie_id) 
+                          for title, movie_id in pairs)
+
+    def remove(self, title, movie_id):
+        """
+        Removes a movie with the given title from the index.
+        """
+        self._delete((title, int(movie_id), movie_id))
+
+    def ids(self, start=0, end=None):
+        """
+        Returns the IDs of the movies between positions start and end 
+        in title order.
+        """
+        self._merge_pending()
+        return [entry[2] for entry in self._entries[start:end]]
+
+    def ids_with_prefix(self, prefix, limit=None):
+        """
+        Returns the IDs of the movies whose titles start with prefix, in 
+        title order, up to limit of them.
+        """
+        self._merge_pending()
+        ids = []  # Container type: List
+        position = bisect_left(self._entries, (prefix,))
+        while position < len(self._entries) and \
+                self._entries[position][0].startswith(prefix) and \
+                (limit is None or len(ids) < limit):
+            ids.append(self._entries[position][2])
+            position += 1
+        return ids
+
+    def id_at(self, position):
+        """
+        Returns the ID of the movie at a position in title order.
+        """
+        self._merge_pending()
+        return self._entries[position][2]
+
+class MovieIndexes:
+    """
+    A class to hold the genre, year and rating indexes of a library.
+    """
+
+    def __init__(self):
+        """
+        Initializes empty indexes.
+        """
+        self.by_genre = {}  # Container type: Dictionary (genre -> set of id)
+        self.by_year = SortedIndex()
+        self.by_rating = SortedIndex()
+        self.by_title = TitleOrderIndex()
+
+    def add_movie(self, movie_id, movie):
+        """
+        Adds a movie to every index.
+        """
+        self.by_genre.setdefault(movie.genre, set()).add(movie_id)
+        self.by_year.add(movie.year, movie_id)
+        self.by_rating.add(movie.rating, movie_id)
+        self.by_title.add(movie.title, movie_id)
+
+    def add_many(self, records):
+        """
+        Adds many (movie_id, title, year, genre, rating) records to every 
+        index at once.
+        """
+        by_genre = self.by_genre
+        for movie_id, _, _, genre, _ in records:  # Iteration: for loop
+            ids = by_genre.get(genre)
+            if ids is None:
+                ids = by_genre[genre] = set()
+            ids.add(movie_id)
+        self.by_year.add_many((record[2], record[0]) for record in records)
+        self.by_rating.add_many((record[4], record[0]) for record in records)
+        self.by_title.add_many((record[1], record[0]) for record in records)
+
+    def remove_movie(self, movie_id, movie):
+        """
+        Removes a movie from every index.
+        """
+        self._remove_genre(movie.genre, movie_id)
+        self.by_year.remove(movie.year, movie_id)
+        self.by_rating.remove(movie.rating, movie_id)
+        self.by_title.remove(movie.title, movie_id)
+
+    def movie_changed(self, movie_id, field, old_value, new_value):
+        """
+        Moves a movie within the index of a field that changed.
+        """
+        if field == 'genre':
+            self._remove_genre(old_value, movie_id)
+            self.by_genre.setdefault(new_value, set()).add(movie_id)
+        elif field == 'year':
+            self.by_year.remove(old_value, movie_id)
+            self.by_year.add(new_value, movie_id)
+        elif field == 'rating':
+            self.by_rating.remove(old_value, movie_id)
+            self.by_rating.add(new_value, movie_id)
+        elif field == 'title':
+            self.by_title.remove(old_value, movie_id)
+            self.by_title.add(new_value, movie_id)
+
+    def _remove_genre(self, genre, movie_id):
+        """
+        Removes a movie from the genre index.
+        """
+        ids = self.by_genre.get(genre)
+        if ids is not None:
+            ids.discard(movie_id)
+            if not ids:
+                del self.by_genre[genre]  # Drops genres with no movies left
+
+    def clear(self):
+        """
+        Removes every movie from the indexes.
+        """
+        self.by_genre.clear()
+        self.by_year.clear()
+        self.by_rating.clear()
+        self.by_title.clear()
+
+    def merge_pending(self):
+        """
+        Sorts the entries added in bulk into the sorted indexes.
+        """
+        for index in (self.by_year, self.by_rating, self.by_title):
+            index._merge_pending()
+
+    def genres(self):
+        """
+        Returns the genres that have movies, sorted alphabetically.
+        """
+        return sorted(genre for genre in self.by_genre if genre is not None)
+
+    def query(self, movies, genre=None, years=None, ratings=None):
+        """
+        Returns the movies matching every given condition: a genre, a 
+        (first, last) range of years and a (lowest, highest) range of 
+        ratings. Either end of a range may be None. Only the movies of 
+        the most selective condition are looked at.
+        """
+        year_low, year_high = years if years is not None else (None, None)
+        rating_low, rating_high = ratings if ratings is not None \
+            else (None, None)
+
+        candidates = []  # Container type: List of (size, ids)
+        if genre is not None:
+            ids = self.by_genre.get(genre, ())
+            candidates.append((len(ids), ids))
+        if years is not None:
+            candidates.append((self.by_year.count_range(year_low, year_high),
+                               self.by_year.ids_in_range(year_low, 
+                                                         year_high)))
+        if ratings is not None:
+            candidates.append((self.by_rating.count_range(rating_low, 
+                                                          rating_high),
+                               self.by_rating.ids_in_range(rating_low, 
+                                                           rating_high)))
+        if not candidates:
+            return list(movies.values())
+        ids = min(candidates, key=lambda candidate: candidate[0])[1]
+
+        matches = []  # Container type: List
+        for movie_id in ids:  # Iteration: for loop
+            movie = movies[movie_id]
+            if genre is not None and movie.genre != genre:
+                continue
+            if years is not None and not _in_range(movie.year, year_low,
+                                                   year_high):
+                continue
+            if ratings is not None and not _in_range(movie.rating, 
+                                                     rating_low, rating_high):
+                continue
+            matches.append(movie)
+        return matches
+
+def _in_range(value, low, high):
+    """
+    Checks if a value lies between low and high, where None means the 
+    range is open on that side.
+    """
+    if value is None:
+        return False
+    return (low is None or value >= low) and (high is None or value <= high)
@@ -0,0 +1,416 @@
+"""
+This module introduces a MovieLibrary class, a dictionary of movies keyed 
+by movie ID that also keeps a hash index of normalized titles, so that 
+duplicate checks and title lookups do not scan the whole library, and an 
+IdAllocator that hands out new movie IDs without scanning the keys. 
+The library also keeps running rating aggregates and secondary indexes 
+on genre, year and rating up to date.
+"""
+
+from movie import Movie, normalize_title
+from movie_indexes import MovieIndexes
+from rating_stats import LibraryStats
+from title_search import TrigramIndex, search
+from instrumentation import timed
+
+class IdAllocator:
+    """
+    A class to hand out new movie IDs in constant time. It remembers the 
+    highest ID it has seen, so IDs are never handed out twice, even after 
+    the movie with the highest ID was deleted.
+    """
+
+    def __init__(self, high_water=0):
+        """
+        Initializes the allocator with the highest ID in use.
+        """
+        self.high_water = high_water
+
+    def observe(self, movie_id):
+        """
+        Raises the high-water mark if movie_id is above it.
+        """
+        try:
+            value = int(movie_id)
+        except (TypeError, ValueError):
+            return  # IDs that are not numbers do not affect the allocator
+        if value > self.high_water:
+            self.high_water = value
+
+    def next_id(self):
+        """
+        Returns a new unique movie ID.
+        """
+        self.high_water += 1
+        return str(self.high_water)
+
+    def reserve(self, count):
+        """
+        Reserves count new IDs at once and returns them as a range of 
+        integers. Each ID is used as str(number).
+        """
+        if count < 0:
+            raise ValueError("Count must not be negative")
+        start = self.high_water + 1
+        self.high_water += count
+        return range(start, start + count)
+
+class MovieLibrary(dict):
+    """
+    A dictionary of Movie objects keyed by movie ID. Every change made 
+    through the dictionary, or to the title of a movie it holds, is 
+    reflected in the title index.
+    """
+
+    def __init__(self, movies=None):
+        """
+        Initializes the library, optionally with the movies of another 
+        dictionary.
+        """
+        super().__init__()
+        self._title_index = {}  # Container type: Dictionary (title -> id)
+        self.id_allocator = IdAllocator()
+        self._stats = LibraryStats()
+        self._indexes = MovieIndexes()
+        self._bulk_added = []  # Movies not yet indexed, see add_many
+        self._title_search = None  # Built on the first title search
+        if movies:
+            self.update(movies)
+
+    def __setitem__(self, movie_id, movie):
+        """
+        Adds or replaces the movie stored under movie_id.
+        """
+        if movie_id in self:
+            self._unindex_movie(movie_id, dict.__getitem__(self, movie_id))
+        dict.__setitem__(self, movie_id, movie)
+        movie._library = self
+        self._index_movie(movie_id, movie)
+        self.id_allocator.observe(movie_id)
+
+    def __delitem__(self, movie_id):
+        """
+        Removes the movie stored under movie_id.
+        """
+        movie = dict.__getitem__(self, movie_id)
+        dict.__delitem__(self, movie_id)
+        self._unindex_movie(movie_id, movie)
+
+    def pop(self, movie_id, *default):
+        """
+        Removes and returns the movie stored under movie_id.
+        """
+        if movie_id not in self:
+            if default:
+                return default[0]
+            raise KeyError(movie_id)
+        movie = dict.__getitem__(self, movie_id)
+        del self[movie_id]
+        return movie
+
+    def popitem(self):
+        """
+        Removes and returns the last added (movie_id, movie) pair.
+        """
+        movie_id = next(reversed(self))
+        return movie_id, self.pop(movie_id)
+
+    def setdefault(self, movie_id, movie=None):
+        """
+        Returns the movie stored under movie_id, adding movie if there is 
+        none.
+        """
+        if movie_id not in self:
+            self[movie_id] = movie
+        return dict.__getitem__(self, movie_id)
+
+    def update(self, *args, **kwargs):
+        """
+        Adds or replaces the movies of another dictionary.
+        """
+        for movie_id, movie in dict(*args, **kwargs).items():
+            self[movie_id] = movie
+
+    @property
+    def stats(self):
+        """
+        Returns the rating aggregates of the library.
+        """
+        self._index_bulk_added()
+        return self._stats
+
+    @property
+    def indexes(self):
+        """
+        Returns the secondary indexes of the library.
+        """
+        self._index_bulk_added()
+        return self._indexes
+
+    def add_many(self, movies):
+        """
+        Adds many movies at once, each under its own ID. The secondary 
+        indexes and rating aggregates are brought up to date in one pass 
+        the next time they are used, which makes loading a large library 
+        much faster than adding movies one by one.
+        """
+        bulk_added = self._bulk_added
+        for movie in movies:  # Iteration: for loop
+            movie_id = movie.get_id()
+            if movie_id in self:
+                self[movie_id] = movie  # Replacements go the usual way
+                continue
+            dict.__setitem__(self, movie_id, movie)
+            movie._library = self
+            self._add_title(movie_id, movie.title)
+            self.id_allocator.observe(movie_id)
+            if self._title_search is not None:
+                self._title_search.add(movie_id, movie.title)
+            # The values are kept as added, in case the movie changes 
+            # before it is indexed
+            bulk_added.append((movie_id, movie.title, movie.year, 
+                               movie.genre, movie.rating))
+
+    def add_records(self, records, high_water=None):
+        """
+        Adds many movies given as (movie_id, title, year, genre, rating) 
+        records of checked and shared values, such as the records of a 
+        binary snapshot, creating the Movie objects without checking the 
+        values again. Like add_many, the secondary indexes and rating 
+        aggregates are built on first use. high_water is the highest 
+        numeric ID among the records, if the caller knows it, which saves 
+        looking at every ID.
+        """
+        bulk_added = self._bulk_added
+        title_index = self._title_index
+        from_stored = Movie.from_stored
+        observe = self.id_allocator.observe if high_water is None else None
+        for record in records:  # Iteration: for loop
+            movie_id, title = record[0], record[1]
+            movie = from_stored(*record)
+            if movie_id in self:
+                self[movie_id] = movie  # Replacements go the usual way
+                continue
+            dict.__setitem__(self, movie_id, movie)
+            movie._library = self
+            key = normalize_title(title)
+            if key in title_index:  # Conditional if-statement
+                self._add_title(movie_id, title)
+            else:
+                title_index[key] = movie_id  # The common, unique case
+            if observe is not None:
+                observe(movie_id)
+            if self._title_search is not None:
+                self._title_search.add(movie_id, title)
+            bulk_added.append(record)  # Records do not change
+        if high_water is not None:
+            self.id_allocator.observe(high_water)
+
+    def _index_bulk_added(self):
+        """
+        Adds the movies of add_many to the secondary indexes and the 
+        rating aggregates.
+        """
+        if self._bulk_added:
+            records, self._bulk_added = self._bulk_added, []
+            self._stats.add_many((record[4], record[3], record[2]) 
+                                 for record in records)
+            self._indexes.add_many(records)
+
+    def clear(self):
+        """
+        Removes every movie from the library.
+        """
+        for movie in self.values():
+            if movie._library is self:
+                movie._library = None
+        dict.clear(self)
+        self._title_index.clear()
+        self._bulk_added = []
+        self._title_search = None
+        self._stats.clear()
+        self._indexes.clear()
+
+    def has_title(self, title):
+        """
+        Checks if a movie with the given title is in the library.
+        """
+        return normalize_title(title) in self._title_index
+
+    def find_by_title(self, title):
+        """
+        Returns a movie with the given title, or None if there is none.
+        """
+        entry = self._title_index.get(normalize_title(title))
+        if entry is None:
+            return None
+        if isinstance(entry, set):  # Several movies share the title
+            entry = min(entry, key=int)
+        return dict.__getitem__(self, entry)
+
+    def query(self, genre=None, years=None, ratings=None):
+        """
+        Returns the movies of a genre, within a (first, last) range of 
+        years and within a (lowest, highest) range of ratings. Conditions 
+        left as None are not applied.
+        """
+        return self.indexes.query(self, genre, years, ratings)
+
+    @timed("sorted_by_title")
+    def sorted_by_title(self):
+        """
+        Returns the movies sorted by title, then by movie ID.
+        """
+        return [dict.__getitem__(self, movie_id) 
+                for movie_id in self.indexes.by_title.ids()]
+
+    @timed("title_page")
+    def title_page(self, page, page_size):
+        """
+        Returns page number page (counting from 1) of the movies sorted by 
+        title, with page_size movies per page.
+        """
+        start = (page - 1) * page_size
+        return [dict.__getitem__(self, movie_id) for movie_id 
+                in self.indexes.by_title.ids(start, start + page_size)]
+
+    @timed("movie_at")
+    def movie_at(self, position):
+        """
+        Returns the movie at a position (counting from 1) of the movies 
+        sorted by title.
+        """
+        if not 0 < position <= len(self):
+            raise IndexError("Position is outside of the library")
+        return dict.__getitem__(self, 
+                                self.indexes.by_title.id_at(position - 1))
+
+    def titles_starting_with(self, prefix, limit=None):
+        """
+        Returns the movies whose titles start with prefix, in title order.
+        """
+        return [dict.__getitem__(self, movie_id) for movie_id in 
+                self.indexes.by_title.ids_with_prefix(normalize_title(prefix), 
+                                                      limit)]
+
+    def search_titles(self, query, limit=10):
+        """
+        Returns up to limit movies whose titles are most like the query, 
+        even if it is misspelled, best match first. The search index is 
+        built on the first search and kept up to date afterwards.
+        """
+        return search(self, self._title_search_index(), query, limit)
+
+    def _title_search_index(self):
+        """
+        Returns the title search index, building it on first use.
+        """
+        if self._title_search is None:
+            self._title_search = TrigramIndex()
+            for movie_id, movie in self.items():  # Iteration: for loop
+                self._title_search.add(movie_id, movie.title)
+        return self._title_search
+
+    def prepare_for_reads(self):
+        """
+        Builds now what the library otherwise builds on first use: the 
+        indexes and aggregates of movies added with add_many, the sorted 
+        order of the indexes and the title search index. Until the next 
+        change, reading the library then changes nothing, so several 
+        threads may read it at the same time.
+        """
+        self.stats  # Indexes the movies added in bulk
+        self.indexes.merge_pending()
+        self._title_search_index()
+
+    def find_titles(self, query, limit=10):
+        """
+        Returns up to limit movies for a title search: titles starting 
+        with the query first, then the closest other titles.
+        """
+        found = self.titles_starting_with(query, limit)
+        for movie in self.search_titles(query, limit):
+            if len(found) == limit:
+                break
+            if all(movie is not other for other in found):
+                found.append(movie)
+        return found
+
+    def genres(self):
+        """
+        Returns the genres that have movies, sorted alphabetically.
+        """
+        return self.indexes.genres()
+
+    def verify_stats(self):
+        """
+        Recomputes the rating aggregates from scratch and raises an 
+        AssertionError if they do not match the cached ones.
+        """
+        self.stats.verify(self)
+
+    def _index_movie(self, movie_id, movie):
+        """
+        Adds a movie to the title index, the secondary indexes and the 
+        rating aggregates.
+        """
+        self.stats.add_movie(movie)
+        self.indexes.add_movie(movie_id, movie)
+        if self._title_search is not None:
+            self._title_search.add(movie_id, movie.title)
+        self._add_title(movie_id, movie.title)
+
+    def _add_title(self, movie_id, title):
+        """
+        Adds an entry for movie_id under the given title.
+        """
+        key = normalize_title(title)
+        entry = self._title_index.get(key)
+        if entry is None:
+            self._title_index[key] = movie_id  # The common, unique case
+        elif isinstance(entry, set):
+            entry.add(movie_id)
+        elif entry != movie_id:
+            self._title_index[key] = {entry, movie_id}  # Container: Set
+
+    def _unindex_movie(self, movie_id, movie):
+        """
+        Removes a movie from the title index, the secondary indexes and 
+        the rating aggregates.
+        """
+        if movie._library is self:
+            movie._library = None
+        self._remove_title(movie_id, movie.title)
+        self.stats.remove_movie(movie)
+        self.indexes.remove_movie(movie_id, movie)
+        if self._title_search is not None:
+            self._title_search.remove(movie_id, movie.title)
+
+    def _remove_title(self, movie_id, title):
+        """
+        Removes the entry of movie_id under the given title.
+        """
+        key = normalize_title(title)
+        entry = self._title_index.get(key)
+        if isinstance(entry, set):
+            entry.discard(movie_id)
+            if len(entry) == 1:
+                self._title_index[key] = entry.pop()
+        elif entry == movie_id:
+            del self._title_index[key]
+
+    def _movie_changed(self, movie, field, old_value, new_value):
+        """
+        Updates the indexes after a field of a movie in the library changed.
+        """
+        if field == 'title':
+            movie_id = movie.get_id()
+            self._remove_title(movie_id, old_value)
+            self._add_title(movie_id, movie.title)
+            if self._title_search is not None:
+                self._title_search.remove(movie_id, old_value)
+                self._title_search.add(movie_id, movie.title)
+        else:
+            self.stats.movie_changed(movie, field, old_value)
+        self.indexes.movie_changed(movie.get_id(), field, old_value, 
+                                   new_value)
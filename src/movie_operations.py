@@ -2,48 +2,110 @@
 Handles movie-related operations and functions in the Movies Library.
 """
 
-from movie import Movie  
-from file_operations import write_movies_to_file
+from collections.abc import Mapping
+
+from movie import GENRES
+from movie_library import MovieLibrary
+from library_service import LibraryService
+from history import describe
+from instrumentation import timed
+
+PAGE_SIZE = 20  # Movies listed at a time, so large libraries stay readable
 
 def generate_movie_id(movies):
     """
-    Generates a new unique movie ID based on the current maximum ID.
+    Generates a new unique movie ID. A MovieLibrary hands it out from its 
+    ID allocator, a plain dictionary is scanned for the current maximum ID.
     """
+    if isinstance(movies, MovieLibrary):
+        return movies.id_allocator.next_id()
     max_id = max((int(mid) for mid in movies.keys()), default=0)
     return str(max_id + 1)
 
+@timed("calculate_average_rating")
 def calculate_average_rating(movies):
     """
-    Calculates and returns the average rating of the movies.
+    Calculates and returns the average rating of the movies. Accepts a 
+    dictionary of movies or any iterable of Movie objects, such as 
+    iter_movies_from_file, which is averaged without loading it whole.
     """
+    if isinstance(movies, MovieLibrary):
+        # Served from the running aggregates kept by the library
+        return round(movies.stats.overall.average(), 2)
+    if isinstance(movies, Mapping):
+        movies = movies.values()
     total_rating = 0
     rated_movies = 0
-    for movie in movies.values():  # Iteration: for loop
+    for movie in movies:  # Iteration: for loop
         if movie.rating is not None:  # Only considers movies with ratings
             total_rating += movie.rating  # Adds rating to total
             rated_movies += 1  # Increments count of rated movies
     # Returns the average rating, or 0 if no rated movies are present
     return round(total_rating / rated_movies, 2) if rated_movies > 0 else 0
 
-def display_menu():
+def display_rating_breakdown(movies):
+    """
+    Displays the spread of ratings in the library and the average rating 
+    of each genre.
+    """
+    overall = movies.stats.overall
+    if not overall.count:  # Conditional if-statement
+        return
+    print(f"Rated movies: {overall.count}, lowest: {overall.minimum():.2f}, "
+          f"highest: {overall.maximum():.2f}, "
+          f"standard deviation: {overall.stddev():.2f}")
+    print("\nAverage rating by genre:")
+    for genre, stats in sorted(movies.stats.by_genre.items()):
+        print(f"{genre:<12} {stats.average():5.2f} ({stats.count} rated)")
+    print("_" * 36)
+
+def display_analytics(movies):
     """
-    Displays the main menu for the Movies Library.
+    Displays the rating report of the library: a histogram of ratings, 
+    the spread of ratings by genre and by decade, the best rated movies 
+    of each genre and how many movies are unrated.
     """
-    print("\nMovies Library Menu:")
-    print("1. Add a movie")
-    print("2. Edit a movie")
-    print("3. Delete a movie")
-    print("4. Display all movies")
-    print("5. Find movies by genre")
-    print("6. Show average rating")
-    print("7. Exit the library")
+    if not movies:  # Conditional if-statement
+        print("\nNo movies in the library.\n" + "_" * 36)
+        return
+    from analytics import analyze  # Loaded on first use, with NumPy
+    report = analyze(movies)
+    print(f"\n{report['movies']} movies, {report['rated']} rated, "
+          f"{report['unrated']} unrated")
+    widest = max(report["histogram"]) or 1
+    print("\nRatings:")
+    for low, count in enumerate(report["histogram"]):  # Iteration: for loop
+        print(f"{low:2}-{low + 1:<2} {'#' * round(count / widest * 30):<30} "
+              f"{count}")
+
+    for title, groups in (("genre", report["by_genre"]), 
+                          ("decade", report["by_decade"])):
+        print(f"\n{'By ' + title:<12} {'rated':>7} {'unrated':>8} "
+              f"{'mean':>6} {'median':>6} {'p10':>6} {'p90':>6}")
+        for name, summary in groups.items():
+            if not summary["count"]:
+                print(f"{str(name):<12} {0:>7} {summary['unrated']:>8}")
+                continue
+            print(f"{str(name):<12} {summary['count']:>7} "
+                  f"{summary['unrated']:>8} {summary['mean']:6.2f} "
+                  f"{summary['median']:6.2f} "
+                  f"{summary['percentiles'][10]:6.2f} "
+                  f"{summary['percentiles'][90]:6.2f}")
+
+    print("\nBest rated by genre:")
+    for genre, summary in report["by_genre"].items():
+        if summary["top"]:
+            print(f"{genre}:")
+            for movie in summary["top"][:3]:  # Iteration: for loop
+                print(f"  {movie}")
     print("_" * 36)
 
-def add_movie(movies, file_path):
+def add_movie(movies, storage, history=None):
     """
-    Handles the process of adding a new movie to the library.
+    Handles the process of adding a new movie to the library and stores 
+    it with the storage repository. The addition is recorded in the 
+    history, if one is given.
     """
-    movie_id = generate_movie_id(movies)
     title = None
 
     while not title:  # Iteration: while loop
@@ -52,9 +114,7 @@ def add_movie(movies, file_path):
             return  # Returns to the main menu
         title = title.upper()  # Converts title to uppercase
 
-        temp_movie = Movie(None, title, None, None)
-
-        if temp_movie in movies.values():  # Checks for duplicate titles
+        if movies.has_title(title):  # Checks for duplicate titles
             print(f"Looks like {title} already exists in your library.")
             return  # Returns to the main menu
 
@@ -75,11 +135,7 @@ def add_movie(movies, file_path):
         except ValueError:  # Handles invalid year input
             print("Please make sure to add a valid year.")
 
-    genres = (  # Container type: Tuple
-        "Action", "Adventure", "Comedy", "Drama", "Fantasy", "Horror", 
-        "Mystery", "Romance", "Sci-Fi", "Thriller", "Animation", 
-        "Biography", "Crime", "Documentary", "Family"
-    )
+    genres = GENRES  # Container type: Tuple
     print(f"\nWhat is the genre of {title}?")
     
     for i in range(5):
@@ -115,35 +171,114 @@ def add_movie(movies, file_path):
         except ValueError:  # Handles invalid rating input
             print("Invalid input. Please enter a number between 0 and 10.")
 
-    movie = Movie(movie_id, title, year, genre, rating)
-    movies[movie_id] = movie  # Adds the new movie to the dictionary
-    write_movies_to_file(movies, file_path)  # Saves changes to the file
+    try:  # Adds the movie to the library and saves it
+        LibraryService(movies, storage, history).add(title, year, genre, 
+                                                     rating)
+    except ValueError as e:  # Handles values the library rejects
+        print(f"\nThe movie could not be added: {e}\n" + "_" * 36)
+        return
     print(f"\nMovie '{title}' added successfully.\n" + "_" * 36)
 
-def edit_movie(movies, file_path):
+def display_title_page(movies, page):
     """
-    Allows the user to edit existing movie's details.
+    Prints page number page of the movies sorted by title, numbering 
+    them by their position in the whole list. Only the movies of the 
+    page are read from the library. Returns the number of pages.
     """
-    print("\nMovies in your library:")
-    sorted_movies = sorted(movies.values(), key=lambda movie: movie.title)
-    for i, movie in enumerate(sorted_movies, 1):  # Iteration: for loop
+    pages = max(1, -(-len(movies) // PAGE_SIZE))  # Rounds up
+    start = (page - 1) * PAGE_SIZE
+    for i, movie in enumerate(movies.title_page(page, PAGE_SIZE), 
+                              start + 1):  # Iteration: for loop
+        print(f"{i}. {movie}")
+    if pages > 1:  # Conditional if-statement
+        print(f"\nPage {page} of {pages} (n. Next page, p. Previous page)")
+    return pages
+
+def turn_page(choice, page, pages):
+    """
+    Returns the page to show after a choice of 'n' or 'p', or None if 
+    the choice does not turn the page.
+    """
+    if choice == 'n' and page < pages:
+        return page + 1
+    if choice == 'p' and page > 1:
+        return page - 1
+    return None
+
+def choose_movie(movies, action):
+    """
+    Lists the movies by title one page at a time and lets the user 
+    select one by its number, or search for it by title. Returns the 
+    selected movie, or None to return to the menu.
+    """
+    page = 1
+    while True:  # Shows a page, then asks until a movie is selected
+        print("\nMovies in your library:")
+        pages = display_title_page(movies, page)
+        print("\ns. Search by title")
+        print("m. Return to menu")
+        print("_" * 36)
+
+        while True:
+            try:  # Try block to handle selection of a movie
+                movie_choice = input(f"\nSelect the movie to {action} by "
+                                     "number (or 's' to search, 'm' to "
+                                     "return): ").lower()
+                if movie_choice == 'm':
+                    return None  # Returns to the main menu
+                if movie_choice == 's':
+                    selected_movie = search_movie(movies, action)
+                    if selected_movie is None:
+                        continue  # Nothing selected, asks again
+                    return selected_movie  # Movie found by title
+                new_page = turn_page(movie_choice, page, pages)
+                if new_page is not None:
+                    page = new_page
+                    break  # Shows the other page
+                # Finds the movie at that position in title order
+                return movies.movie_at(int(movie_choice))
+            except (ValueError, IndexError):  # Handles invalid selection
+                print("Something went wrong. Please choose a valid number.")
+
+def search_movie(movies, action):
+    """
+    Asks for a title, which may be partial or misspelled, and lets the 
+    user pick one of the closest matches. Returns the selected movie, or 
+    None if nothing was selected.
+    """
+    query = input(f"\nEnter the title of the movie to {action}: ")
+    if not query.strip():  # Conditional if-statement
+        return None
+    found = movies.find_titles(query)  # Container: List
+    if not found:
+        print("No movies found with a title like that.")
+        return None
+    print("\nMatching movies:")
+    for i, movie in enumerate(found, 1):  # Iteration: for loop
         print(f"{i}. {movie}")
-    print("\nm. Return to menu")
-    print("_" * 36)
 
     while True:
-        try:  # Try block to handle selection of a movie to edit
-            movie_choice = input("\nSelect the movie to edit by number"
+        try:  # Try block to handle selection of a matching movie
+            movie_choice = input(f"\nSelect the movie to {action} by number "
                                  "(or 'm' to return): ")
             if movie_choice.lower() == 'm':
-                return  # Returns to the main menu
+                return None  # Returns to the list of movies
             movie_choice = int(movie_choice)  # Converts input to integer
-            assert 0 < movie_choice <= len(sorted_movies), "Invalid choice."
-            selected_movie = sorted_movies[movie_choice - 1]  # Selects movie
-            break  # Valid selection, breaks the loop
+            assert 0 < movie_choice <= len(found), "Invalid choice."
+            return found[movie_choice - 1]  # Returns the selected movie
         except (ValueError, AssertionError):  # Handles invalid selection
             print("Something went wrong. Please choose a valid number.")
 
+def edit_movie(movies, storage, history=None):
+    """
+    Allows the user to edit existing movie's details and stores the 
+    changed movie with the storage repository. The edit is recorded in 
+    the history, if one is given.
+    """
+    selected_movie = choose_movie(movies, "edit")
+    if selected_movie is None:
+        return  # Returns to the main menu
+
     print("\nWhat would you like to edit?")
     print("1. Name")
     print("2. Year")
@@ -162,17 +297,19 @@ def edit_movie(movies, file_path):
         else:
             print("Invalid choice. Please select a valid option.")
 
+    title = selected_movie.title
+    changes = {}  # Container type: Dictionary, saved together at the end
     if choice == '1' or choice == '5':
         # Edits the movie title
         new_name = input(f"\nWhat is the correct name for "
-                         f"'{selected_movie.title}'? ").upper()
-        selected_movie.title = new_name
+                         f"'{title}'? ").upper()
+        changes['title'] = title = new_name
         print(f"\nName updated to '{new_name}'\n" + "_" * 36)
     if choice == '2' or choice == '5':
         while True:
             try:  # Try block to validate the new year
                 new_year = input(f"\nWhat is the correct year for "
-                                 f"'{selected_movie.title}'? ")
+                                 f"'{title}'? ")
                 if new_year.lower() == 'm':
                     return  # Returns to the main menu
                 new_year = int(new_year)  # Converts input to integer
@@ -186,15 +323,11 @@ def edit_movie(movies, file_path):
                     break  # Valid year, breaks the loop
             except ValueError:  # Handles invalid year input
                 print("Please make sure to add a valid year.")
-        selected_movie.year = new_year
+        changes['year'] = new_year
         print(f"\nYear updated to '{new_year}'\n" + "_" * 36)
     if choice == '3' or choice == '5':
-        genres = (  # Container type: Tuple
-            "Action", "Adventure", "Comedy", "Drama", "Fantasy", 
-            "Horror", "Mystery", "Romance", "Sci-Fi", "Thriller", 
-            "Animation", "Biography", "Crime", "Documentary", "Family"
-        )
-        print(f"\nWhat is the correct genre for '{selected_movie.title}'?")
+        genres = GENRES  # Container type: Tuple
+        print(f"\nWhat is the correct genre for '{title}'?")
         for i in range(5):  # Iteration: for loop
             print(f"{i+1}. {genres[i]:<12} {i+6}. {genres[i+5]:<12} "
                   f"{i+11}. {genres[i+10]:<12}")
@@ -210,22 +343,22 @@ def edit_movie(movies, file_path):
                 genre_choice = int(genre_choice)  # Converts input to integer
                 if 1 <= genre_choice <= len(genres):
                     # Sets genre:
-                    selected_movie.genre = genres[genre_choice - 1]  
+                    changes['genre'] = genres[genre_choice - 1]  
                     break  # Valid genre selected, breaks the loop
                 else:
                     print(f"Invalid choice. Please select a number between "
                           f"1 and {len(genres)}.")
             except ValueError:  # Handles invalid genre input
                 print("Invalid input. Please enter a number.")
-        print(f"\nGenre updated to '{selected_movie.genre}'\n" + "_" * 36)
+        print(f"\nGenre updated to '{changes['genre']}'\n" + "_" * 36)
     if choice == '4' or choice == '5':
         while True:
             try:  # Try block to validate the new rating
                 new_rating = round(float(input(f"\nWhat is the correct rating "
-                                               f"for '{selected_movie.title}'?"
+                                               f"for '{title}'?"
                                                " (0-10): ")), 2)
                 if 0 <= new_rating <= 10:
-                    selected_movie.add_rating(new_rating)  # Sets rating
+                    changes['rating'] = new_rating  # Sets rating
                     break  # Valid rating, breaks the loop
                 else:
                     print("Rating must be between 0 and 10.")
@@ -233,50 +366,63 @@ def edit_movie(movies, file_path):
                 print("Invalid input. Please enter a number between 0 and 10.")
         print(f"\nRating updated to '{new_rating}'\n" + "_" * 36)
     
-    write_movies_to_file(movies, file_path)  # Saves changes to the file
+    try:  # Applies the changes together and saves them
+        LibraryService(movies, storage, history).edit(
+            selected_movie.get_id(), **changes)
+    except ValueError as e:  # Handles values the library rejects
+        print(f"\nThe changes could not be saved: {e}\n" + "_" * 36)
 
-def delete_movie(movies, file_path):
+def delete_movie(movies, storage, history=None):
     """
-    Allows the user to delete a movie from the library.
+    Allows the user to delete a movie from the library and removes it 
+    from the storage repository. The deletion is recorded in the history, 
+    if one is given.
     """
-    print("\nMovies in your library:")
-    sorted_movies = sorted(movies.values(), key=lambda movie: movie.title)
-    for i, movie in enumerate(sorted_movies, 1):  # Iteration: for loop
-        print(f"{i}. {movie}")
-    print("\nm. Return to menu")
-    print("_" * 36)
+    selected_movie = choose_movie(movies, "delete")
+    if selected_movie is None:
+        return  # Returns to the main menu
 
-    while True:
-        try:  # Try block to handle user selection of a movie to delete
-            movie_choice = input("\nSelect the movie to delete by number (or "
-                                 "'m' to return): ")
-            if movie_choice.lower() == 'm':
-                return  # Returns to the main menu
-            movie_choice = int(movie_choice)  # Converts input to integer
-            assert 0 < movie_choice <= len(sorted_movies), "Invalid choice."
-            selected_movie = sorted_movies[movie_choice - 1]  # Selects movie
-            del movies[selected_movie.get_id()]  # Deletes the movie
-            print(f"\nMovie '{selected_movie.title}' deleted successfully.\n" 
-                  + "_" * 36)
-            break  # Valid selection, breaks the loop
-        except (ValueError, AssertionError):  # Handles invalid selection
-            print("Something went wrong. Please choose a valid number.")
-    
-    write_movies_to_file(movies, file_path)  # Saves changes to the file
+    # Deletes the movie and saves the change
+    LibraryService(movies, storage, history).delete(selected_movie.get_id())
+    print(f"\nMovie '{selected_movie.title}' deleted successfully.\n" 
+          + "_" * 36)
+
+def undo_change(movies, storage, history, redo=False):
+    """
+    Undoes the latest change recorded in the history, or redoes the 
+    latest undone change, and stores the movie it concerns.
+    """
+    service = LibraryService(movies, storage, history)
+    try:  # Try block to handle an empty history or a conflicting change
+        delta = service.redo() if redo else service.undo()
+    except (KeyError, ValueError) as e:
+        print(f"\n{e.args[0]}.\n" + "_" * 36)
+        return
+    movie = movies.get(delta.movie_id)
+    title = movie.title if movie is not None else None
+    print(f"\n{'Redid' if redo else 'Undid'} {describe(delta, title)}.\n" 
+          + "_" * 36)
 
 def display_movies(movies):
     """
-    Displays all movies in the library.
+    Displays all movies in the library, PAGE_SIZE movies at a time.
     """
     if not movies:  # Conditional if-statement
         print("\nNo movies in the library.\n" + "_" * 36)
         return
     
-    sorted_movie_list = sorted(movies.values(), key=lambda movie: movie.title)
-    print("\nMovies in your library:")
-    for i, movie in enumerate(sorted_movie_list, 1):  # Iteration: for loop
-        print(f"{i}. {movie}")
-    print("_" * 36)
+    page = 1
+    while True:  # Iteration: while loop, one page at a time
+        print("\nMovies in your library:")
+        pages = display_title_page(movies, page)  # Kept sorted by library
+        print("_" * 36)
+        if pages == 1:
+            return
+        choice = input("\nEnter 'n' or 'p' to turn the page (or any other "
+                       "key to return): ").lower()
+        page = turn_page(choice, page, pages)
+        if page is None:
+            return  # Returns to the main menu
 
 def display_movies_by_genre(movies):
     """
@@ -286,9 +432,8 @@ def display_movies_by_genre(movies):
         print("\nNo movies in the library.\n" + "_" * 36)
         return
     
-    genre_set = {movie.genre for movie in movies.values()}  # Container: Set
     print("\nGenres available:")
-    sorted_genres = sorted(genre_set)  # Sorts genres alphabetically
+    sorted_genres = movies.genres()  # Genres from the genre index
     for i, genre in enumerate(sorted_genres, 1):  # Iteration: for loop
         print(f"{i}. {genre}")
     print("\nm. Return to menu")
@@ -307,15 +452,13 @@ def display_movies_by_genre(movies):
         except (ValueError, AssertionError):  # Handles invalid selection
             print("Something went wrong. Please choose a valid number.")
 
-    filtered_movies = [  # Container: List
-        movie for movie in movies.values() if movie.genre == selected_genre
-    ]
-    if not filtered_movies:  # Conditional if-statement
+    # Container: List, sorted by title
+    sorted_filtered_movies = LibraryService(movies, None).filter_movies(
+        genre=selected_genre)
+    if not sorted_filtered_movies:  # Conditional if-statement
         print(f"\nNo movies found in the genre: {selected_genre}\n" + "_" * 36)
     else:
         print(f"\nMovies in the genre '{selected_genre}':")
-        sorted_filtered_movies = sorted(filtered_movies, 
-                                        key=lambda movie: movie.title)
         # Iteration: for loop:
         for i, movie in enumerate(sorted_filtered_movies, 1):  
             print(f"{i}. {movie}")
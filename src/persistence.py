@@ -0,0 +1,123 @@
+"""
+Writes changes to the Movies Library in a background thread, so the 
+interactive prompt never waits for the disk. Changes arriving in quick 
+succession are coalesced and written together once no new change has 
+arrived for SAVE_DELAY seconds, or at the latest MAX_SAVE_DELAY seconds 
+after the first of them, which bounds what a crash can lose.
+"""
+
+import atexit
+import threading
+import time
+
+SAVE_DELAY = 0.5  # Quiet period that ends a burst of changes, in seconds
+MAX_SAVE_DELAY = 2.0  # Longest a change waits during a long burst
+
+class BackgroundWriter:
+    """
+    Collects changes keyed by movie ID and hands them to a write function 
+    on a background thread. A later change to the same movie replaces the 
+    pending one, so a burst of edits becomes a single record.
+    """
+
+    def __init__(self, write, delay=SAVE_DELAY, max_delay=MAX_SAVE_DELAY):
+        """
+        Starts the writer thread. write is called with the list of pending 
+        changes, in the order their movies were first changed.
+        """
+        self._write = write
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending = {}  # Container type: Dictionary
+        self._condition = threading.Condition()
+        self._first_change = self._last_change = None
+        self._writing = False
+        self._write_now = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True, 
+                                        name="library-writer")
+        self._thread.start()
+        atexit.register(self.close)  # Pending changes survive a normal exit
+
+    def submit(self, changes):
+        """
+        Queues (key, change) pairs and returns without waiting for them 
+        to be written.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The writer is closed")
+            for key, change in changes:  # Iteration: for loop
+                self._pending[key] = change
+            now = time.monotonic()
+            if self._first_change is None:
+                self._first_change = now
+            self._last_change = now
+            self._condition.notify_all()
+
+    @property
+    def pending(self):
+        """
+        Returns the number of changes waiting to be written.
+        """
+        with self._condition:
+            return len(self._pending)
+
+    def _due(self):
+        """
+        Returns the time at which the pending changes are written.
+        """
+        return min(self._last_change + self.delay, 
+                   self._first_change + self.max_delay)
+
+    def _run(self):
+        """
+        Waits for changes and writes each burst once it has settled.
+        """
+        while True:  # Iteration type: while loop
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return  # Closed with nothing left to write
+                # Keeps collecting changes until the burst has settled
+                while not (self._closed or self._write_now):
+                    remaining = self._due() - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                changes = list(self._pending.values())
+                self._pending.clear()
+                self._first_change = self._last_change = None
+                self._write_now = False
+                self._writing = True
+            try:
+                self._write(changes)
+            except Exception as e:  # Keeps the thread alive for later saves
+                print(f"An error occurred while saving changes: {e}")
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    def flush(self):
+        """
+        Writes the pending changes now and waits until they are written.
+        """
+        with self._condition:
+            while self._pending or self._writing:
+                self._write_now = True
+                self._condition.notify_all()
+                self._condition.wait()
+
+    def close(self):
+        """
+        Writes the pending changes and stops the thread. Closing twice is 
+        harmless.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        atexit.unregister(self.close)
@@ -0,0 +1,221 @@
+"""
+This module keeps running aggregates of movie ratings, overall, per genre 
+and per decade, so averages and spreads are available without walking 
+the library. Ratings have two decimals, so they are summed as whole 
+hundredths and the cached totals never drift from a full recomputation.
+"""
+
+import math
+from collections import Counter
+
+def rating_to_hundredths(rating):
+    """
+    Returns a rating as a whole number of hundredths.
+    """
+    return round(rating * 100)
+
+def get_decade(year):
+    """
+    Returns the decade a year belongs to, e.g. 1990 for 1994.
+    """
+    return year // 10 * 10 if year is not None else None
+
+class RatingStats:
+    """
+    A class to hold the count, sum, sum of squares, minimum and maximum of 
+    a group of ratings, updated one rating at a time.
+    """
+
+    def __init__(self):
+        """
+        Initializes empty aggregates.
+        """
+        self.count = 0
+        self.total = 0  # Sum of ratings in hundredths
+        self.total_squares = 0  # Sum of squared ratings in hundredths
+        self._value_counts = {}  # Container type: Dictionary (for min/max)
+
+    def add(self, rating):
+        """
+        Adds a rating to the aggregates.
+        """
+        self.add_hundredths(rating_to_hundredths(rating))
+
+    def add_hundredths(self, value, times=1):
+        """
+        Adds a rating given in hundredths to the aggregates, as many times 
+        as given.
+        """
+        self.count += times
+        self.total += value * times
+        self.total_squares += value * value * times
+        self._value_counts[value] = self._value_counts.get(value, 0) + times
+
+    def remove(self, rating):
+        """
+        Removes a rating that was added before from the aggregates.
+        """
+        self.remove_hundredths(rating_to_hundredths(rating))
+
+    def remove_hundredths(self, value):
+        """
+        Removes a rating given in hundredths from the aggregates.
+        """
+        self.count -= 1
+        self.total -= value
+        self.total_squares -= value * value
+        if self._value_counts[value] == 1:
+            del self._value_counts[value]
+        else:
+            self._value_counts[value] -= 1
+
+    def average(self):
+        """
+        Returns the average rating, or 0 if there are no ratings.
+        """
+        return self.total / self.count / 100 if self.count else 0
+
+    def stddev(self):
+        """
+        Returns the population standard deviation of the ratings.
+        """
+        if not self.count:
+            return 0
+        variance = (self.total_squares * self.count - self.total ** 2) / \
+            self.count ** 2
+        return math.sqrt(max(variance, 0)) / 100
+
+    def minimum(self):
+        """
+        Returns the lowest rating, or None if there are no ratings. There 
+        are at most 1001 distinct ratings, so this takes constant time.
+        """
+        return min(self._value_counts) / 100 if self._value_counts else None
+
+    def maximum(self):
+        """
+        Returns the highest rating, or None if there are no ratings.
+        """
+        return max(self._value_counts) / 100 if self._value_counts else None
+
+    def as_tuple(self):
+        """
+        Returns the aggregates as a tuple, used to compare them.
+        """
+        return (self.count, self.total, self.total_squares,
+                sorted(self._value_counts.items()))
+
+class LibraryStats:
+    """
+    A class to hold rating aggregates for the whole library, for each 
+    genre and for each decade.
+    """
+
+    def __init__(self):
+        """
+        Initializes empty aggregates.
+        """
+        self.overall = RatingStats()
+        self.by_genre = {}  # Container type: Dictionary (genre -> stats)
+        self.by_decade = {}  # Container type: Dictionary (decade -> stats)
+
+    def _groups(self, genre, year):
+        """
+        Returns the aggregates a rating of the given genre and year 
+        counts towards.
+        """
+        genre_stats = self.by_genre.get(genre)
+        if genre_stats is None:
+            genre_stats = self.by_genre[genre] = RatingStats()
+        decade = get_decade(year)
+        decade_stats = self.by_decade.get(decade)
+        if decade_stats is None:
+            decade_stats = self.by_decade[decade] = RatingStats()
+        return self.overall, genre_stats, decade_stats
+
+    def add(self, rating, genre, year):
+        """
+        Adds a rating to every aggregate it belongs to.
+        """
+        if rating is not None:
+            value = rating_to_hundredths(rating)
+            for stats in self._groups(genre, year):
+                stats.add_hundredths(value)
+
+    def remove(self, rating, genre, year):
+        """
+        Removes a rating from every aggregate it belongs to.
+        """
+        if rating is not None:
+            value = rating_to_hundredths(rating)
+            for stats in self._groups(genre, year):
+                stats.remove_hundredths(value)
+            # Drops groups that have no ratings left
+            if not self.by_genre[genre].count:
+                del self.by_genre[genre]
+            if not self.by_decade[get_decade(year)].count:
+                del self.by_decade[get_decade(year)]
+
+    def add_movie(self, movie):
+        """
+        Adds the rating of a movie to the aggregates.
+        """
+        self.add(movie.rating, movie.genre, movie.year)
+
+    def add_many(self, records):
+        """
+        Adds many (rating, genre, year) records at once. Equal ratings of 
+        the same genre and decade are counted together and added in one 
+        step.
+        """
+        groups = Counter(  # Container type: Counter (a dictionary)
+            (genre, get_decade(year), rating_to_hundredths(rating))
+            for rating, genre, year in records if rating is not None)
+        for (genre, decade, value), times in groups.items():
+            for stats in self._groups(genre, decade):
+                stats.add_hundredths(value, times)
+
+    def remove_movie(self, movie):
+        """
+        Removes the rating of a movie from the aggregates.
+        """
+        self.remove(movie.rating, movie.genre, movie.year)
+
+    def movie_changed(self, movie, field, old_value):
+        """
+        Moves the rating of a movie after its rating, genre or year 
+        changed from old_value to the current value.
+        """
+        rating, genre, year = movie.rating, movie.genre, movie.year
+        if field == 'rating':
+            self.remove(old_value, genre, year)
+        elif field == 'genre':
+            self.remove(rating, old_value, year)
+        elif field == 'year':
+            self.remove(rating, genre, old_value)
+        else:
+            return  # Other fields do not affect the aggregates
+        self.add(rating, genre, year)
+
+    def clear(self):
+        """
+        Removes every rating from the aggregates.
+        """
+        self.__init__()
+
+    def verify(self, movies):
+        """
+        Recomputes the aggregates from scratch and raises an 
+        AssertionError if the cached values do not match.
+        """
+        expected = LibraryStats()
+        for movie in movies.values():  # Iteration: for loop
+            expected.add_movie(movie)
+        assert self.overall.as_tuple() == expected.overall.as_tuple(), \
+            "Overall rating aggregates drifted"
+        for name in ('by_genre', 'by_decade'):
+            cached = {key: stats.as_tuple() 
+                      for key, stats in getattr(self, name).items()}
+            fresh = {key: stats.as_tuple() 
+                     for key, stats in getattr(expected, name).items()}
+            assert cached == fresh, f"Rating aggregates {name} drifted"
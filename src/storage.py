@@ -0,0 +1,701 @@
+"""
+Provides the storage backends of the Movies Library behind one repository 
+interface: the CSV file with its journal, and an SQLite database. The 
+backend is chosen from the library.ini configuration file or from the 
+MOVIES_STORAGE and MOVIES_PATH environment variables.
+"""
+
+import os
+from abc import ABC, abstractmethod
+
+from movie import Movie, normalize_title
+from movie_library import MovieLibrary
+from file_operations import JOURNAL_MAX_BYTES, create_initial_csv, \
+    read_movies_from_file, append_to_journal, compact_journal, \
+    get_journal_path, get_journal_size, journal_rows, read_journal, \
+    apply_journal_record, movie_to_row
+from locking import FileLock, read_high_water, write_high_water, \
+    file_signature
+from persistence import BackgroundWriter, SAVE_DELAY
+from instrumentation import timed
+from catalog import CATALOG_FILE, RATINGS_DIR, Catalog, read_ratings, \
+    write_ratings
+
+CONFIG_FILE = "library.ini"
+DEFAULT_PATHS = {"csv": "movies.csv", "sqlite": "movies.db", 
+                 "catalog": os.path.join(RATINGS_DIR, "default.csv")}
+
+class MovieRepository(ABC):
+    """
+    The interface every storage backend implements. Movies are loaded into 
+    a MovieLibrary once; each change is then stored with put or delete, or 
+    with batch for many changes at once. Backends must implement the 
+    abstract methods; the others have defaults.
+    """
+
+    @abstractmethod
+    def create(self):
+        """
+        Creates the store if it does not exist and welcomes the user.
+        """
+
+    @abstractmethod
+    def load(self, movies=None):
+        """
+        Loads every movie into a MovieLibrary (the given one, if any) and 
+        returns it.
+        """
+
+    @abstractmethod
+    def get(self, movie_id):
+        """
+        Returns the movie with the given ID, or None if there is none.
+        """
+
+    @abstractmethod
+    def put(self, movie):
+        """
+        Stores a new or changed movie.
+        """
+
+    @abstractmethod
+    def delete(self, movie_id):
+        """
+        Removes the movie with the given ID from the store.
+        """
+
+    @abstractmethod
+    def query(self, genre=None, years=None, ratings=None):
+        """
+        Returns the movies of a genre, within a (first, last) range of 
+        years and within a (lowest, highest) range of ratings.
+        """
+
+    @abstractmethod
+    def average_rating(self):
+        """
+        Returns the average rating of the rated movies, or 0 if none is.
+        """
+
+    @abstractmethod
+    def batch(self, puts=(), deletes=()):
+        """
+        Stores many new or changed movies and removes many movie IDs in 
+        one write.
+        """
+
+    def check_fields(self, movie_id, fields):
+        """
+        Raises a ValueError if the store cannot keep the given field 
+        values of a movie, a dictionary of field -> value. movie_id is 
+        None for a new movie. Stores that keep every field of their own 
+        movies accept any values.
+        """
+
+    @timed("new_movie_ids")
+    def new_movie_ids(self, movies, records):
+        """
+        Returns IDs for new movies given as (title, year, genre) records, 
+        in the same order. The library hands out a batch of free IDs 
+        unless the store decides IDs itself.
+        """
+        return [str(movie_id) 
+                for movie_id in movies.id_allocator.reserve(len(records))]
+
+    def flush(self):
+        """
+        Waits until every change stored so far is on disk. Backends that 
+        write synchronously have nothing to wait for.
+        """
+
+    def refresh(self):
+        """
+        Brings the loaded library up to date with changes other processes 
+        stored since. Backends that answer from the store itself are 
+        always up to date.
+        """
+
+    @abstractmethod
+    def close(self):
+        """
+        Saves anything pending and releases the store.
+        """
+
+class CsvRepository(MovieRepository):
+    """
+    Stores movies in a CSV file. Changes are appended to its journal and 
+    folded into the file when the journal grows past journal_max_bytes or 
+    on close. The journal is written by a BackgroundWriter that coalesces 
+    bursts of changes; a save_delay of 0 writes every change before 
+    returning. Several processes may share the file: reads hold its lock 
+    shared and writes exclusively, and refresh picks up what the others 
+    wrote.
+    """
+
+    def __init__(self, file_path, save_delay=SAVE_DELAY, 
+                 journal_max_bytes=JOURNAL_MAX_BYTES):
+        """
+        Initializes the repository for a CSV file.
+        """
+        self.file_path = file_path
+        self.save_delay = save_delay
+        self.journal_max_bytes = journal_max_bytes
+        self._movies = MovieLibrary()
+        self._writer = None  # Started with the first change
+        self._lock = FileLock(file_path)
+        # What the loaded library was read from: the signature of the CSV 
+        # file and how much of the journal was replayed
+        self._signature = None
+        self._offset = 0
+
+    def create(self):
+        """
+        Creates the CSV file if it does not exist.
+        """
+        with self._lock.exclusive():
+            create_initial_csv(self.file_path)
+
+    def load(self, movies=None):
+        """
+        Reads the CSV file and replays its journal into a MovieLibrary 
+        (the given one, if any) and returns it.
+        """
+        self._movies = MovieLibrary() if movies is None else movies
+        with self._lock.shared():
+            read_movies_from_file(self.file_path, self._movies)
+            self._signature = file_signature(self.file_path)
+            self._offset = get_journal_size(self.file_path)
+        return self._movies
+
+    def _is_stale(self):
+        """
+        Returns True if another process wrote the CSV file or its journal 
+        since the library was loaded or refreshed. The lock must be held.
+        """
+        return (file_signature(self.file_path) != self._signature 
+                or get_journal_size(self.file_path) != self._offset)
+
+    def get(self, movie_id):
+        """
+        Returns the loaded movie with the given ID, or None.
+        """
+        return self._movies.get(movie_id)
+
+    def put(self, movie):
+        """
+        Stores a new or changed movie.
+        """
+        self.batch(puts=[movie])
+
+    def delete(self, movie_id):
+        """
+        Removes the movie with the given ID.
+        """
+        self.batch(deletes=[movie_id])
+
+    def query(self, genre=None, years=None, ratings=None):
+        """
+        Answers the query from the indexes of the loaded library.
+        """
+        return self._movies.query(genre, years, ratings)
+
+    def average_rating(self):
+        """
+        Returns the average rating of the loaded library.
+        """
+        # Imported here, so opening the storage does not import the menu
+        from movie_operations import calculate_average_rating
+        return calculate_average_rating(self._movies)
+
+    def batch(self, puts=(), deletes=()):
+        """
+        Applies the changes to the loaded library and journals them, 
+        through the background writer unless save_delay is 0.
+        """
+        # The library is written in full when the journal is compacted, so 
+        # it must hold every change
+        for movie in puts:  # Iteration: for loop
+            if self._movies.get(movie.get_id()) is not movie:
+                self._movies[movie.get_id()] = movie
+        for movie_id in deletes:
+            self._movies.pop(movie_id, None)
+        changes = [('update', movie) for movie in puts]  # Container: List
+        # A delete record only needs the movie ID
+        changes += [('delete', Movie(movie_id, None, None, None)) 
+                    for movie_id in deletes]
+        if not changes:
+            return
+        if not self.save_delay:  # Conditional if-statement
+            self._save(changes)
+            return
+        if self._writer is None:
+            self._writer = BackgroundWriter(self._save, self.save_delay)
+        # Only the latest change to each movie needs a journal record
+        self._writer.submit((change[1].get_id(), change) 
+                            for change in changes)
+
+    @timed("new_movie_ids")
+    def new_movie_ids(self, movies, records):
+        """
+        Reserves the IDs under the lock, above the highest ID any 
+        process handed out.
+        """
+        # The lock file records the highest ID any process handed out
+        with self._lock.exclusive() as lock_file:
+            movies.id_allocator.observe(read_high_water(lock_file))
+            movie_ids = [str(movie_id) for movie_id 
+                         in movies.id_allocator.reserve(len(records))]
+            write_high_water(lock_file, movies.id_allocator.high_water)
+        return movie_ids
+
+    def _save(self, changes):
+        """
+        Journals the changes; runs on the writer thread.
+        """
+        with self._lock.exclusive():
+            stale = self._is_stale()
+            try:
+                append_to_journal(self.file_path, changes)
+            except IOError as e:  # Falls back to a full write
+                print(f"An error occurred while writing to "
+                      f"{get_journal_path(self.file_path)}: {e}")
+                self._compact(changes)
+                return
+            if not stale:  # The journal holds nothing this library lacks
+                self._offset = get_journal_size(self.file_path)
+            if get_journal_size(self.file_path) > self.journal_max_bytes:
+                self._compact()
+            else:
+                print("Changes saved!")
+
+    def _compact(self, changes=()):
+        """
+        Folds the journal into the CSV file, with the changes applied if 
+        they could not be journaled. If another process wrote meanwhile, 
+        the library is not up to date, so the file is read back and 
+        written instead; refresh catches the library up later. The lock 
+        must be held exclusively.
+        """
+        if not self._is_stale():
+            compact_journal(self._movies, self.file_path)
+            self._signature = file_signature(self.file_path)
+            self._offset = 0
+            return
+        movies = read_movies_from_file(self.file_path)
+        for row in journal_rows(changes):  # Iteration: for loop
+            apply_journal_record(movies, row)
+        compact_journal(movies, self.file_path)
+
+    def refresh(self):
+        """
+        Saves what is pending, then applies the journal records other 
+        processes appended, or reads the file again if it was rewritten.
+        """
+        self.flush()  # The library matches what this process wrote
+        with self._lock.shared():
+            if file_signature(self.file_path) != self._signature:
+                self._reload()  # Rewritten by a compaction
+            elif get_journal_size(self.file_path) != self._offset:
+                rows, self._offset = read_journal(self.file_path, 
+                                                  self._offset)
+                for row in rows:  # Iteration: for loop
+                    apply_journal_record(self._movies, row)
+
+    def _reload(self):
+        """
+        Reads the CSV file again and changes the library in place to 
+        match it, so only movies that differ are indexed again. The lock 
+        must be held.
+        """
+        fresh = read_movies_from_file(self.file_path)
+        for movie_id in [movie_id for movie_id in self._movies 
+                         if movie_id not in fresh]:
+            self._movies.pop(movie_id)
+        for movie_id, movie in fresh.items():  # Iteration: for loop
+            current = self._movies.get(movie_id)
+            if current is None or \
+                    movie_to_row(current) != movie_to_row(movie):
+                self._movies[movie_id] = movie
+        # Deleted IDs are not handed out again
+        self._movies.id_allocator.observe(fresh.id_allocator.high_water)
+        self._signature = file_signature(self.file_path)
+        self._offset = get_journal_size(self.file_path)
+
+    def flush(self):
+        """
+        Waits until the pending changes are journaled.
+        """
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        """
+        Saves the pending changes and folds the journal into the CSV 
+        file.
+        """
+        if self._writer is not None:
+            self._writer.close()  # Writes what is still pending
+            self._writer = None
+        with self._lock.exclusive():
+            self._compact()
+
+class SqliteRepository(MovieRepository):
+    """
+    Stores movies in an SQLite database in WAL mode, one row per movie, 
+    with indexes on title, genre, year and rating. Queries and averages 
+    are answered by the database.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS movies ("
+        "movie_id INTEGER PRIMARY KEY, title TEXT NOT NULL, year INTEGER, "
+        "genre TEXT, rating REAL)", 
+        "CREATE INDEX IF NOT EXISTS movies_title ON movies (title)", 
+        "CREATE INDEX IF NOT EXISTS movies_genre ON movies (genre)", 
+        "CREATE INDEX IF NOT EXISTS movies_year ON movies (year)", 
+        "CREATE INDEX IF NOT EXISTS movies_rating ON movies (rating)", 
+    )
+    # The SQL of each statement stays the same, so sqlite3 prepares it 
+    # once and reuses it from its statement cache
+    SELECT = "SELECT movie_id, title, year, genre, rating FROM movies"
+    UPSERT = ("INSERT OR REPLACE INTO movies "
+              "(movie_id, title, year, genre, rating) VALUES (?, ?, ?, ?, ?)")
+    DELETE = "DELETE FROM movies WHERE movie_id = ?"
+
+    def __init__(self, db_path):
+        """
+        Initializes the repository for a database file.
+        """
+        self.db_path = db_path
+        self._connection = None
+
+    @property
+    def connection(self):
+        """
+        Returns the database connection, opening it on first use.
+        """
+        if self._connection is None:
+            import sqlite3  # Imported on first use, the CSV backend skips it
+            self._connection = sqlite3.connect(self.db_path, 
+                                               check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            with self._connection:
+                for statement in self.SCHEMA:  # Iteration: for loop
+                    self._connection.execute(statement)
+        return self._connection
+
+    def create(self):
+        """
+        Creates the database if it does not exist.
+        """
+        if os.path.exists(self.db_path):  # Conditional if-statement
+            print(f"Welcome back to your Watched Movies Library! The "
+                  f"database '{self.db_path}' is open and ready for inputs.")
+        else:
+            self.connection  # Opening the connection creates the database
+            print(f"Welcome to your Watched Movies Library! Database "
+                  f"'{self.db_path}' was created successfully and is ready "
+                  "for your inputs!")
+
+    @staticmethod
+    def _row_to_movie(row):
+        """
+        Creates a Movie object from a database row.
+        """
+        movie_id, title, year, genre, rating = row
+        return Movie(str(movie_id), title, year, genre, rating)
+
+    @staticmethod
+    def _movie_to_row(movie):
+        """
+        Returns the database row of a movie.
+        """
+        return (int(movie.get_id()), movie.title, movie.year, movie.genre, 
+                movie.rating)
+
+    def load(self, movies=None):
+        """
+        Reads every row into a MovieLibrary (the given one, if any) in 
+        batches of 1000 and returns it.
+        """
+        if movies is None:
+            movies = MovieLibrary()
+        cursor = self.connection.execute(self.SELECT)
+        while True:  # Iteration: while loop
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            movies.add_many(self._row_to_movie(row) for row in rows)
+        return movies
+
+    def get(self, movie_id):
+        """
+        Reads the movie with the given ID from the database, or returns 
+        None.
+        """
+        row = self.connection.execute(self.SELECT + " WHERE movie_id = ?", 
+                                      (int(movie_id),)).fetchone()
+        return self._row_to_movie(row) if row is not None else None
+
+    def put(self, movie):
+        """
+        Stores a new or changed movie.
+        """
+        self.batch(puts=[movie])
+
+    def delete(self, movie_id):
+        """
+        Removes the movie with the given ID.
+        """
+        self.batch(deletes=[movie_id])
+
+    def query(self, genre=None, years=None, ratings=None):
+        """
+        Answers the query with one SELECT that the indexes serve.
+        """
+        conditions = []  # Container type: List
+        parameters = []
+        if genre is not None:
+            conditions.append("genre = ?")
+            parameters.append(genre)
+        for column, bounds in (("year", years), ("rating", ratings)):
+            if bounds is None:
+                continue
+            low, high = bounds
+            conditions.append(f"{column} IS NOT NULL")
+            if low is not None:
+                conditions.append(f"{column} >= ?")
+                parameters.append(low)
+            if high is not None:
+                conditions.append(f"{column} <= ?")
+                parameters.append(high)
+        sql = self.SELECT
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return [self._row_to_movie(row) 
+                for row in self.connection.execute(sql, parameters)]
+
+    def average_rating(self):
+        """
+        Returns the average rating computed by the database.
+        """
+        average = self.connection.execute(
+            "SELECT AVG(rating) FROM movies WHERE rating IS NOT NULL"
+        ).fetchone()[0]
+        return round(average, 2) if average is not None else 0
+
+    def batch(self, puts=(), deletes=()):
+        """
+        Stores the changes in one transaction.
+        """
+        import sqlite3  # Already loaded by the connection
+        puts = [self._movie_to_row(movie) for movie in puts]
+        deletes = [(int(movie_id),) for movie_id in deletes]
+        if not puts and not deletes:
+            return
+        try:
+            with self.connection:  # One transaction for the whole batch
+                self.connection.executemany(self.UPSERT, puts)
+                self.connection.executemany(self.DELETE, deletes)
+        except sqlite3.Error as e:  # Handles database errors
+            print(f"An error occurred while writing to {self.db_path}: {e}")
+        else:
+            print("Changes saved!")
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+class UserRepository(MovieRepository):
+    """
+    Stores one user's library as a ratings file of catalog IDs in a 
+    ratings directory, joined with the shared catalog kept next to that 
+    directory. Loading reads only the ratings file and looks each movie 
+    up in the catalog's snapshot; new movies get the ID of the catalog 
+    movie with the same title and year, or a new catalog entry.
+    """
+
+    def __init__(self, file_path, catalog_path=None):
+        """
+        Initializes the repository for a ratings file such as 
+        ratings/alice.csv.
+        """
+        self.file_path = file_path
+        if catalog_path is None:  # The catalog sits beside the directory
+            ratings_dir = os.path.dirname(os.path.abspath(file_path))
+            catalog_path = os.path.join(os.path.dirname(ratings_dir), 
+                                        CATALOG_FILE)
+        self.catalog = Catalog(catalog_path)
+        self._movies = MovieLibrary()
+
+    def create(self):
+        """
+        Creates the catalog and the user's ratings file if they do not 
+        exist.
+        """
+        self.catalog.create()
+        if os.path.exists(self.file_path):  # Conditional if-statement
+            print(f"Welcome back to your Watched Movies Library! The "
+                  f"ratings in '{self.file_path}' are ready for inputs.")
+            return
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        write_ratings({}, self.file_path)
+        print(f"Welcome to your Watched Movies Library! Ratings file "
+              f"'{self.file_path}' was created successfully and is ready "
+              "for your inputs!")
+
+    def load(self, movies=None):
+        """
+        Joins the user's ratings with the catalog into a MovieLibrary (the 
+        given one, if any) and returns it. Ratings of movies missing from 
+        the catalog are skipped.
+        """
+        self._movies = MovieLibrary() if movies is None else movies
+        joined = []  # Container type: List
+        missing = 0
+        for movie_id, rating in read_ratings(self.file_path):
+            movie = self.catalog.get(movie_id)
+            if movie is None:
+                missing += 1
+                continue
+            joined.append(Movie(movie_id, movie.title, movie.year, 
+                                movie.genre, rating))
+        self._movies.add_many(joined)
+        # IDs handed out by the library must not clash with the catalog
+        self._movies.id_allocator.observe(str(self.catalog.high_water()))
+        if missing:
+            print(f"Skipped {missing} ratings of movies missing from "
+                  f"{self.catalog.file_path}")
+        return self._movies
+
+    def get(self, movie_id):
+        """
+        Returns the user's movie with the given ID, or None.
+        """
+        return self._movies.get(movie_id)
+
+    def put(self, movie):
+        """
+        Stores a new or changed movie of the user.
+        """
+        self.batch(puts=[movie])
+
+    def delete(self, movie_id):
+        """
+        Removes a movie from the user's ratings; the catalog keeps it.
+        """
+        self.batch(deletes=[movie_id])
+
+    def query(self, genre=None, years=None, ratings=None):
+        """
+        Returns the user's movies matching the conditions, answered from 
+        the loaded library.
+        """
+        return self._movies.query(genre, years, ratings)
+
+    def average_rating(self):
+        """
+        Returns the average rating of the user's movies.
+        """
+        from movie_operations import calculate_average_rating
+        return calculate_average_rating(self._movies)
+
+    @timed("new_movie_ids")
+    def new_movie_ids(self, movies, records):
+        """
+        Returns the catalog IDs of new movies given as (title, year, 
+        genre) records, adding the movies the catalog lacks.
+        """
+        # Movies the catalog already has keep their catalog ID
+        return [self.catalog.add(title, year, genre) 
+                for title, year, genre in records]
+
+    def check_fields(self, movie_id, fields):
+        """
+        Raises a ValueError if a title, year or genre differs from the 
+        catalog entry of the movie, or for a new movie, from the entry 
+        with the same title and year. Catalog entries are shared with 
+        other users, so only the ratings can be changed.
+        """
+        if movie_id is None:  # Conditional if-statement
+            movie_id = self.catalog.find(fields["title"], fields["year"])
+        entry = self.catalog.get(movie_id) if movie_id is not None else None
+        if entry is None:
+            return  # A new catalog entry takes any values
+        shared = {"title": normalize_title(entry.title), "year": entry.year, 
+                  "genre": entry.genre}
+        for field, value in fields.items():  # Iteration: for loop
+            if field == "title":
+                value = normalize_title(value)
+            if field in shared and value != shared[field]:
+                raise ValueError(f"the {field} is shared with other users "
+                                 "in the catalog and cannot be changed")
+
+    def batch(self, puts=(), deletes=()):
+        """
+        Stores the ratings of the changed movies and removes the deleted 
+        ones from the user's ratings, then writes the new catalog entries 
+        and the ratings file. Raises a ValueError, before anything is 
+        written, if a movie's title, year or genre differs from its 
+        catalog entry.
+        """
+        for movie in puts:  # Iteration: for loop
+            self.check_fields(movie.get_id(), {
+                "title": movie.title, "year": movie.year, 
+                "genre": movie.genre})
+        for movie in puts:
+            if self._movies.get(movie.get_id()) is not movie:
+                self._movies[movie.get_id()] = movie
+        for movie_id in deletes:  # The catalog keeps the movie
+            self._movies.pop(movie_id, None)
+        try:
+            self.catalog.save()  # Only written if movies were added
+            write_ratings(self._movies, self.file_path)
+        except IOError as e:  # Handles file errors
+            print(f"An error occurred while writing to {self.file_path}: "
+                  f"{e}")
+        else:
+            print("Changes saved!")
+
+    def close(self):
+        """
+        Releases the catalog.
+        """
+        self.catalog.close()
+
+BACKENDS = {"csv": CsvRepository, "sqlite": SqliteRepository, 
+            "catalog": UserRepository}
+
+def open_repository(config_file=CONFIG_FILE, backend=None, path=None):
+    """
+    Returns the repository chosen in the configuration. The [storage] 
+    section of the configuration file may set a backend ('csv' or 
+    'sqlite') and a path; the MOVIES_STORAGE and MOVIES_PATH environment 
+    variables override it, and a backend or path passed in, such as from 
+    command line options, overrides both. Without any of them, the CSV 
+    file movies.csv is used.
+    """
+    settings = {}  # Container type: Dictionary
+    if os.path.exists(config_file):  # Conditional if-statement
+        import configparser  # Only parsed when there is a configuration
+        config = configparser.ConfigParser()
+        config.read(config_file)
+        if config.has_section("storage"):
+            settings = dict(config["storage"])
+    if backend is None:
+        backend = os.environ.get("MOVIES_STORAGE", 
+                                 settings.get("backend", "csv"))
+    elif path is None:
+        path = DEFAULT_PATHS.get(backend)  # The configured path is another's
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}', expected "
+                         f"one of {', '.join(BACKENDS)}")
+    if path is None:
+        path = os.environ.get("MOVIES_PATH", 
+                              settings.get("path", DEFAULT_PATHS[backend]))
+    return BACKENDS[backend](path)
@@ -0,0 +1,92 @@
+"""
+Unit tests for the analytics module check the histogram, the group 
+summaries, the best rated movies and the unrated counts, with NumPy when 
+it is installed and with the standard library either way.
+"""
+
+from analytics import analyze, numpy
+from movie import Movie
+
+def make_movies():
+    """
+    Returns a small library with rated and unrated movies.
+    """
+    movies = {}  # Container type: Dictionary
+    for movie_id, title, year, genre, rating in [
+            ("1", "HEAT", 1995, "Crime", 8.3), 
+            ("2", "CASINO", 1995, "Crime", 8.2),
+            ("3", "FARGO", 1996, "Crime", 8.1),
+            ("4", "RONIN", 1998, "Crime", None),
+            ("5", "TENET", 2020, "Sci-Fi", 7.8),
+            ("6", "DUNE", 2021, "Sci-Fi", 10),
+            ("7", "ALIEN", 1979, "Horror", None),
+            ("8", "NOSFERATU", 1922, "Silent", 7.9)]:
+        movies[movie_id] = Movie(movie_id, title, year, genre, rating)
+    return movies
+
+def check_report(report):
+    """
+    Checks the report of the library made by make_movies.
+    """
+    assert (report["movies"], report["rated"], report["unrated"]) == (8, 6, 2)
+    assert report["histogram"] == [0, 0, 0, 0, 0, 0, 0, 2, 3, 1]
+    crime = report["by_genre"]["Crime"]
+    assert (crime["count"], crime["unrated"]) == (3, 1)
+    assert crime["mean"] == 8.2 and crime["median"] == 8.2
+    assert crime["percentiles"][25] == 8.15
+    assert crime["percentiles"][90] == 8.28
+    assert [movie.title for movie in crime["top"]] == [
+        "HEAT", "CASINO", "FARGO"]
+    assert report["by_genre"]["Horror"]["count"] == 0
+    assert report["by_genre"]["Horror"]["unrated"] == 1
+    assert report["by_genre"]["Silent"]["mean"] == 7.9  # Not in GENRES
+    assert list(report["by_decade"]) == [1920, 1970, 1990, 2020]
+    assert report["by_decade"][1990]["count"] == 3
+    assert report["by_decade"][2020]["median"] == 8.9
+    assert report["overall"]["median"] == 8.15
+
+def test_analytics():
+    """
+    A test for the rating report with each available backend.
+    """
+    check_report(analyze(make_movies(), top_n=3, use_numpy=False))
+    if numpy is not None:
+        check_report(analyze(make_movies(), top_n=3, use_numpy=True))
+
+def test_top_ties():
+    """
+    A test that movies tied with the last of the top movies are 
+    considered and ordered by title.
+    """
+    movies = [Movie(str(number), title, 2000, "Drama", 9) 
+              for number, title in enumerate(["C", "A", "B"], 1)]
+    report = analyze(movies, top_n=2, use_numpy=False)
+    assert [movie.title for movie in report["by_genre"]["Drama"]["top"]] \
+        == ["A", "B"]
+
+def test_out_of_range_ratings():
+    """
+    A test that ratings outside 0 to 10 are clamped to the scale by 
+    both backends.
+    """
+    movies = make_movies()
+    movies["1"].rating = 700  # Set directly, as a hand-edited file would
+    movies["2"].rating = -1
+    for use_numpy in (False, True) if numpy is not None else (False,):
+        report = analyze(movies, top_n=3, use_numpy=use_numpy)
+        assert report["histogram"] == [1, 0, 0, 0, 0, 0, 0, 2, 1, 2]
+        crime = report["by_genre"]["Crime"]
+        assert (crime["count"], crime["mean"]) == (3, 6.03)
+        assert crime["top"][0].title == "HEAT"
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_analytics()
+    test_top_ties()
+    test_out_of_range_ratings()
+    print("All analytics tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,72 @@
+"""
+Unit tests for the benchmark suite check that the synthetic libraries are 
+deterministic, that every hot path is timed and that regressions are 
+flagged only above the threshold and the noise floor.
+"""
+
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from benchmark import generate_library, run_size, compare, NOISE_FLOOR
+
+def test_generate_library():
+    """
+    A test that the same seed always produces the same library.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        contents = []  # Container type: List
+        for name, seed in (("a.csv", 1), ("b.csv", 1), ("c.csv", 2)):
+            file_path = os.path.join(directory, name)
+            generate_library(file_path, 50, seed)
+            with open(file_path) as file:
+                contents.append(file.read())
+        assert contents[0] == contents[1] != contents[2]
+        assert contents[0].count("\n") == 51  # The header and 50 movies
+
+def test_run_size():
+    """
+    A test that a small library is timed on every hot path, with the 
+    deferred indexes built before the timed reads.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        file_sizes = {}  # Container type: Dictionary
+        with redirect_stdout(StringIO()):
+            results = run_size(50, directory, file_sizes=file_sizes)
+    for name in ("read_csv", "read_snapshot", "prepare_for_reads", 
+                 "write", "genre_filter", "sorted_listing", 
+                 "columnar_import_zlib"):
+        assert results[name] >= 0
+    assert file_sizes["csv"] > 0 and file_sizes["columnar_lzma"] > 0
+
+def test_compare():
+    """
+    A test that only slowdowns above both the threshold and the noise 
+    floor are flagged as regressions.
+    """
+    baseline = {"sizes": {"1000": {"read_csv": 0.010, "write": 0.010, 
+                                   "lookup": 0.000001}}}
+    results = {"sizes": {"1000": {"read_csv": 0.020,  # Twice as slow
+                                  "write": 0.012,  # Within the threshold
+                                  "lookup": 0.000003,  # Under the floor
+                                  "new_benchmark": 1.0}, 
+                         "5000": {"read_csv": 1.0}}}  # Not in baseline
+    assert compare(results, baseline) == [("1000", "read_csv", 0.010, 
+                                           0.020)]
+    assert compare(results, baseline, threshold=0.1) == [
+        ("1000", "read_csv", 0.010, 0.020), ("1000", "write", 0.010, 0.012)]
+    assert compare(results, results) == []
+    assert 0.000003 - 0.000001 < NOISE_FLOOR
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_generate_library()
+    test_run_size()
+    test_compare()
+    print("All benchmark tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
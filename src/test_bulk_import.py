@@ -0,0 +1,91 @@
+"""
+Unit tests for the bulk import check that valid rows from CSV and JSON 
+Lines dumps are imported and invalid or duplicate rows are rejected.
+"""
+
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from movie import Movie
+from storage import CsvRepository
+from bulk_import import import_movies
+
+def make_storage(directory):
+    """
+    Creates a CSV library holding one movie and returns its repository 
+    and loaded movies.
+    """
+    storage = CsvRepository(os.path.join(directory, "movies.csv"))
+    storage.create()
+    movies = storage.load()
+    movies["7"] = Movie("7", "HEAT", 1995, "Crime", 8.3)
+    storage.put(movies["7"])
+    return storage, movies
+
+def test_csv_import():
+    """
+    A test for importing a CSV dump with a pool of worker processes.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        dump_path = os.path.join(directory, "dump.csv")
+        with open(dump_path, 'w') as dump:
+            dump.write("Title,Year,Genre,Rating\n"
+                       "Tenet,2020,Sci-Fi,7.8\n"
+                       '"Lock, Stock and Two Smoking Barrels",1998,Crime,\n'
+                       "Heat,1995,Crime,8\n"
+                       "Tenet,2020,Sci-Fi,7\n"
+                       "Metropolis,1827,Sci-Fi,8\n"
+                       "Dune,2021,Space Opera,8\n"
+                       "Alien,1979,Horror,11\n")
+        storage, movies = make_storage(directory)
+        summary = import_movies(movies, storage, dump_path, workers=2)
+        storage.close()
+
+        assert summary.rows == 7
+        assert summary.imported == 2
+        assert summary.reasons["duplicate title"] == 2
+        assert summary.reasons["unknown genre"] == 1
+        assert (5, "duplicate title") in summary.examples
+        assert (6, "Year must be between 1888 and 2024") in summary.examples
+
+        movies = CsvRepository(storage.file_path).load()
+        assert sorted(movie.title for movie in movies.values()) == [
+            "HEAT", "LOCK, STOCK AND TWO SMOKING BARRELS", "TENET"]
+        assert movies.find_by_title("TENET").get_id() == "8"
+
+def test_jsonl_import():
+    """
+    A test for importing a JSON Lines dump in the calling process.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        dump_path = os.path.join(directory, "dump.jsonl")
+        with open(dump_path, 'w') as dump:
+            dump.write(json.dumps({"title": "Tenet", "year": 2020, 
+                                   "genre": "Sci-Fi", "rating": 7.8}) + "\n")
+            dump.write("{not json\n")
+            dump.write(json.dumps({"title": "Alien", "year": "1979", 
+                                   "genre": "Horror"}) + "\n")
+        storage, movies = make_storage(directory)
+        summary = import_movies(movies, storage, dump_path, workers=1)
+        storage.close()
+
+        assert summary.imported == 2
+        assert summary.examples == [(2, "invalid JSON")]
+        assert movies.find_by_title("ALIEN").rating is None
+        movies.verify_stats()
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_csv_import()
+    test_jsonl_import()
+    print("All bulk import tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
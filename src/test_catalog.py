@@ -0,0 +1,145 @@
+"""
+Unit tests for the shared catalog check that per-user files are migrated 
+into one catalog, that a user's library joins the catalog with the 
+user's ratings, and that averages across users are computed in parallel.
+"""
+
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from catalog import Catalog, average_ratings, get_ratings_path, migrate
+from file_operations import write_movies_to_file
+from history import History
+from library_service import LibraryService
+from movie import Movie
+from storage import UserRepository
+
+def write_user_file(directory, name, movies):
+    """
+    Writes a per-user movies CSV file and returns its path.
+    """
+    file_path = os.path.join(directory, f"{name}_movies.csv")
+    write_movies_to_file({movie.get_id(): movie for movie in movies}, 
+                         file_path)
+    return file_path
+
+def test_catalog():
+    """
+    A test for migrating two users and working with one user's library.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        catalog_path = os.path.join(directory, "catalog.csv")
+        ratings_dir = os.path.join(directory, "ratings")
+        catalog = Catalog(catalog_path)
+        migrate("alice", write_user_file(directory, "alice", [
+            Movie("1", "HEAT", 1995, "Crime", 8), 
+            Movie("2", "TENET", 2020, "Sci-Fi", 7)]), catalog, ratings_dir)
+        migrate("bob", write_user_file(directory, "bob", [
+            Movie("1", "TENET", 2020, "Sci-Fi", 9), 
+            Movie("2", "ALIEN", 1979, "Horror")]), catalog, ratings_dir)
+        catalog.close()
+        assert len(Catalog(catalog_path).load()) == 3  # TENET is shared
+
+        storage = UserRepository(get_ratings_path("bob", ratings_dir))
+        assert storage.catalog.file_path == catalog_path
+        movies = storage.load()
+        assert storage.catalog._movies is None  # Read from the snapshot
+        assert sorted((movie.get_id(), movie.title, movie.rating) 
+                      for movie in movies.values()) == [
+            ("2", "TENET", 9.0), ("3", "ALIEN", None)]
+
+        service = LibraryService(movies, storage)
+        heat = service.add("Heat", 1995, "Crime", 6)
+        dune = service.add("Dune", 2021, "Sci-Fi", 8)
+        assert heat.get_id() == "1"  # Shares Alice's catalog entry
+        assert dune.get_id() == "4"
+        service.delete("3")  # The catalog keeps Alien
+        storage.close()
+
+        movies = UserRepository(get_ratings_path("bob", ratings_dir)).load()
+        assert sorted(movies) == ["1", "2", "4"]
+        assert len(Catalog(catalog_path).load()) == 4
+        for workers in (1, 2):  # Iteration: for loop
+            averages = average_ratings(ratings_dir, workers)
+            assert averages == {"1": (2, 7.0), "2": (2, 8.0), "4": (1, 8.0)}
+
+def test_shared_entries():
+    """
+    A test that the title, year and genre of catalog movies, which other 
+    users share, cannot be edited, while ratings can.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        catalog_path = os.path.join(directory, "catalog.csv")
+        ratings_dir = os.path.join(directory, "ratings")
+        migrate("alice", write_user_file(directory, "alice", [
+            Movie("1", "TENET", 2020, "Sci-Fi", 7)]), 
+            Catalog(catalog_path), ratings_dir)
+        migrate("bob", write_user_file(directory, "bob", [
+            Movie("1", "TENET", 2020, "Sci-Fi", 8), 
+            Movie("2", "HEAT", 1995, "Crime", 9)]), 
+            Catalog(catalog_path), ratings_dir)
+
+        storage = UserRepository(get_ratings_path("bob", ratings_dir))
+        service = LibraryService(storage.load(), storage, History())
+        for changes in ({"genre": "Drama"}, {"title": "Tenet II"}, 
+                        {"year": 2021}, {"title": "Heat", "year": 1995}, 
+                        {"genre": "Drama", "rating": 5}):
+            try:
+                service.edit("1", **changes)
+                assert False, f"{changes} should have been rejected"
+            except ValueError:
+                pass
+        try:  # The catalog's HEAT is a Crime movie
+            service.add("Heat", 1995, "Drama")
+            assert False, "The genre should have been rejected"
+        except ValueError:
+            pass
+        assert not service.history.can_undo()  # Nothing was changed
+        service.edit("1", genre="Sci-Fi", rating=6)  # Same genre is fine
+        storage.close()
+
+        movies = UserRepository(get_ratings_path("bob", ratings_dir)).load()
+        assert sorted((movie.get_id(), movie.title, movie.genre, 
+                       movie.rating) for movie in movies.values()) == [
+            ("1", "TENET", "Sci-Fi", 6.0), ("2", "HEAT", "Crime", 9.0)]
+        catalog = Catalog(catalog_path)
+        assert len(catalog.load()) == 2  # No entry was added or changed
+        catalog.close()
+
+def test_concurrent_catalogs():
+    """
+    A test that two processes adding movies to the catalog at the same 
+    time get different IDs and keep each other's movies.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        catalog_path = os.path.join(directory, "catalog.csv")
+        first, second = Catalog(catalog_path), Catalog(catalog_path)
+        first.create()
+        first.load()
+        second.load()
+        assert first.add("HEAT", 1995, "Crime") == "1"
+        assert second.add("TENET", 2020, "Sci-Fi") == "2"
+        first.save()
+        assert second.add("HEAT", 1995, "Crime") == "1"  # Read again
+        second.save()
+        movies = Catalog(catalog_path).load()
+        assert sorted((movie_id, movie.title) 
+                      for movie_id, movie in movies.items()) == [
+            ("1", "HEAT"), ("2", "TENET")]
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_catalog()
+    test_shared_entries()
+    test_concurrent_catalogs()
+    print("All catalog tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,96 @@
+"""
+Unit tests for the columnar archive check that libraries survive a round 
+trip with either codec and across chunks, and that damaged archives and 
+movies that do not fit are reported.
+"""
+
+import os
+import tempfile
+
+from movie import Movie
+from movie_library import MovieLibrary
+from columnar import ColumnarError, export_columnar, import_columnar
+
+def make_movies():
+    """
+    Returns a library with unusual values: no year, genre or rating, a 
+    genre outside GENRES, non-ASCII and quoted titles and gaps in the IDs.
+    """
+    movies = MovieLibrary()
+    for movie in [Movie("7", "TENET", 2020, "Sci-Fi", 7.8), 
+                  Movie("2", "AMÉLIE", 2001, "Romance", 8.35), 
+                  Movie("3", 'THE "QUOTED", TITLE', None, None), 
+                  Movie("40", "NOIR", 1944, "Film-Noir", 0), 
+                  Movie("41", "", 1888, "Drama", 10)]:
+        movies[movie.get_id()] = movie
+    for number in range(100, 400):  # Iteration: for loop
+        movies[str(number)] = Movie(str(number), f"MOVIE {number}", 
+                                    1900 + number % 120, "Comedy", 
+                                    number % 100 / 10)
+    return movies
+
+def fields(movies):
+    """
+    Returns the fields of every movie, keyed by movie ID.
+    """
+    return {movie_id: (movie.title, movie.year, movie.genre, movie.rating) 
+            for movie_id, movie in movies.items()}
+
+def test_round_trip():
+    """
+    A test that both codecs give back the same movies, whatever the chunk 
+    size and number of threads.
+    """
+    movies = make_movies()
+    with tempfile.TemporaryDirectory() as directory:
+        archive = os.path.join(directory, "movies.mvc")
+        for codec in ("zlib", "lzma"):  # Iteration: for loop
+            for chunk_rows, workers in ((64, 4), (10000, 1)):
+                export_columnar(movies, archive, codec, chunk_rows, workers)
+                restored = import_columnar(archive, workers=workers)
+                assert fields(restored) == fields(movies)
+                assert restored.has_title("AMÉLIE")  # Indexed on import
+        plain = import_columnar(archive, {})  # Any dictionary will do
+        assert fields(plain) == fields(movies)
+
+        export_columnar({}, archive)
+        assert len(import_columnar(archive)) == 0
+
+def test_damaged_archive():
+    """
+    A test that truncated or corrupted archives raise a ColumnarError.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        archive = os.path.join(directory, "movies.mvc")
+        export_columnar(make_movies(), archive, chunk_rows=64)
+        with open(archive, 'rb') as file:
+            data = file.read()
+        damaged = [data[:len(data) // 2], b"MVSN" + data[4:], 
+                   data[:-40] + bytes(40)]
+        for content in damaged:  # Iteration: for loop
+            with open(archive, 'wb') as file:
+                file.write(content)
+            try:
+                import_columnar(archive)
+                assert False, "The damaged archive should be rejected"
+            except ColumnarError:
+                pass
+
+        for movies in ({"A1": Movie("A1", "HEAT", 1995, "Crime")}, 
+                       {"1": Movie("1", "HEAT", 1995, "Crime", 11)}):
+            try:
+                export_columnar(movies, archive)
+                assert False, "The movie should not fit the archive"
+            except ColumnarError:
+                pass
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_round_trip()
+    test_damaged_archive()
+    print("All columnar tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,42 @@
+"""
+Unit tests for the start-up diagnostics check that the import timings are 
+parsed and that the program starts without its unit tests, its menu 
+operations or the SQLite and argparse modules.
+"""
+
+from diagnostics import parse_import_times, measure_imports
+
+def test_parse_import_times():
+    """
+    A test for parsing the output of python -X importtime.
+    """
+    output = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |   movie\n"
+              "Welcome!\n"
+              "import time:       300 |        420 | movie_library\n")
+    assert parse_import_times(output) == [("movie", 120, 120), 
+                                          ("movie_library", 300, 420)]
+
+def test_lazy_startup_imports():
+    """
+    A test that launching the program does not import modules it only 
+    needs on request.
+    """
+    elapsed, timings = measure_imports("main")
+    imported = {name for name, _, _ in timings}
+    assert elapsed > 0
+    assert "main" in imported and "movie_library" in imported
+    assert "movie_operations" not in imported
+    assert "test_movie" not in imported
+    assert "sqlite3" not in imported and "argparse" not in imported
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_parse_import_times()
+    test_lazy_startup_imports()
+    print("All diagnostics tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
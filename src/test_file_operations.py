@@ -0,0 +1,188 @@
+"""
+Unit tests for the file operations check that movies written to the CSV 
+file and the journal are read back unchanged.
+"""
+
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from movie import Movie
+from file_operations import create_initial_csv, read_movies_from_file, \
+    write_movies_to_file, get_journal_path, iter_movies_from_file, \
+    LoadReport
+from movie_operations import calculate_average_rating
+from binary_snapshot import MovieSnapshot, SnapshotError, get_snapshot_path
+from storage import CsvRepository
+
+def make_library_file(directory):
+    """
+    Creates a CSV file with two movies and returns its path.
+    """
+    file_path = os.path.join(directory, "movies.csv")
+    movies = {
+        "1": Movie("1", "TENET", 2020, "Sci-Fi", 7.8),
+        "2": Movie("2", "THE MATRIX", 1999, "Sci-Fi"),
+    }
+    with redirect_stdout(StringIO()):
+        create_initial_csv(file_path)
+        write_movies_to_file(movies, file_path)
+    return file_path
+
+def test_quoted_titles():
+    """
+    A test for titles that contain commas and quotes.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = make_library_file(directory)
+        with redirect_stdout(StringIO()):
+            movies = read_movies_from_file(file_path)
+            movies["3"] = Movie("3", 'THE GOOD, THE BAD AND THE "UGLY"', 1966,
+                                "Action", 8.8)
+            write_movies_to_file(movies, file_path)
+            reloaded = read_movies_from_file(file_path)
+        assert reloaded["3"].title == 'THE GOOD, THE BAD AND THE "UGLY"'
+
+def test_streaming_loader():
+    """
+    A test for reading movies lazily and reporting malformed rows.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = make_library_file(directory)
+        with open(file_path, 'a') as file:
+            file.write("x,BROKEN ID,2000,Drama,5.00\n")
+            file.write("4,BAD YEAR,20x0,Drama,5.00\n")
+            file.write("5,MISSING FIELDS\n")
+            # Written unquoted by older versions of the program
+            file.write("6,LOCK, STOCK AND TWO SMOKING BARRELS,1998,Crime,\n")
+
+        report = LoadReport()
+        movies = iter_movies_from_file(file_path, report)
+        assert calculate_average_rating(movies) == 7.8
+        assert report.rows_read == 6
+        assert report.malformed == 3
+        assert report.malformed_lines == [4, 5, 6]
+
+        with redirect_stdout(StringIO()) as output:
+            movies = read_movies_from_file(file_path)
+        assert "3 malformed" in output.getvalue()
+        assert movies["6"].title == "LOCK, STOCK AND TWO SMOKING BARRELS"
+
+def test_binary_snapshot():
+    """
+    A test for reading movies back from the binary snapshot.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = make_library_file(directory)
+        with MovieSnapshot(file_path) as snapshot:
+            assert len(snapshot) == 2
+            assert sorted(snapshot) == ["1", "2"]
+            assert repr(snapshot["1"]) == repr(Movie("1", "TENET", 2020, 
+                                                     "Sci-Fi", 7.8))
+            assert snapshot["2"].rating is None
+            assert "3" not in snapshot
+            assert calculate_average_rating(snapshot) == 7.8
+
+        # The snapshot is not used once the CSV file changed
+        with open(file_path, 'a') as file:
+            file.write("3,HEAT,1995,Crime,8.30\n")
+        try:
+            MovieSnapshot(file_path)
+            assert False, "An out of date snapshot was opened"
+        except SnapshotError:
+            pass
+        with redirect_stdout(StringIO()):
+            movies = read_movies_from_file(file_path)
+        assert movies["3"].title == "HEAT"
+
+        # A damaged snapshot is detected by its checksum
+        with redirect_stdout(StringIO()):
+            write_movies_to_file(movies, file_path)
+        with open(get_snapshot_path(file_path), 'r+b') as file:
+            file.seek(-1, os.SEEK_END)
+            file.write(b"?")
+        try:
+            MovieSnapshot(file_path)
+            assert False, "A damaged snapshot was opened"
+        except SnapshotError:
+            pass
+
+        # Ratings the records cannot hold leave the CSV file as the only copy
+        for rating in (700, -1, 655.35):  # Iteration: for loop
+            movies["3"] = Movie("3", "HEAT", 1995, "Crime", rating)
+            with redirect_stdout(StringIO()):
+                assert write_movies_to_file(movies, file_path)
+                reloaded = read_movies_from_file(file_path)
+            assert not os.path.exists(get_snapshot_path(file_path))
+            assert reloaded["3"].rating == rating
+
+def test_journal_replay():
+    """
+    A test for replaying journaled changes over the last CSV snapshot.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = make_library_file(directory)
+        storage = CsvRepository(file_path, save_delay=0)
+        with redirect_stdout(StringIO()):
+            movies = storage.load()
+            storage.put(Movie("3", "HEAT", 1995, "Crime", 8.3))
+            movies["1"].add_rating(8.1)
+            storage.batch(puts=[movies["1"]], deletes=["2"])
+
+            # The snapshot is untouched, the journal holds the changes
+            assert os.path.exists(get_journal_path(file_path))
+            reloaded = read_movies_from_file(file_path)
+
+        assert sorted(reloaded) == ["1", "3"]
+        assert reloaded["1"].rating == 8.1
+        assert reloaded["3"].title == "HEAT"
+        assert reloaded["3"].year == 1995
+
+        # IDs of deleted movies are not handed out again after a reload
+        with redirect_stdout(StringIO()):
+            storage.delete("3")
+            reloaded = read_movies_from_file(file_path)
+        assert reloaded.id_allocator.next_id() == "4"
+
+def test_journal_torn_record():
+    """
+    A test for ignoring a journal record that was cut short by a crash.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = make_library_file(directory)
+        with open(get_journal_path(file_path), 'a') as journal:
+            journal.write("update,1,TENET,2020,Sci-Fi,9.")  # No line ending
+        with redirect_stdout(StringIO()):
+            movies = read_movies_from_file(file_path)
+        assert movies["1"].rating == 7.8
+
+def test_journal_compaction():
+    """
+    A test for folding the journal back into the CSV file.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = make_library_file(directory)
+        storage = CsvRepository(file_path, save_delay=0)
+        with redirect_stdout(StringIO()):
+            storage.load()
+            storage.delete("1")
+            storage.close()  # Compacts the journal
+            assert not os.path.exists(get_journal_path(file_path))
+            reloaded = read_movies_from_file(file_path)
+        assert sorted(reloaded) == ["2"]
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_quoted_titles()
+    test_streaming_loader()
+    test_binary_snapshot()
+    test_journal_replay()
+    test_journal_torn_record()
+    test_journal_compaction()
+    print("All file operation tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
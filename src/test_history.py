@@ -0,0 +1,123 @@
+"""
+Unit tests for the undo and redo history check that changes are recorded 
+as deltas of the changed fields, that the history is bounded, and that 
+undoing and redoing through the library service reaches the storage.
+"""
+
+import os
+import tempfile
+from contextlib import redirect_stdout, redirect_stderr
+from io import StringIO
+
+from cli import build_parser, run_shell
+from history import History, describe
+from library_service import LibraryService
+from storage import CsvRepository
+
+def test_bounded_history():
+    """
+    A test that the oldest changes are forgotten once the history is full 
+    and that a new change cannot be redone over.
+    """
+    applied = []  # Container type: List
+    history = History(limit=3)
+    for number in range(5):  # Iteration: for loop
+        history.record(str(number), (("rating", number),), 
+                       (("rating", number + 1),))
+    assert len(history) == 3
+    while history.can_undo():
+        history.undo(lambda movie_id, fields: applied.append(movie_id))
+    assert applied == ["4", "3", "2"]
+    assert history.can_redo()
+    history.redo(lambda movie_id, fields: applied.append(fields))
+    assert applied[-1] == (("rating", 3),)
+    history.record("9", None, (("title", "HEAT"),))
+    assert not history.can_redo()
+    try:
+        History().undo(applied.append)
+        assert False, "An empty history has nothing to undo"
+    except ValueError:
+        pass
+
+def test_undo_redo_service():
+    """
+    A test that the service records only the changed fields and that 
+    undone and redone changes are stored.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        file_path = os.path.join(directory, "movies.csv")
+        storage = CsvRepository(file_path, save_delay=0)
+        storage.create()
+        service = LibraryService(storage.load(), storage, History())
+        heat = service.add("Heat", 1995, "Crime", 8.3)
+        service.edit(heat.get_id(), rating=9.0, year=1995)
+        delta = service.history._undo[-1]
+        assert delta.before == (("rating", 8.3),)
+        assert delta.after == (("rating", 9.0),)
+        service.delete(heat.get_id())
+        assert describe(service.undo()) == "the deletion of HEAT"
+        assert service.movies.find_by_title("HEAT").rating == 9.0
+
+        service.undo()  # Undoes the edit
+        assert service.movies[heat.get_id()].rating == 8.3
+        service.redo()
+        service.undo()
+        service.undo()  # Undoes the addition
+        assert len(service.movies) == 0
+        service.redo()
+        storage.close()
+        movies = CsvRepository(file_path).load()
+        assert [movie.title for movie in movies.values()] == ["HEAT"]
+        assert movies[heat.get_id()].rating == 8.3
+
+        # A change that would clash with the library stays undoable
+        service.delete(heat.get_id())
+        LibraryService(service.movies, storage).add("Heat", 1995, "Crime")
+        try:
+            service.undo()  # Would bring back a second HEAT
+            assert False, "The title is taken"
+        except ValueError:
+            assert service.history.can_undo()
+        storage.close()
+
+def test_shell_undo():
+    """
+    A test that undo and redo step through the changes of a shell.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        storage = CsvRepository(os.path.join(directory, "movies.csv"), 
+                                save_delay=0)
+        storage.create()
+        service = LibraryService(storage.load(), storage, History())
+        out = StringIO()
+        failures = run_shell(service, build_parser(shell=True), 
+                             ["add Heat 1995 Crime", "undo", "undo", 
+                              "redo", "list"], False, out)
+        assert failures == 1  # The second undo has nothing to undo
+        assert "undone: the addition of HEAT" in out.getvalue()
+        assert out.getvalue().endswith("1. HEAT (1995) - Genre: Crime, "
+                                       "Rating: N/A\n")
+        storage.close()
+
+    # A single command has no earlier changes to undo
+    for command in ("undo", "redo"):  # Iteration: for loop
+        try:
+            with redirect_stderr(StringIO()):
+                build_parser().parse_args([command])
+            assert False, f"{command} should only be a shell command"
+        except SystemExit:
+            pass
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_bounded_history()
+    test_undo_redo_service()
+    test_shell_undo()
+    print("All history tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,140 @@
+"""
+Unit tests for the HTTP query service check the read endpoints with 
+pagination, that changes empty the query cache, and the error responses, 
+including on a kept-alive connection.
+"""
+
+import http.client
+import json
+import os
+import tempfile
+import threading
+from contextlib import redirect_stdout
+from io import StringIO
+
+from http_service import LibraryServer, QueryCache
+from library_service import LibraryService
+from storage import CsvRepository
+
+def request(server, method, path, body=None):
+    """
+    Sends a request to the server and returns the status and JSON body.
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port)
+    connection.request(method, path, 
+                       body=None if body is None else json.dumps(body))
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+def test_http_service():
+    """
+    A test for reading and changing the library over HTTP.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        storage = CsvRepository(os.path.join(directory, "movies.csv"))
+        storage.create()
+        service = LibraryService(storage.load(), storage)
+        for title, year, genre, rating in [("Heat", 1995, "Crime", 8.3),
+                                           ("Tenet", 2020, "Sci-Fi", 7.8),
+                                           ("Casino", 1995, "Crime", 8.2)]:
+            service.add(title, year, genre, rating)
+        server = LibraryServer(("127.0.0.1", 0), service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            status, page = request(server, "GET", "/movies?page=2&page_size=2")
+            assert status == 200 and page["total"] == 3
+            assert [movie["title"] for movie in page["movies"]] == ["TENET"]
+            status, page = request(server, "GET", 
+                                   "/movies?genre=Crime&year_from=1995")
+            assert [movie["title"] for movie in page["movies"]] == [
+                "CASINO", "HEAT"]
+            assert request(server, "GET", "/search?q=tenat")[1][
+                "movies"][0]["title"] == "TENET"
+            assert request(server, "GET", "/average")[1] == {"average": 8.1}
+            request(server, "GET", "/average")
+            assert server.cache.hits == 1
+
+            status, movie = request(server, "POST", "/movies", 
+                                    {"title": "Alien", "year": 1979, 
+                                     "genre": "Horror", "rating": 8.5})
+            assert status == 201 and movie["movie_id"] == "4"
+            assert len(server.cache) == 0  # Emptied by the change
+            request(server, "PATCH", "/movies/2", {"rating": 6.6})
+            request(server, "DELETE", "/movies/1")
+            assert request(server, "GET", "/average")[1] == {"average": 7.77}
+            assert request(server, "GET", "/movies/1")[0] == 404
+            assert request(server, "GET", "/movies?page=x")[0] == 400
+            for body in ({"movie_id": "9"}, {"self": 1}, {"plot": ""}):
+                assert request(server, "PATCH", "/movies/2", body)[0] == 400
+            for limit in ("0", "-5"):  # Iteration: for loop
+                status, found = request(server, "GET", 
+                                        f"/search?q=tenat&limit={limit}")
+                assert status == 200 and len(found["movies"]) == 1
+            assert request(server, "POST", "/movies", 
+                           {"title": "Tenet", "year": 2020, 
+                            "genre": "Sci-Fi"})[0] == 400
+        finally:
+            server.shutdown()
+            server.server_close()
+            storage.close()
+        assert len(CsvRepository(storage.file_path).load()) == 3
+
+def test_keep_alive_errors():
+    """
+    A test that a request failing before its body is read leaves the 
+    connection usable for the next request.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        storage = CsvRepository(os.path.join(directory, "movies.csv"))
+        storage.create()
+        service = LibraryService(storage.load(), storage)
+        service.add("Heat", 1995, "Crime", 8.3)
+        server = LibraryServer(("127.0.0.1", 0), service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        connection = http.client.HTTPConnection("127.0.0.1", 
+                                                server.server_port)
+        try:
+            for method, path, status in [("POST", "/nope", 404), 
+                                         ("PATCH", "/movies/1/x", 404)]:
+                connection.request(method, path, 
+                                   body=json.dumps({"rating": 9}))
+                response = connection.getresponse()
+                response.read()
+                assert response.status == status
+                connection.request("GET", "/average")
+                response = connection.getresponse()
+                assert response.status == 200
+                assert json.loads(response.read()) == {"average": 8.3}
+        finally:
+            connection.close()
+            server.shutdown()
+            server.server_close()
+            storage.close()
+
+def test_query_cache():
+    """
+    A test that the cache evicts the least recently used response.
+    """
+    cache = QueryCache(max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.get("a") == b"1"  # "b" is now the least recently used
+    cache.put("c", b"3")
+    assert cache.get("b") is None and cache.get("a") == b"1"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_http_service()
+    test_keep_alive_errors()
+    test_query_cache()
+    print("All HTTP service tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,125 @@
+"""
+Unit tests for the instrumentation check that timed functions are only 
+measured while instrumentation is enabled, that durations land in the 
+right histogram buckets and that a profile session writes its files.
+"""
+
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+import instrumentation
+from instrumentation import Metric, ProfileSession, timed, enable, \
+    stats, format_stats, reset
+from library_service import LibraryService
+from movie_operations import display_title_page
+from storage import CsvRepository
+
+@timed("test.double")
+def double(value):
+    """
+    A function to time in the tests.
+    """
+    return value * 2
+
+def test_timed_only_when_enabled():
+    """
+    A test that calls are counted while instrumentation is enabled and 
+    only then.
+    """
+    was_enabled = instrumentation.is_enabled()
+    reset()
+    try:
+        enable(False)
+        assert double(2) == 4
+        assert "test.double" not in stats()
+        enable()
+        assert double(3) == 6 and double(4) == 8
+        row = stats()["test.double"]
+        assert row["calls"] == 2
+        assert row["min_ms"] <= row["mean_ms"] <= row["max_ms"]
+        assert "test.double" in format_stats()
+        assert double.__name__ == "double"  # The wrapper looks the same
+    finally:
+        enable(was_enabled)
+        reset()
+
+def test_metric_histogram():
+    """
+    A test that durations are counted in power-of-two microsecond buckets 
+    and percentiles are read from them.
+    """
+    metric = Metric("test")
+    for elapsed in (0.000003, 0.000003, 0.000100, 0.002):
+        metric.record(elapsed)
+    assert metric.buckets == {2: 2, 7: 1, 11: 1}
+    assert metric.percentile(50) == 0.000004
+    assert metric.percentile(100) == 0.002  # Capped at the longest call
+    row = metric.as_dict()
+    assert row["calls"] == 4 and row["histogram_us"][4] == 2
+    assert Metric("empty").percentile(50) == 0
+
+def test_session_metrics():
+    """
+    A test that a session times the IDs handed out by the repository, 
+    once per batch of IDs, and the title-ordered pages and picks behind 
+    the menu's listings.
+    """
+    was_enabled = instrumentation.is_enabled()
+    reset()
+    try:
+        enable()
+        with tempfile.TemporaryDirectory() as directory, \
+                redirect_stdout(StringIO()):
+            storage = CsvRepository(os.path.join(directory, "movies.csv"))
+            storage.create()
+            service = LibraryService(storage.load(), storage)
+            service.add("Heat", 1995, "Crime", 8.3)
+            service.add("Tenet", 2020, "Sci-Fi")
+            display_title_page(service.movies, 1)  # The menu's listing
+            assert service.movies.movie_at(2).title == "TENET"
+            storage.close()
+        metrics = stats()
+        assert metrics["new_movie_ids"]["calls"] == 2
+        assert metrics["title_page"]["calls"] == 1
+        assert metrics["movie_at"]["calls"] == 1
+    finally:
+        enable(was_enabled)
+        reset()
+
+def test_profile_session():
+    """
+    A test that a profile session enables the timings and writes the 
+    profile, the memory report and the timings.
+    """
+    was_enabled = instrumentation.is_enabled()
+    reset()
+    try:
+        enable(False)
+        with tempfile.TemporaryDirectory() as directory:
+            with ProfileSession(directory, prefix="test") as session:
+                [double(value) for value in range(100)]
+            assert not instrumentation.is_enabled()  # Restored afterwards
+            assert len(session.paths) == 3
+            for path in session.paths:  # Iteration: for loop
+                assert os.path.getsize(path) > 0
+                assert os.path.basename(path).startswith("test-")
+            with open(session.paths[2]) as file:
+                assert "test.double" in file.read()
+    finally:
+        enable(was_enabled)
+        reset()
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_timed_only_when_enabled()
+    test_metric_histogram()
+    test_session_metrics()
+    test_profile_session()
+    print("All instrumentation tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
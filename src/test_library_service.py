@@ -0,0 +1,115 @@
+"""
+Unit tests for the library service and the batch command line check that 
+movies are added, edited, deleted and queried without any prompts, and 
+that a stream of commands runs against a library loaded once.
+"""
+
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from cli import build_parser, run_shell
+from library_service import LibraryService
+from storage import CsvRepository
+
+def make_service(directory):
+    """
+    Returns a service for an empty CSV library in the directory.
+    """
+    storage = CsvRepository(os.path.join(directory, "movies.csv"))
+    storage.create()
+    return LibraryService(storage.load(), storage)
+
+def test_service_operations():
+    """
+    A test for the add, edit, delete, filter and stats operations.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        service = make_service(directory)
+        tenet = service.add(" Tenet ", "2020", "Sci-Fi", 7.8)
+        heat = service.add("Heat", 1995, "Crime")
+        assert tenet.title == "TENET" and tenet.year == 2020
+        for title, year, genre, rating in [("tenet", 2020, "Sci-Fi", None),
+                                           ("Dune", 2021, "Space", None),
+                                           ("Alien", 1979, "Horror", 11)]:
+            try:
+                service.add(title, year, genre, rating)
+                assert False, "The movie should have been rejected"
+            except ValueError:
+                pass
+
+        service.edit(heat.get_id(), rating=8.3, year=1996)
+        assert service.filter_movies(genre="Crime", years=(1996, 1996)) \
+            == [heat]
+        try:
+            service.edit(heat.get_id(), title="Tenet", rating=1)
+            assert False, "The duplicate title should have been rejected"
+        except ValueError:
+            assert heat.title == "HEAT" and heat.rating == 8.3  # Unchanged
+        assert [movie.title for movie in service.list_movies()] == [
+            "HEAT", "TENET"]
+
+        # A genre that is not on the menu does not block other edits
+        heat.genre = "Noir"
+        service.edit(heat.get_id(), rating=8.5)
+        assert heat.rating == 8.5 and heat.genre == "Noir"
+        try:
+            service.edit(heat.get_id(), genre="Space")
+            assert False, "The unknown genre should have been rejected"
+        except ValueError:
+            pass
+        service.edit(heat.get_id(), genre="Crime", rating=8.3)
+        stats = service.stats()
+        assert stats["movies"] == 2 and stats["average"] == 8.05
+        assert stats["by_genre"]["Crime"] == {"rated": 1, "average": 8.3}
+
+        service.delete(tenet.get_id())
+        try:
+            service.get(tenet.get_id())
+            assert False, "The movie should have been deleted"
+        except KeyError:
+            pass
+        service.storage.close()
+        movies = CsvRepository(service.storage.file_path).load()
+        assert list(movies) == [heat.get_id()]
+        assert movies[heat.get_id()].year == 1996
+
+def test_command_stream():
+    """
+    A test for running a stream of commands in one process.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        service = make_service(directory)
+        commands = ['add "Lock, Stock" 1998 Crime --rating 8', 
+                    "# a comment", 
+                    "add Heat 1995 Crime", 
+                    "edit 2 --rating 8.3",
+                    "delete 99",
+                    "query --genre Crime --year-range 1990 1999",
+                    "stats"]
+        out = StringIO()
+        failures = run_shell(service, build_parser(shell=True), commands, 
+                             True, out)
+        service.storage.close()
+
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert failures == 1  # There is no movie 99
+        assert results[0]["title"] == "LOCK, STOCK"
+        assert [movie["title"] for movie in results[3]] == [
+            "HEAT", "LOCK, STOCK"]
+        assert results[4]["average"] == 8.15
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_service_operations()
+    test_command_stream()
+    print("All library service tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
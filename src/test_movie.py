@@ -35,6 +35,21 @@ def test_movie_rating():
     movie.add_rating(9.5)
     assert movie.rating == 9.5
 
+def test_movie_compact():
+    """
+    A test for the compact representation of Movie objects.
+    """
+    first = Movie("3", "HEAT", 1995, "".join(["Cri", "me"]), 8.3)
+    second = Movie("4", "SE7EN", 1995, "Crime", 8.3)
+
+    # Movies have no per-instance dictionary
+    assert not hasattr(first, "__dict__")
+    
+    # Repeated values are shared between movies
+    assert first.genre is second.genre
+    assert first.rating is second.rating
+    assert repr(first) == "HEAT (1995) - Genre: Crime, Rating: 8.30"
+
 def run_tests():
     """
     Runs all the tests and prints a success message if all tests pass.
@@ -42,6 +57,7 @@ def run_tests():
     # Run tests
     test_movie_creation()
     test_movie_rating()
+    test_movie_compact()
     
     # Print success message
     print("All tests passed!")
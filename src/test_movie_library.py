@@ -0,0 +1,271 @@
+"""
+Unit tests for the MovieLibrary class check that its title index stays in 
+sync when movies are added, renamed and deleted.
+"""
+
+import title_search
+from movie import Movie
+from movie_library import MovieLibrary, IdAllocator
+
+def test_title_index():
+    """
+    A test for duplicate checks through the title index.
+    """
+    movies = MovieLibrary()
+    movies["1"] = Movie("1", "TENET", 2020, "Sci-Fi", 7.8)
+    movies["2"] = Movie("2", "THE MATRIX", 1999, "Sci-Fi")
+
+    assert movies.has_title("TENET")
+    assert movies.has_title("the matrix")
+    assert not movies.has_title("HEAT")
+    assert movies.find_by_title("TENET").get_id() == "1"
+
+    # Renaming a movie moves its entry in the index
+    movies["1"].title = "INCEPTION"
+    assert not movies.has_title("TENET")
+    assert movies.find_by_title("INCEPTION").get_id() == "1"
+
+    # Deleting a movie removes its entry from the index
+    del movies["2"]
+    assert not movies.has_title("THE MATRIX")
+    assert movies.pop("1").title == "INCEPTION"
+    assert not movies.has_title("INCEPTION")
+
+def test_duplicate_titles():
+    """
+    A test for movies loaded with the same title.
+    """
+    movies = MovieLibrary()
+    movies["1"] = Movie("1", "DUNE", 1984, "Sci-Fi")
+    movies["2"] = Movie("2", "DUNE", 2021, "Sci-Fi")
+
+    assert movies.find_by_title("DUNE").get_id() == "1"
+    del movies["1"]
+    assert movies.find_by_title("DUNE").get_id() == "2"
+
+    # A movie removed from the library no longer updates its index
+    removed = movies.pop("2")
+    removed.title = "DUNE: PART TWO"
+    assert not movies.has_title("DUNE: PART TWO")
+
+    # Equality is still based on the title only
+    assert Movie("3", "DUNE", 1984, "Sci-Fi") == Movie(None, "DUNE", None, 
+                                                      None)
+
+def test_id_allocator():
+    """
+    A test for handing out movie IDs without reusing deleted ones.
+    """
+    movies = MovieLibrary()
+    movies["4"] = Movie("4", "TENET", 2020, "Sci-Fi", 7.8)
+    movies["2"] = Movie("2", "THE MATRIX", 1999, "Sci-Fi")
+    assert movies.id_allocator.next_id() == "5"
+
+    # The highest ID stays reserved after the movie is deleted
+    del movies["4"]
+    assert movies.id_allocator.next_id() == "6"
+
+    allocator = IdAllocator(high_water=10)
+    assert list(allocator.reserve(3)) == [11, 12, 13]
+    assert allocator.next_id() == "14"
+
+def test_rating_aggregates():
+    """
+    A test for keeping the rating aggregates in sync with the library.
+    """
+    movies = MovieLibrary()
+    movies["1"] = Movie("1", "TENET", 2020, "Sci-Fi", 7.8)
+    movies["2"] = Movie("2", "THE MATRIX", 1999, "Sci-Fi", 8.7)
+    movies["3"] = Movie("3", "HEAT", 1995, "Crime")
+    assert movies.stats.overall.count == 2
+    assert movies.stats.overall.average() == 8.25
+    assert movies.stats.overall.stddev() == 0.45
+
+    movies["3"].add_rating(8.3)  # Rating an unrated movie
+    movies["1"].genre = "Action"  # Moving a movie to another genre
+    movies["2"].year = 2003  # Moving a movie to another decade
+    movies["2"].add_rating(7.2)
+    movies.verify_stats()
+    assert movies.stats.by_genre["Sci-Fi"].average() == 7.2
+    assert movies.stats.by_decade[2000].count == 1
+    assert movies.stats.overall.minimum() == 7.2
+    assert movies.stats.overall.maximum() == 8.3
+
+    del movies["3"]
+    movies["4"] = Movie("4", "SE7EN", 1995, "Crime", 8.6)
+    movies.pop("1")
+    movies.verify_stats()
+    assert "Action" not in movies.stats.by_genre
+    assert movies.stats.overall.maximum() == 8.6
+
+def test_secondary_indexes():
+    """
+    A test for genre, year and rating queries through the indexes.
+    """
+    movies = MovieLibrary()
+    movies["1"] = Movie("1", "TENET", 2020, "Sci-Fi", 7.8)
+    movies["2"] = Movie("2", "THE MATRIX", 1999, "Sci-Fi", 8.7)
+    movies["3"] = Movie("3", "GATTACA", 1997, "Sci-Fi", 7.8)
+    movies["4"] = Movie("4", "HEAT", 1995, "Crime", 8.3)
+    movies["5"] = Movie("5", "CONTACT", 1997, "Sci-Fi")
+
+    def titles(found):
+        return sorted(movie.title for movie in found)
+
+    assert movies.genres() == ["Crime", "Sci-Fi"]
+    assert titles(movies.query(genre="Sci-Fi", years=(1990, 1999), 
+                               ratings=(8, None))) == ["THE MATRIX"]
+    assert titles(movies.query(years=(1995, 1997))) == \
+        ["CONTACT", "GATTACA", "HEAT"]
+    assert titles(movies.query(ratings=(7.8, 7.8))) == ["GATTACA", "TENET"]
+
+    # Changes to a movie move it within the indexes
+    movies["3"].add_rating(8.1)
+    movies["4"].genre = "Sci-Fi"
+    movies["1"].year = 1998
+    assert titles(movies.query(genre="Sci-Fi", years=(1990, 1999), 
+                               ratings=(8, None))) == \
+        ["GATTACA", "HEAT", "THE MATRIX"]
+    assert movies.genres() == ["Sci-Fi"]
+
+    del movies["2"]
+    assert titles(movies.query(ratings=(8.5, 10))) == []
+    movies.clear()
+    assert movies.query(genre="Sci-Fi") == []
+
+def test_title_order():
+    """
+    A test for listing and paging movies in title order.
+    """
+    movies = MovieLibrary()
+    movies["1"] = Movie("1", "TENET", 2020, "Sci-Fi", 7.8)
+    movies["2"] = Movie("2", "HEAT", 1995, "Crime", 8.3)
+    movies["10"] = Movie("10", "DUNE", 2021, "Sci-Fi")
+    movies["9"] = Movie("9", "DUNE", 1984, "Sci-Fi")
+
+    def titles(found):
+        return [(movie.title, movie.get_id()) for movie in found]
+
+    assert titles(movies.sorted_by_title()) == [
+        ("DUNE", "9"), ("DUNE", "10"), ("HEAT", "2"), ("TENET", "1")]
+    assert titles(movies.title_page(2, 3)) == [("TENET", "1")]
+    assert movies.movie_at(2).get_id() == "10"
+
+    # Renamed, added and deleted movies keep their place in the order
+    movies["1"].title = "ARRIVAL"
+    movies["5"] = Movie("5", "INCEPTION", 2010, "Sci-Fi")
+    del movies["9"]
+    assert titles(movies.sorted_by_title()) == [
+        ("ARRIVAL", "1"), ("DUNE", "10"), ("HEAT", "2"), ("INCEPTION", "5")]
+    assert titles(movies.title_page(1, 2)) == [("ARRIVAL", "1"), 
+                                               ("DUNE", "10")]
+
+def test_add_many():
+    """
+    A test for adding movies in bulk and changing them before the indexes 
+    are used.
+    """
+    movies = MovieLibrary()
+    movies.add_many([Movie("1", "TENET", 2020, "Sci-Fi", 7.8), 
+                     Movie("2", "HEAT", 1995, "Crime", 8.3)])
+    assert movies.has_title("HEAT")
+    assert movies.id_allocator.next_id() == "3"
+
+    movies["1"].add_rating(9.0)
+    movies["2"].genre = "Drama"
+    movies.add_many([Movie("2", "HEAT", 1995, "Crime", 8.5)])  # Replaces
+    movies.verify_stats()
+    assert [movie.title for movie in movies.query(genre="Crime")] == ["HEAT"]
+    assert movies.query(genre="Drama") == []
+    assert movies.stats.overall.average() == 8.75
+
+def test_add_records():
+    """
+    A test for adding movies from stored records, with and without the 
+    highest ID.
+    """
+    movies = MovieLibrary()
+    movies.add_records([("1", "TENET", 2020, "Sci-Fi", 7.8), 
+                        ("7", "HEAT", 1995, "Crime", None), 
+                        ("3", "heat", 1995, "Crime", 8.3)])
+    assert movies.id_allocator.next_id() == "8"
+    assert movies.find_by_title("HEAT").get_id() == "3"  # Lowest ID first
+    assert repr(movies["1"]) == repr(Movie("1", "TENET", 2020, "Sci-Fi", 
+                                           7.8))
+    movies["7"].add_rating(9.0)  # Changed before the indexes are built
+    movies.add_records([("3", "HEAT", 1995, "Drama", 8.5), 
+                        ("9", "DUNE", 2021, "Sci-Fi", 8.0)], high_water=9)
+    movies.verify_stats()
+    del movies["3"]
+    assert movies.find_by_title("HEAT").get_id() == "7"
+    assert movies.find_by_title("DUNE").year == 2021
+    assert movies.query(genre="Drama") == []
+    assert round(movies.stats.overall.average(), 2) == 8.27
+    assert movies.id_allocator.next_id() == "10"
+
+def test_title_search():
+    """
+    A test for prefix and typo-tolerant title search.
+    """
+    movies = MovieLibrary()
+    movies["1"] = Movie("1", "THE MATRIX", 1999, "Sci-Fi", 8.7)
+    movies["2"] = Movie("2", "THE MATRIX RELOADED", 2003, "Sci-Fi")
+    movies["3"] = Movie("3", "HEAT", 1995, "Crime", 8.3)
+
+    def titles(found):
+        return [movie.title for movie in found]
+
+    assert titles(movies.titles_starting_with("the mat")) == \
+        ["THE MATRIX", "THE MATRIX RELOADED"]
+    assert titles(movies.search_titles("teh matrx", limit=1)) == \
+        ["THE MATRIX"]
+    assert titles(movies.search_titles("zzz")) == []
+
+    # The search index follows added, renamed and deleted movies
+    movies["4"] = Movie("4", "INCEPTION", 2010, "Sci-Fi")
+    movies["3"].title = "HEATWAVE"
+    del movies["2"]
+    assert titles(movies.search_titles("incepton")) == ["INCEPTION"]
+    assert titles(movies.search_titles("heatwav")) == ["HEATWAVE"]
+    assert titles(movies.find_titles("the matrix")) == ["THE MATRIX"]
+
+def test_title_search_budget():
+    """
+    A test that a query whose trigrams are all too common to read in 
+    full still ranks the best title first.
+    """
+    movies = MovieLibrary()
+    for number in range(1, 5):  # Iteration: for loop
+        movies[str(number)] = Movie(str(number), f"STAR TREK {number}", 
+                                    2000, "Sci-Fi")
+        movies[str(number + 4)] = Movie(str(number + 4), 
+                                        f"OUR WARS {number}", 2000, "Drama")
+    movies["9"] = Movie("9", "STAR WARS", 1977, "Sci-Fi")
+    max_postings = title_search.MAX_POSTINGS
+    title_search.MAX_POSTINGS = 2  # Every posting of the query is longer
+    try:
+        assert movies.search_titles("star wars", limit=1)[0].get_id() == "9"
+        counts = movies._title_search_index().candidates(
+            title_search.title_trigrams("STAR"))
+        assert len(counts) == 2 and set(counts.values()) == {5}
+    finally:
+        title_search.MAX_POSTINGS = max_postings
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_title_index()
+    test_duplicate_titles()
+    test_id_allocator()
+    test_rating_aggregates()
+    test_secondary_indexes()
+    test_title_order()
+    test_add_many()
+    test_add_records()
+    test_title_search()
+    test_title_search_budget()
+    print("All movie library tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
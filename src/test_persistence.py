@@ -0,0 +1,72 @@
+"""
+Unit tests for the background writer check that bursts of changes are 
+coalesced into one write, that flushing and closing write everything 
+pending, and that a CSV repository saves its changes in the background.
+"""
+
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from movie import Movie
+from persistence import BackgroundWriter
+from storage import CsvRepository
+
+def test_coalesced_writes():
+    """
+    A test that a burst of changes becomes a single write holding the 
+    latest change of each key.
+    """
+    writes = []  # Container type: List
+    writer = BackgroundWriter(writes.append, delay=0.05, max_delay=1)
+    writer.submit([("1", "first"), ("2", "second")])
+    writer.submit([("1", "edited")])
+    assert writes == []  # Nothing is written during the burst
+    time.sleep(0.3)
+    assert writes == [["edited", "second"]]
+
+    writer.submit([("3", "third")])
+    writer.flush()  # Writes without waiting for the delay
+    assert writes[-1] == ["third"] and writer.pending == 0
+    writer.submit([("4", "fourth")])
+    writer.close()
+    assert writes[-1] == ["fourth"]
+
+def test_background_repository():
+    """
+    A test that a CSV repository journals its changes after the delay 
+    and writes the whole file on close.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        file_path = os.path.join(directory, "movies.csv")
+        storage = CsvRepository(file_path, save_delay=0.05)
+        storage.create()
+        movies = storage.load()
+        for number in range(1, 4):  # Iteration: for loop
+            movies[str(number)] = Movie(str(number), f"MOVIE {number}", 
+                                        2000 + number, "Drama")
+            storage.put(movies[str(number)])
+        storage.flush()
+        assert len(CsvRepository(file_path).load()) == 3  # From the journal
+        with open(file_path + ".journal") as journal:
+            assert len(journal.readlines()) == 3
+
+        movies["2"].rating = 9
+        storage.put(movies["2"])
+        storage.close()
+        assert not os.path.exists(file_path + ".journal")
+        assert CsvRepository(file_path).load()["2"].rating == 9.0
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_coalesced_writes()
+    test_background_repository()
+    print("All persistence tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,181 @@
+"""
+Shared tests for the storage backends check that the CSV and SQLite 
+repositories store and query movies the same way. Further tests check 
+that processes sharing one CSV file see each other's changes.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from movie import Movie
+from storage import MovieRepository, CsvRepository, SqliteRepository
+
+# Adds movies to a shared library from a separate process; the small 
+# journal limit makes the processes compact the file while others write
+ADD_MOVIES = """
+import sys
+from library_service import LibraryService
+from storage import CsvRepository
+
+file_path, worker, count = sys.argv[1], sys.argv[2], int(sys.argv[3])
+storage = CsvRepository(file_path, save_delay=0, journal_max_bytes=512)
+service = LibraryService(storage.load(), storage)
+for number in range(count):
+    service.add(f"WORKER {worker} MOVIE {number}", 2000, "Drama", 7)
+storage.close()
+"""
+
+def check_repository(make_repository):
+    """
+    Runs the shared checks against repositories made by make_repository, 
+    which is given a directory and returns a repository stored in it.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        storage = make_repository(directory)
+        storage.create()
+        movies = storage.load()
+        assert len(movies) == 0
+
+        tenet = Movie("1", "TENET", 2020, "Sci-Fi", 7.8)
+        movies["1"] = tenet
+        storage.put(tenet)
+        storage.batch(puts=[Movie("2", "THE MATRIX", 1999, "Sci-Fi", 8.7),
+                            Movie("3", "HEAT", 1995, "Crime", 8.3),
+                            Movie("4", "CONTACT, PART ONE", 1997, "Sci-Fi")])
+        storage.close()
+
+        # A fresh repository sees every change
+        storage = make_repository(directory)
+        movies = storage.load()
+        assert sorted(movies) == ["1", "2", "3", "4"]
+        assert movies["4"].title == "CONTACT, PART ONE"
+        assert movies["4"].rating is None
+
+        movies["1"].add_rating(9.1)
+        storage.put(movies["1"])
+        del movies["3"]
+        storage.delete("3")
+        assert storage.get("3") is None
+        assert storage.get("1").rating == 9.1
+        assert sorted(movie.title for movie in storage.query(
+            genre="Sci-Fi", years=(1990, 2020), ratings=(8, None))) == \
+            ["TENET", "THE MATRIX"]
+        assert storage.average_rating() == 8.9
+        storage.close()
+
+        movies = make_repository(directory).load()
+        assert sorted(movies) == ["1", "2", "4"]
+        assert movies["1"].rating == 9.1
+
+def test_csv_repository():
+    """
+    A test for the CSV file backend.
+    """
+    check_repository(
+        lambda directory: CsvRepository(os.path.join(directory, 
+                                                     "movies.csv")))
+
+def test_sqlite_repository():
+    """
+    A test for the SQLite database backend.
+    """
+    check_repository(
+        lambda directory: SqliteRepository(os.path.join(directory, 
+                                                        "movies.db")))
+
+def test_repository_interface():
+    """
+    A test that a backend must implement every abstract method.
+    """
+    class Incomplete(MovieRepository):
+        """
+        A backend that only implements loading.
+        """
+
+        def load(self, movies=None):
+            """
+            Returns no movies.
+            """
+            return {}
+
+    for repository_class in (MovieRepository, Incomplete):
+        try:
+            repository_class()
+            assert False, "An incomplete repository was created"
+        except TypeError as e:
+            assert "close" in str(e)
+
+def test_csv_repository_refresh():
+    """
+    A test that a repository picks up what another one stored in the same 
+    file, and that both hand out different IDs.
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        file_path = os.path.join(directory, "movies.csv")
+        first = CsvRepository(file_path, save_delay=0)
+        second = CsvRepository(file_path, save_delay=0)
+        first.create()
+        movies = first.load()
+        others = second.load()
+
+        first_id, = first.new_movie_ids(movies, [("HEAT", 1995, "Crime")])
+        second_id, = second.new_movie_ids(others, [("TENET", 2020, "")])
+        assert first_id != second_id
+        first.put(Movie(first_id, "HEAT", 1995, "Crime", 8.3))
+        second.refresh()
+        assert others[first_id].title == "HEAT"
+
+        second.put(Movie(second_id, "TENET", 2020, "Sci-Fi", 7.8))
+        second.delete(first_id)
+        second.close()  # Rewrites the file from the journal
+        first.refresh()
+        assert sorted(movies) == [second_id]
+        assert movies.find_by_title("TENET").rating == 7.8
+        first.close()
+        assert sorted(CsvRepository(file_path).load()) == [second_id]
+
+def test_csv_repository_processes():
+    """
+    A test that processes adding movies to one file at the same time 
+    lose no movie and never share an ID.
+    """
+    workers, count = 4, 25
+    with tempfile.TemporaryDirectory() as directory, \
+            redirect_stdout(StringIO()):
+        file_path = os.path.join(directory, "movies.csv")
+        CsvRepository(file_path).create()
+        source = os.path.dirname(os.path.abspath(__file__))
+        processes = [subprocess.Popen(
+            [sys.executable, "-c", ADD_MOVIES, file_path, str(worker), 
+             str(count)], cwd=source, stdout=subprocess.DEVNULL)
+            for worker in range(workers)]
+        for process in processes:  # Iteration: for loop
+            assert process.wait(timeout=60) == 0
+
+        movies = CsvRepository(file_path).load()
+        assert len(movies) == workers * count
+        assert sorted(int(movie_id) for movie_id in movies) == \
+            list(range(1, workers * count + 1))
+        assert {movie.title for movie in movies.values()} == {
+            f"WORKER {worker} MOVIE {number}" 
+            for worker in range(workers) for number in range(count)}
+
+def run_tests():
+    """
+    Runs all the tests and prints a success message if all tests pass.
+    """
+    test_csv_repository()
+    test_sqlite_repository()
+    test_repository_interface()
+    test_csv_repository_refresh()
+    test_csv_repository_processes()
+    print("All storage tests passed!")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,127 @@
+"""
+This module provides typo-tolerant title search for a movie library. Each 
+title is split into trigrams (runs of three characters), and an inverted 
+index maps every trigram to the set of movies whose titles contain it, 
+so a title is added or removed in constant time per trigram. A query 
+reads the postings of its rarest trigrams first, so only a bounded 
+number of postings is read however large the library is. The common 
+trigrams are not read; each candidate is looked up in them instead, and 
+the candidates are ranked by how many trigrams they share with the query.
+"""
+
+from collections import Counter
+from itertools import islice
+
+from movie import normalize_title
+
+MAX_POSTINGS = 1000  # Postings read per query, which bounds its cost
+MIN_SIMILARITY = 0.3  # Lowest similarity of a result, from 0 to 1
+
+def title_trigrams(title):
+    """
+    Returns the set of trigrams of a title. The title is padded with 
+    spaces so its first and last letters count as much as the rest.
+    """
+    padded = f"  {normalize_title(title)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def similarity(grams, other_grams):
+    """
+    Returns how alike two sets of trigrams are, from 0 to 1 (the Dice 
+    coefficient).
+    """
+    if not grams or not other_grams:
+        return 0.0
+    return 2 * len(grams & other_grams) / (len(grams) + len(other_grams))
+
+class TrigramIndex:
+    """
+    A class to map trigrams to the sets of numeric IDs of the movies 
+    whose titles contain them.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty index.
+        """
+        self._postings = {}  # Container type: Dictionary (gram -> set)
+
+    def add(self, movie_id, title):
+        """
+        Adds a movie title to the index.
+        """
+        number = int(movie_id)
+        for gram in title_trigrams(title):  # Iteration: for loop
+            postings = self._postings.get(gram)
+            if postings is None:
+                self._postings[gram] = {number}  # Container type: Set
+            else:
+                postings.add(number)
+
+    def remove(self, movie_id, title):
+        """
+        Removes a movie title from the index.
+        """
+        number = int(movie_id)
+        for gram in title_trigrams(title):  # Iteration: for loop
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(number)
+                if not postings:
+                    del self._postings[gram]
+
+    def candidates(self, grams):
+        """
+        Returns a Counter of candidate movie IDs and the number of the 
+        given trigrams their titles share. The postings of the rarest 
+        trigrams are read until MAX_POSTINGS IDs have been read. If even 
+        the rarest trigram is more common than that, the candidates are 
+        the movies that have the rarest trigrams in common, found by 
+        intersecting their postings. Each candidate is then looked up in 
+        the postings of the remaining, common trigrams, so it is ranked 
+        by every trigram it shares without reading those postings.
+        """
+        postings = sorted((self._postings[gram] for gram in grams 
+                           if gram in self._postings), key=len)
+        counts = Counter()  # Container type: Counter (id -> shared grams)
+        budget = MAX_POSTINGS
+        read = 0  # Postings read so far, rarest first
+        while read < len(postings) and len(postings[read]) <= budget:
+            counts.update(postings[read])
+            budget -= len(postings[read])
+            read += 1
+        if not counts and postings:  # Every trigram of the query is common
+            shared = postings[0]
+            read = 1
+            while len(shared) > MAX_POSTINGS and read < len(postings):
+                narrowed = shared & postings[read]  # Iterates the smaller
+                if not narrowed:
+                    break  # The trigram is ranked below instead
+                shared = narrowed
+                read += 1
+            # Every movie left shares the same trigrams, so any of them 
+            # is as good a candidate as another
+            counts.update(dict.fromkeys(islice(shared, MAX_POSTINGS), read))
+        candidates = set(counts)  # Container type: Set
+        for ids in postings[read:]:  # Iteration: for loop
+            counts.update(ids & candidates)  # Iterates the candidates
+        return counts
+
+def search(movies, index, query, limit=10):
+    """
+    Returns up to limit movies whose titles are most like the query, 
+    best match first.
+    """
+    grams = title_trigrams(query)
+    counts = index.candidates(grams)
+    # Only the candidates sharing the most trigrams are scored in full
+    scored = []  # Container type: List of (score, title, movie)
+    for number, _ in counts.most_common(limit * 5):  # Iteration: for loop
+        movie = movies.get(str(number))
+        if movie is None:
+            continue
+        score = similarity(grams, title_trigrams(movie.title))
+        if score >= MIN_SIMILARITY:
+            scored.append((-score, movie.title, number, movie))
+    scored.sort(key=lambda entry: entry[:3])
+    return [entry[3] for entry in scored[:limit]]